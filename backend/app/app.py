@@ -6,7 +6,8 @@ from utils.extensions import jwt, socket_io
 from dotenv import load_dotenv
 from datetime import timedelta
 from utils import jwt_handlers, socket_handlers
-from routes import auth, home, events_bp, subjects_bp, tasks_bp, files_bp, folders_bp, progress_bp, chat, quiz_bp, users, assistant_bp, preferences_bp
+from utils.commands import register_commands
+from routes import auth, home, events_bp, subjects_bp, tasks_bp, files_bp, folders_bp, progress_bp, chat, quiz_bp, users, assistant_bp, preferences_bp, search_bp
 import os
 from pathlib import Path
 
@@ -29,6 +30,7 @@ def create_app():
     CORS(app, supports_credentials=True, origins='*')
     migrate = Migrate(app, db)
     socket_io.init_app(app)
+    register_commands(app)
 
     app.register_blueprint(auth, url_prefix='/api/auth')
     app.register_blueprint(users, url_prefix='/api/users')
@@ -43,5 +45,6 @@ def create_app():
     app.register_blueprint(quiz_bp, url_prefix='/api/quizzes')
     app.register_blueprint(assistant_bp, url_prefix='/api/assistant')
     app.register_blueprint(preferences_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
 
     return app
\ No newline at end of file
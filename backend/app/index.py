@@ -1,7 +1,9 @@
 from app import create_app
 from utils.extensions import socket_io
+from utils.reminders import reminder_scheduler
 
 app = create_app()
 
 if __name__ == '__main__':
+    reminder_scheduler.start(app)
     socket_io.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""study daily rollup
+
+Revision ID: 3f9c2b7d1e4a
+Revises: a71ccd34e21f
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2b7d1e4a'
+down_revision = 'a71ccd34e21f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('study_daily_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('minutes', sa.Integer(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['usuario.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date', 'subject_id')
+    )
+
+    # Popular o agregado com o histórico já existente
+    op.execute(
+        "INSERT INTO study_daily_rollup (user_id, date, subject_id, minutes, session_count) "
+        "SELECT user_id, date, subject_id, SUM(duration_minutes), COUNT(id) "
+        "FROM study_session GROUP BY user_id, date, subject_id"
+    )
+
+
+def downgrade():
+    op.drop_table('study_daily_rollup')
@@ -0,0 +1,30 @@
+"""task listing indexes
+
+Revision ID: 8b51e0c47d2f
+Revises: 3f9c2b7d1e4a
+Create Date: 2026-10-18 14:03:55.817240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b51e0c47d2f'
+down_revision = '3f9c2b7d1e4a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_user_completed_due', ['user_id', 'completed', 'due_date'], unique=False)
+        batch_op.create_index('ix_task_user_due_id', ['user_id', 'due_date', 'id'], unique=False)
+        batch_op.create_index('ix_task_user_subject', ['user_id', 'subject_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_user_subject')
+        batch_op.drop_index('ix_task_user_due_id')
+        batch_op.drop_index('ix_task_user_completed_due')
@@ -0,0 +1,68 @@
+"""folder size counters
+
+Revision ID: a4d8f2c6e913
+Revises: f3c9a1e5b7d2
+Create Date: 2026-10-18 20:02:48.216530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8f2c6e913'
+down_revision = 'f3c9a1e5b7d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('folder', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('direct_files', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('direct_bytes', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('total_files', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('total_bytes', sa.BigInteger(), nullable=False, server_default='0'))
+
+    # Preencher os contadores a partir dos arquivos existentes (mesma conta do comando rebuild-folder-sizes)
+    bind = op.get_bind()
+    folder = sa.table('folder', sa.column('id', sa.Integer), sa.column('path', sa.String),
+                      sa.column('direct_files', sa.Integer), sa.column('direct_bytes', sa.BigInteger),
+                      sa.column('total_files', sa.Integer), sa.column('total_bytes', sa.BigInteger))
+    file = sa.table('file', sa.column('folder_id', sa.Integer), sa.column('file_size', sa.Integer))
+
+    direct = {
+        folder_id: (count, size)
+        for folder_id, count, size in bind.execute(
+            sa.select(file.c.folder_id, sa.func.count(), sa.func.sum(file.c.file_size))
+            .where(file.c.folder_id.isnot(None)).group_by(file.c.folder_id)
+        )
+    }
+    paths = dict(bind.execute(sa.select(folder.c.id, folder.c.path)).all())
+    totals = {folder_id: [0, 0] for folder_id in paths}
+    for folder_id, (count, size) in direct.items():
+        for ancestor_id in (int(part) for part in (paths.get(folder_id) or '').strip('/').split('/') if part):
+            if ancestor_id in totals:
+                totals[ancestor_id][0] += count
+                totals[ancestor_id][1] += size or 0
+
+    rows = [
+        {'folder_id': folder_id, 'df': direct.get(folder_id, (0, 0))[0], 'db': direct.get(folder_id, (0, 0))[1] or 0,
+         'tf': total[0], 'tb': total[1]}
+        for folder_id, total in totals.items() if total[0] or folder_id in direct
+    ]
+    if rows:
+        bind.execute(
+            folder.update().where(folder.c.id == sa.bindparam('folder_id')).values(
+                direct_files=sa.bindparam('df'), direct_bytes=sa.bindparam('db'),
+                total_files=sa.bindparam('tf'), total_bytes=sa.bindparam('tb')
+            ),
+            rows
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('folder', schema=None) as batch_op:
+        batch_op.drop_column('total_bytes')
+        batch_op.drop_column('total_files')
+        batch_op.drop_column('direct_bytes')
+        batch_op.drop_column('direct_files')
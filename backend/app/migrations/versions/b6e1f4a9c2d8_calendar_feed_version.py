@@ -0,0 +1,28 @@
+"""calendar feed version and secret
+
+Revision ID: b6e1f4a9c2d8
+Revises: a4d8f2c6e913
+Create Date: 2026-10-18 21:14:05.481372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1f4a9c2d8'
+down_revision = 'a4d8f2c6e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('calendar_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('calendar_feed_secret', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.drop_column('calendar_feed_secret')
+        batch_op.drop_column('calendar_version')
@@ -0,0 +1,44 @@
+"""search document index
+
+Revision ID: c4e7a9f1b2d3
+Revises: 8b51e0c47d2f
+Create Date: 2026-10-18 16:41:07.129554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a9f1b2d3'
+down_revision = '8b51e0c47d2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_document',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['usuario.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entity_type', 'entity_id', name='uq_search_document_entity')
+    )
+    with op.batch_alter_table('search_document', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_search_document_user_id'), ['user_id'], unique=False)
+        batch_op.create_index('ix_search_document_fulltext', ['title', 'body'], unique=False, mysql_prefix='FULLTEXT')
+
+    # Após a migração, popular o índice com: flask rebuild-search-index
+
+
+def downgrade():
+    with op.batch_alter_table('search_document', schema=None) as batch_op:
+        batch_op.drop_index('ix_search_document_fulltext')
+        batch_op.drop_index(batch_op.f('ix_search_document_user_id'))
+
+    op.drop_table('search_document')
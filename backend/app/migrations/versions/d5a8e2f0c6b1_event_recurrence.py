@@ -0,0 +1,38 @@
+"""event recurrence
+
+Revision ID: d5a8e2f0c6b1
+Revises: c4e7a9f1b2d3
+Create Date: 2026-10-18 17:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8e2f0c6b1'
+down_revision = 'c4e7a9f1b2d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_end', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_exdates', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_parent_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_id', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_event_recurrence_parent', 'event', ['recurrence_parent_id'], ['id'])
+        batch_op.create_index('ix_event_recurrence_parent', ['recurrence_parent_id', 'recurrence_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_recurrence_parent')
+        batch_op.drop_constraint('fk_event_recurrence_parent', type_='foreignkey')
+        batch_op.drop_column('recurrence_id')
+        batch_op.drop_column('recurrence_parent_id')
+        batch_op.drop_column('recurrence_exdates')
+        batch_op.drop_column('recurrence_end')
+        batch_op.drop_column('recurrence_rule')
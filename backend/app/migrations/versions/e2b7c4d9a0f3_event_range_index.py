@@ -0,0 +1,26 @@
+"""event range index
+
+Revision ID: e2b7c4d9a0f3
+Revises: d5a8e2f0c6b1
+Create Date: 2026-10-18 18:03:27.540911
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c4d9a0f3'
+down_revision = 'd5a8e2f0c6b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_user_start_end', ['user_id', 'start_date', 'end_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_user_start_end')
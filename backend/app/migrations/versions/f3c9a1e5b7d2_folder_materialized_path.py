@@ -0,0 +1,64 @@
+"""folder materialized path
+
+Revision ID: f3c9a1e5b7d2
+Revises: e2b7c4d9a0f3
+Create Date: 2026-10-18 19:21:05.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9a1e5b7d2'
+down_revision = 'e2b7c4d9a0f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('folder', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(length=255), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('depth', sa.Integer(), nullable=False, server_default='0'))
+
+    # Preencher caminho e profundidade a partir de parent_id (em memória, nível a nível)
+    bind = op.get_bind()
+    folder = sa.table('folder', sa.column('id', sa.Integer), sa.column('parent_id', sa.Integer),
+                      sa.column('path', sa.String), sa.column('depth', sa.Integer))
+    children = {}
+    folder_ids = set()
+    for folder_id, parent_id in bind.execute(sa.select(folder.c.id, folder.c.parent_id)):
+        children.setdefault(parent_id, []).append(folder_id)
+        folder_ids.add(folder_id)
+
+    rows = []
+    level = [(folder_id, f'/{folder_id}/', 0) for folder_id in children.get(None, [])]
+    while level:
+        rows.extend(level)
+        level = [
+            (child_id, f'{path}{child_id}/', depth + 1)
+            for folder_id, path, depth in level
+            for child_id in children.get(folder_id, [])
+        ]
+
+    # Pastas fora da árvore (pai inexistente ou ciclo) ficariam com caminho vazio, que casa com tudo em LIKE
+    unreachable = folder_ids - {folder_id for folder_id, _, _ in rows}
+    if unreachable:
+        raise RuntimeError(f"Pastas sem caminho até a raiz (parent_id inválido ou ciclo): {sorted(unreachable)}")
+    if rows:
+        bind.execute(
+            folder.update().where(folder.c.id == sa.bindparam('folder_id')).values(
+                path=sa.bindparam('new_path'), depth=sa.bindparam('new_depth')
+            ),
+            [{'folder_id': folder_id, 'new_path': path, 'new_depth': depth} for folder_id, path, depth in rows]
+        )
+
+    with op.batch_alter_table('folder', schema=None) as batch_op:
+        batch_op.create_index('ix_folder_path', ['path'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('folder', schema=None) as batch_op:
+        batch_op.drop_index('ix_folder_path')
+        batch_op.drop_column('depth')
+        batch_op.drop_column('path')
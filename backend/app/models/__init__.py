@@ -6,6 +6,8 @@ from .task import Task
 from .file import File
 from .folder import Folder
 from .study_session import StudySession
+from .study_daily_rollup import StudyDailyRollup
 from .chat import Chat, Mensagem, ChatUsuario, TipoChat, TipoMensagem
 from .quiz import Quiz, Questao, Alternativa, TentativaQuiz, RespostaUsuario, TagQuiz, DificuldadeQuiz
 from .user_preferences import UserPreferences
+from .search_document import SearchDocument
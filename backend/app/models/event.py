@@ -1,8 +1,13 @@
 from utils.db import db
 from datetime import datetime
+import json
 
 class Event(db.Model):
     __tablename__ = 'event'
+    __table_args__ = (
+        db.Index('ix_event_user_start_end', 'user_id', 'start_date', 'end_date'),
+        db.Index('ix_event_recurrence_parent', 'recurrence_parent_id', 'recurrence_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
@@ -12,6 +17,13 @@ class Event(db.Model):
     end_date = db.Column(db.DateTime, nullable=False)
     all_day = db.Column(db.Boolean, default=False)
     color = db.Column(db.String(20), default='#3b82f6')
+    # Recorrência (RRULE) - a linha representa a série inteira
+    recurrence_rule = db.Column(db.String(255), nullable=True)
+    recurrence_end = db.Column(db.DateTime, nullable=True)  # fim da última ocorrência (None = sem fim)
+    recurrence_exdates = db.Column(db.Text, nullable=True)  # JSON com inícios de ocorrências canceladas
+    # Ocorrência sobrescrita: aponta para a série e para o início original da ocorrência
+    recurrence_parent_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True)
+    recurrence_id = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
     updated_at = db.Column(db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now())
 
@@ -26,6 +38,15 @@ class Event(db.Model):
         self.all_day = all_day
         self.color = color
 
+    def get_exdates(self):
+        """Retorna os inícios das ocorrências canceladas da série"""
+        if not self.recurrence_exdates:
+            return set()
+        return {datetime.fromisoformat(value) for value in json.loads(self.recurrence_exdates)}
+
+    def set_exdates(self, exdates):
+        self.recurrence_exdates = json.dumps(sorted(value.isoformat() for value in exdates)) if exdates else None
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -36,6 +57,10 @@ class Event(db.Model):
             'end_date': self.end_date.isoformat() if self.end_date else None,
             'all_day': self.all_day,
             'color': self.color,
+            'recurrence_rule': self.recurrence_rule,
+            'recurrence_exdates': sorted(value.isoformat() for value in self.get_exdates()),
+            'recurrence_parent_id': self.recurrence_parent_id,
+            'recurrence_id': self.recurrence_id.isoformat() if self.recurrence_id else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
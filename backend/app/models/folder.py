@@ -4,6 +4,11 @@ from datetime import datetime
 
 class Folder(db.Model):
     __tablename__ = 'folder'
+    __table_args__ = (
+        db.Index('ix_folder_path', 'path'),
+    )
+
+    MAX_DEPTH = 9  # profundidade máxima (0 = raiz), ou seja, 10 níveis
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
@@ -11,6 +16,14 @@ class Folder(db.Model):
     parent_id = db.Column(db.Integer, db.ForeignKey('folder.id'), nullable=True)
     name = db.Column(db.String(100), nullable=False)
     color = db.Column(db.String(20), default='#6366f1') 
+    # Caminho materializado com os ids dos ancestrais e da própria pasta, ex.: "/1/5/12/"
+    path = db.Column(db.String(255), nullable=False, default='')
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    # Contadores mantidos por delta: direct_* só a própria pasta, total_* inclui as subpastas
+    direct_files = db.Column(db.Integer, nullable=False, default=0)
+    direct_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    total_files = db.Column(db.Integer, nullable=False, default=0)
+    total_bytes = db.Column(db.BigInteger, nullable=False, default=0)
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
     updated_at = db.Column(db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now())
 
@@ -28,14 +41,11 @@ class Folder(db.Model):
 
     def get_depth(self):
         """Retorna a profundidade da pasta na hierarquia (0 = raiz)"""
-        depth = 0
-        current = self
-        while current.parent_id is not None:
-            depth += 1
-            current = Folder.query.get(current.parent_id)
-            if depth > 10:  # Proteção contra loop infinito
-                break
-        return depth
+        return self.depth
+
+    def get_ancestor_ids(self):
+        """Ids dos ancestrais, da raiz até o pai, lidos do caminho materializado"""
+        return [int(part) for part in self.path.strip('/').split('/')[:-1]]
 
     def to_dict(self):
         return {
@@ -45,7 +55,11 @@ class Folder(db.Model):
             'parent_id': self.parent_id,
             'name': self.name,
             'color': self.color,
-            'depth': self.get_depth(),
+            'depth': self.depth,
+            'direct_files': self.direct_files,
+            'direct_bytes': self.direct_bytes,
+            'total_files': self.total_files,
+            'total_bytes': self.total_bytes,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -0,0 +1,24 @@
+from utils.db import db
+
+class SearchDocument(db.Model):
+    """Documento do índice de busca textual (uma linha por matéria, tarefa, evento, pasta ou arquivo)"""
+    __tablename__ = 'search_document'
+    __table_args__ = (
+        db.UniqueConstraint('entity_type', 'entity_id', name='uq_search_document_entity'),
+        db.Index('ix_search_document_fulltext', 'title', 'body', mysql_prefix='FULLTEXT'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, index=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # subject, task, event, folder, file
+    entity_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now())
+
+    def __init__(self, user_id, entity_type, entity_id, title, body=None):
+        self.user_id = user_id
+        self.entity_type = entity_type
+        self.entity_id = entity_id
+        self.title = title
+        self.body = body
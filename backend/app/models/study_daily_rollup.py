@@ -0,0 +1,27 @@
+from utils.db import db
+
+class StudyDailyRollup(db.Model):
+    """Agregado diário de estudo por usuário e matéria (mantido junto com as sessões)"""
+    __tablename__ = 'study_daily_rollup'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, user_id, date, subject_id, minutes=0, session_count=0):
+        self.user_id = user_id
+        self.date = date
+        self.subject_id = subject_id
+        self.minutes = minutes
+        self.session_count = session_count
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'date': self.date.isoformat() if self.date else None,
+            'subject_id': self.subject_id,
+            'minutes': self.minutes,
+            'session_count': self.session_count
+        }
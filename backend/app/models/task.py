@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Task(db.Model):
     __tablename__ = 'task'
+    __table_args__ = (
+        db.Index('ix_task_user_completed_due', 'user_id', 'completed', 'due_date'),
+        db.Index('ix_task_user_due_id', 'user_id', 'due_date', 'id'),
+        db.Index('ix_task_user_subject', 'user_id', 'subject_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
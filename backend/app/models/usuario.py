@@ -1,10 +1,12 @@
 from flask import current_app
 from flask_login import UserMixin
-from itsdangerous import URLSafeTimedSerializer
+from itsdangerous import URLSafeSerializer, URLSafeTimedSerializer
 from utils.extensions import bcrypt
 from utils.db import db
 from datetime import datetime, timezone
 import enum
+import hmac
+import secrets
 
 class Usuario(db.Model, UserMixin):
     __tablename__ = 'usuario'
@@ -19,6 +21,10 @@ class Usuario(db.Model, UserMixin):
     biografia = db.Column(db.Text, nullable=True)
     confirm_user = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+    # Versão do calendário (incrementada a cada alteração de eventos/tarefas) usada no ETag do feed .ics
+    calendar_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Segredo do feed .ics: trocá-lo invalida todas as URLs de assinatura já distribuídas
+    calendar_feed_secret = db.Column(db.String(64), nullable=True)
 
     contas_sociais = db.relationship('UsuarioProvedor', back_populates='usuario_core', cascade='all, delete-orphan')
     revoked_tokens = db.relationship('RevokedToken', back_populates='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -54,6 +60,33 @@ class Usuario(db.Model, UserMixin):
 
         return user
 
+    def rotate_calendar_feed_secret(self):
+        """Gera um novo segredo para o feed do calendário (o commit fica com quem chama)"""
+        self.calendar_feed_secret = secrets.token_urlsafe(32)
+
+    def get_calendar_feed_token(self):
+        """Gera o token da URL de assinatura do calendário (.ics), ligado ao segredo atual do feed"""
+        s = URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar-feed')
+        return s.dumps({'user_id': self.id, 'secret': self.calendar_feed_secret})
+    
+    @staticmethod
+    def verify_calendar_feed_token(token):
+        """Valida o token do calendário e retorna o usuário (None se inválido ou revogado)"""
+        s = URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar-feed')
+        try:
+            dados = s.loads(token)
+            user_id = int(dados['user_id'])
+            secret = str(dados['secret'])
+        except Exception:
+            return None
+
+        user = Usuario.query.get(user_id)
+        if user is None or not user.calendar_feed_secret:
+            return None
+        if not hmac.compare_digest(user.calendar_feed_secret, secret):
+            return None
+        return user
+
     def get_reset_token(self):
         s = URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
 
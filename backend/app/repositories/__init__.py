@@ -6,6 +6,8 @@ from . import taskRepository
 from . import fileRepository
 from . import folderRepository
 from . import progressRepository
+from . import leaderboardRepository
+from . import searchRepository
 from .chat_repo import ChatRepository, MessageRepository, ChatUsuarioRepository
 from .quiz_repo import (
     QuizRepository, QuestaoRepository, AlternativaRepository,
@@ -1,20 +1,67 @@
 from models.event import Event
+from models.task import Task
+from models.usuario import Usuario
 from utils.db import db
-from datetime import datetime
+from repositories import searchRepository
+from utils.reminders import reminder_scheduler, LOAD_HORIZON
+from utils.recurrence import EventOccurrence, iter_occurrences, iter_starts, last_occurrence_end, normalize_rrule, parse_rrule
+from utils.intervals import BusyIndex
+from utils.dates import to_naive_utc
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, insert, or_, update
+from cachetools import LRUCache, TTLCache
+import heapq
+import threading
 
-def create_event(user_id, title, start_date, end_date, description=None, all_day=False, color='#3b82f6'):
-    """Cria um novo evento"""
+# Cache das leituras por período: ocorrências (cópias, não objetos ORM) agrupadas por usuário e mês
+MAX_CACHED_MONTHS = 24  # períodos maiores vão direto ao banco
+MAX_MONTHS_PER_USER = 120
+_month_cache = LRUCache(maxsize=5000)  # user_id -> {mês: ocorrências}
+_month_generation = {}  # user_id -> contador incrementado a cada invalidação
+_month_cache_lock = threading.Lock()
+
+# Índice de horários ocupados por usuário, cobrindo de BUSY_INDEX_PAST atrás até BUSY_INDEX_FUTURE à frente
+BUSY_INDEX_PAST = timedelta(days=30)
+BUSY_INDEX_FUTURE = timedelta(days=180)
+TASK_DUE_BLOCK = timedelta(minutes=30)  # bloco reservado antes do prazo de cada tarefa pendente
+MAX_CONFLICTS = 50
+_busy_cache = TTLCache(maxsize=4096, ttl=3600)
+_busy_cache_lock = threading.Lock()
+
+def _refresh_recurrence(event):
+    """Valida a regra de recorrência e recalcula o fim da série"""
+    event.recurrence_rule = normalize_rrule(event.recurrence_rule)
+    if not event.recurrence_rule:
+        event.recurrence_rule = None
+        event.recurrence_end = None
+        return
+    if event.recurrence_parent_id is not None:
+        raise ValueError("Uma ocorrência sobrescrita não pode ter recorrência própria")
+    parse_rrule(event.recurrence_rule)
+    event.recurrence_end = last_occurrence_end(event)
+
+def create_event(user_id, title, start_date, end_date, description=None, all_day=False, color='#3b82f6',
+                 recurrence_rule=None):
+    """Cria um novo evento (ou uma série, se recurrence_rule for informada)"""
     event = Event(
         user_id=user_id,
         title=title,
-        start_date=start_date,
-        end_date=end_date,
+        start_date=to_naive_utc(start_date),
+        end_date=to_naive_utc(end_date),
         description=description,
         all_day=all_day,
         color=color
     )
+    event.recurrence_rule = recurrence_rule
+    _refresh_recurrence(event)
     db.session.add(event)
+    db.session.flush()
+    searchRepository.index_event(event)
+    bump_calendar_version(event.user_id)
     db.session.commit()
+    invalidate_event_months(event.user_id, [_event_span(event)])
+    invalidate_busy_index(event.user_id)
+    reminder_scheduler.sync_event(event)
     return event
 
 def get_event_by_id(event_id):
@@ -22,27 +69,268 @@ def get_event_by_id(event_id):
     return Event.query.get(event_id)
 
 def get_events_by_user(user_id, start_date=None, end_date=None):
-    """Busca todos os eventos de um usuário, opcionalmente filtrados por período"""
-    query = Event.query.filter_by(user_id=user_id)
+    """Busca os eventos de um usuário; com período completo, as séries são expandidas em ocorrências"""
+    start_date, end_date = to_naive_utc(start_date), to_naive_utc(end_date)
+    if start_date and end_date:
+        return get_event_occurrences_cached(user_id, start_date, end_date)
+
+    # Sem período fechado não há como expandir séries infinitas: retornar as séries como estão
+    query = Event.query.filter_by(user_id=user_id).filter(Event.recurrence_parent_id.is_(None))
     
     if start_date:
-        query = query.filter(Event.end_date >= start_date)
+        query = query.filter(or_(Event.end_date >= start_date, Event.recurrence_rule.isnot(None)))
     if end_date:
         query = query.filter(Event.start_date <= end_date)
     
     return query.order_by(Event.start_date).all()
 
+def iter_event_occurrences(user_id, start_date, end_date):
+    """Gera, em ordem de início, os eventos e as ocorrências de séries que tocam o período.
+
+    O custo depende do número de séries e do tamanho da janela, não do total de ocorrências.
+    """
+    singles = Event.query.filter(
+        Event.user_id == user_id,
+        Event.recurrence_rule.is_(None),
+        Event.recurrence_parent_id.is_(None),
+        Event.end_date >= start_date,
+        Event.start_date <= end_date
+    ).order_by(Event.start_date).all()
+
+    series = Event.query.filter(
+        Event.user_id == user_id,
+        Event.recurrence_rule.isnot(None),
+        Event.start_date <= end_date,
+        or_(Event.recurrence_end.is_(None), Event.recurrence_end >= start_date)
+    ).all()
+
+    overrides = []
+    if series:
+        overrides = Event.query.filter(
+            Event.recurrence_parent_id.in_([event.id for event in series])
+        ).order_by(Event.start_date).all()
+
+    # Ocorrências sobrescritas saem da série e entram como eventos avulsos (se tocarem a janela)
+    replaced = {}
+    for override in overrides:
+        replaced.setdefault(override.recurrence_parent_id, set()).add(override.recurrence_id)
+
+    def snapshot(event):
+        return EventOccurrence(event.to_dict(), event.start_date, event.end_date)
+
+    streams = [
+        (snapshot(event) for event in singles),
+        (snapshot(event) for event in overrides if event.end_date >= start_date and event.start_date <= end_date)
+    ]
+    for event in series:
+        skip = event.get_exdates() | replaced.get(event.id, set())
+        streams.append(iter_occurrences(event, start_date, end_date, skip))
+
+    return heapq.merge(*streams, key=lambda occurrence: occurrence.start_date)
+
+def _month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+def _next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def _iter_months(start_date, end_date):
+    month = _month_start(start_date)
+    while month <= end_date:
+        yield month
+        month = _next_month(month)
+
+def _load_months(user_id, months):
+    """Carrega meses consecutivos com uma única expansão e distribui as ocorrências por mês"""
+    start, end = months[0], _next_month(months[-1]) - timedelta(microseconds=1)
+    buckets = {month: [] for month in months}
+    for occurrence in iter_event_occurrences(user_id, start, end):
+        for month in _iter_months(max(occurrence.start_date, start), min(occurrence.end_date, end)):
+            buckets[month].append(occurrence)
+    return buckets
+
+def get_event_occurrences_cached(user_id, start_date, end_date):
+    """Ocorrências que tocam o período, montadas a partir dos meses em cache (só os meses ausentes vão ao banco)"""
+    user_id = int(user_id)
+    start_date, end_date = to_naive_utc(start_date), to_naive_utc(end_date)
+    months = list(_iter_months(start_date, end_date))
+    if len(months) > MAX_CACHED_MONTHS:
+        return list(iter_event_occurrences(user_id, start_date, end_date))
+
+    with _month_cache_lock:
+        generation = _month_generation.get(user_id, 0)
+        cached = _month_cache.get(user_id, {})
+        buckets = {month: cached.get(month) for month in months}
+
+    missing = [month for month in months if buckets[month] is None]
+    if missing:
+        # Agrupa meses ausentes consecutivos para carregá-los em uma só expansão
+        runs = [[missing[0]]]
+        for month in missing[1:]:
+            if month == _next_month(runs[-1][-1]):
+                runs[-1].append(month)
+            else:
+                runs.append([month])
+        loaded = {}
+        for run in runs:
+            loaded.update(_load_months(user_id, run))
+
+        with _month_cache_lock:
+            # Uma escrita durante a carga invalida o que foi lido: não guardar
+            if _month_generation.get(user_id, 0) == generation:
+                cached = _month_cache.setdefault(user_id, {})
+                for month, occurrences in loaded.items():
+                    cached[month] = tuple(occurrences)
+                # Descarta os meses inseridos há mais tempo
+                for month in list(cached)[:max(0, len(cached) - MAX_MONTHS_PER_USER)]:
+                    del cached[month]
+        buckets.update(loaded)
+
+    # Ocorrências que atravessam meses aparecem em mais de um bucket
+    seen = set()
+    occurrences = []
+    for month in months:
+        for occurrence in buckets[month]:
+            key = (occurrence.id, occurrence.start_date)
+            if key in seen or occurrence.end_date < start_date or occurrence.start_date > end_date:
+                continue
+            seen.add(key)
+            occurrences.append(occurrence)
+    occurrences.sort(key=lambda occurrence: (occurrence.start_date, occurrence.id))
+    return occurrences
+
+def _event_span(event):
+    """Período coberto pelo evento (fim None = série sem fim), usado para invalidar só os meses afetados"""
+    if event.recurrence_rule:
+        return event.start_date, event.recurrence_end
+    start, end = event.start_date, event.end_date
+    if event.recurrence_id is not None:
+        # A sobrescrita também afeta o mês da ocorrência original
+        start, end = min(start, event.recurrence_id), max(end, event.recurrence_id)
+    return start, end
+
+def invalidate_event_months(user_id, spans=None):
+    """Descarta os meses em cache que tocam os períodos informados (todos, se spans for None)"""
+    user_id = int(user_id)
+    with _month_cache_lock:
+        _month_generation[user_id] = _month_generation.get(user_id, 0) + 1
+        if spans is None:
+            _month_cache.pop(user_id, None)
+            return
+        cached = _month_cache.get(user_id)
+        if not cached:
+            return
+        for month in [month for month in cached if any(
+            (end is None or month <= end) and start < _next_month(month) for start, end in spans
+        )]:
+            del cached[month]
+
+def iter_events_by_user(user_id, batch_size=1000):
+    """Itera os eventos do usuário com cursor no servidor, sem carregar tudo em memória"""
+    query = Event.query.filter_by(user_id=user_id).order_by(Event.start_date, Event.id)
+    for event in query.yield_per(batch_size):
+        yield event.to_dict()
+
+def iter_events_for_calendar(user_id, batch_size=1000):
+    """Itera os eventos do usuário (séries sem expandir) como objetos, para o feed .ics"""
+    query = Event.query.filter_by(user_id=user_id).order_by(Event.start_date, Event.id)
+    return query.yield_per(batch_size)
+
+def bump_calendar_version(user_id):
+    """Incrementa a versão do calendário do usuário (ETag do feed) na transação corrente"""
+    db.session.execute(
+        update(Usuario).where(Usuario.id == user_id).values(calendar_version=Usuario.calendar_version + 1)
+    )
+
+def get_calendar_feed_token(user, rotate=False):
+    """Token da URL do feed; cria o segredo do usuário na primeira vez ou troca-o com rotate=True"""
+    if rotate or not user.calendar_feed_secret:
+        user.rotate_calendar_feed_secret()
+        db.session.commit()
+    return user.get_calendar_feed_token()
+
+def import_events(user_id, parsed_events):
+    """Insere os eventos lidos de um .ics em uma única transação; retorna a quantidade importada"""
+    rows = []
+    for number, data in enumerate(parsed_events, start=1):
+        # Objeto transitório só para validar a recorrência com as mesmas regras de create_event
+        event = Event(
+            user_id=user_id,
+            title=data['title'],
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            description=data.get('description'),
+            all_day=data.get('all_day', False)
+        )
+        event.recurrence_rule = data.get('recurrence_rule')
+        try:
+            _refresh_recurrence(event)
+        except ValueError as e:
+            raise ValueError(f"Evento {number}: {e}")
+        event.set_exdates(data.get('exdates') if event.recurrence_rule else None)
+        rows.append({
+            'user_id': user_id,
+            'title': event.title,
+            'description': event.description,
+            'start_date': event.start_date,
+            'end_date': event.end_date,
+            'all_day': event.all_day,
+            'color': data.get('color') or '#3b82f6',
+            'recurrence_rule': event.recurrence_rule,
+            'recurrence_end': event.recurrence_end,
+            'recurrence_exdates': event.recurrence_exdates
+        })
+    if not rows:
+        return 0
+
+    try:
+        last_id = db.session.query(func.max(Event.id)).scalar() or 0
+        db.session.execute(insert(Event), rows)
+        searchRepository.index_new_events(user_id, last_id)
+        bump_calendar_version(user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    invalidate_event_months(user_id)
+    invalidate_busy_index(user_id)
+    # Lembretes só para o que cai no horizonte do agendador; o resto entra nas próximas cargas
+    now = datetime.utcnow()
+    upcoming = Event.query.filter(
+        Event.user_id == user_id,
+        Event.id > last_id,
+        or_(
+            Event.recurrence_rule.isnot(None),
+            and_(Event.start_date > now, Event.start_date <= now + LOAD_HORIZON)
+        )
+    )
+    for event in upcoming:
+        reminder_scheduler.sync_event(event)
+    return len(rows)
+
 def update_event(event_id, **kwargs):
     """Atualiza um evento existente"""
     event = Event.query.get(event_id)
     if not event:
         return None
     
+    old_span = _event_span(event)
     for key, value in kwargs.items():
+        if key in ('start_date', 'end_date'):
+            value = to_naive_utc(value)
         if hasattr(event, key):
             setattr(event, key, value)
     
+    if {'recurrence_rule', 'start_date', 'end_date'} & set(kwargs):
+        _refresh_recurrence(event)
+    
+    searchRepository.index_event(event)
+    bump_calendar_version(event.user_id)
     db.session.commit()
+    invalidate_event_months(event.user_id, [old_span, _event_span(event)])
+    invalidate_busy_index(event.user_id)
+    reminder_scheduler.sync_event(event)
     return event
 
 def delete_event(event_id):
@@ -51,6 +339,200 @@ def delete_event(event_id):
     if not event:
         return False
     
+    user_id = event.user_id
+    span = _event_span(event)
+    # Ocorrências sobrescritas pertencem à série
+    override_ids = [row[0] for row in db.session.query(Event.id).filter_by(recurrence_parent_id=event_id)]
+    if override_ids:
+        searchRepository.remove_documents('event', override_ids)
+        Event.query.filter(Event.id.in_(override_ids)).delete(synchronize_session=False)
+    
+    searchRepository.remove_documents('event', [event_id])
     db.session.delete(event)
+    bump_calendar_version(user_id)
     db.session.commit()
+    invalidate_event_months(user_id, [span])
+    invalidate_busy_index(user_id)
+    reminder_scheduler.cancel_event(event_id)
+    for override_id in override_ids:
+        reminder_scheduler.cancel_event(override_id)
     return True
+
+def _check_occurrence(event, occurrence_start):
+    """Garante que occurrence_start é uma ocorrência real da série"""
+    if not event.recurrence_rule:
+        raise ValueError("O evento não é recorrente")
+    rule = parse_rrule(event.recurrence_rule)
+    for start in iter_starts(event.start_date, rule, after=occurrence_start - (event.end_date - event.start_date)):
+        if start == occurrence_start:
+            return
+        if start > occurrence_start:
+            break
+    raise ValueError("A data informada não corresponde a uma ocorrência da série")
+
+def _get_override(event_id, occurrence_start):
+    return Event.query.filter_by(recurrence_parent_id=event_id, recurrence_id=occurrence_start).first()
+
+def add_event_exception(event_id, occurrence_start):
+    """Cancela uma ocorrência da série (EXDATE), removendo uma eventual sobrescrita"""
+    occurrence_start = to_naive_utc(occurrence_start)
+    event = Event.query.get(event_id)
+    if not event:
+        return None
+    _check_occurrence(event, occurrence_start)
+
+    exdates = event.get_exdates()
+    exdates.add(occurrence_start)
+    event.set_exdates(exdates)
+
+    override = _get_override(event_id, occurrence_start)
+    if override is not None:
+        searchRepository.remove_documents('event', [override.id])
+        reminder_scheduler.cancel_event(override.id)
+        db.session.delete(override)
+
+    bump_calendar_version(event.user_id)
+    db.session.commit()
+    invalidate_event_months(event.user_id, [(occurrence_start, occurrence_start + (event.end_date - event.start_date))])
+    invalidate_busy_index(event.user_id)
+    reminder_scheduler.sync_event(event)
+    return event
+
+def save_event_override(event_id, occurrence_start, **kwargs):
+    """Cria ou atualiza a sobrescrita de uma única ocorrência da série"""
+    occurrence_start = to_naive_utc(occurrence_start)
+    event = Event.query.get(event_id)
+    if not event:
+        return None
+    _check_occurrence(event, occurrence_start)
+
+    override = _get_override(event_id, occurrence_start)
+    if override is None:
+        override = Event(
+            user_id=event.user_id,
+            title=event.title,
+            start_date=occurrence_start,
+            end_date=occurrence_start + (event.end_date - event.start_date),
+            description=event.description,
+            all_day=event.all_day,
+            color=event.color
+        )
+        override.recurrence_parent_id = event.id
+        override.recurrence_id = occurrence_start
+        db.session.add(override)
+    old_span = _event_span(override)
+
+    for key, value in kwargs.items():
+        if key in ('start_date', 'end_date'):
+            value = to_naive_utc(value)
+        if key in ('title', 'description', 'start_date', 'end_date', 'all_day', 'color'):
+            setattr(override, key, value)
+
+    db.session.flush()
+    searchRepository.index_event(override)
+    bump_calendar_version(event.user_id)
+    db.session.commit()
+    invalidate_event_months(event.user_id, [old_span, _event_span(override)])
+    invalidate_busy_index(event.user_id)
+    reminder_scheduler.sync_event(override)
+    reminder_scheduler.sync_event(event)
+    return override
+
+# Horários ocupados, livres e conflitos
+
+def invalidate_busy_index(user_id):
+    """Descarta o índice de horários ocupados do usuário (chamado após escrever eventos ou tarefas)"""
+    with _busy_cache_lock:
+        _busy_cache.pop(int(user_id), None)
+
+def _busy_span(start, end, all_day):
+    """Intervalo ocupado: eventos de dia inteiro vão das 00:00 do primeiro dia às 00:00 do dia seguinte ao último"""
+    if not all_day:
+        return start, end
+    return datetime.combine(start.date(), datetime.min.time()), datetime.combine(end.date(), datetime.min.time()) + timedelta(days=1)
+
+def _build_busy_index(user_id, start, end):
+    """Monta o índice com as ocorrências de eventos e os blocos de prazo das tarefas pendentes"""
+    entries = [
+        (*_busy_span(occurrence.start_date, occurrence.end_date, occurrence.all_day),
+         'event', occurrence.id, occurrence.title, occurrence.series_id)
+        for occurrence in iter_event_occurrences(user_id, start, end)
+    ]
+    tasks = Task.query.with_entities(Task.id, Task.title, Task.due_date).filter(
+        Task.user_id == user_id,
+        Task.completed.isnot(True),
+        Task.due_date >= start,
+        Task.due_date <= end + TASK_DUE_BLOCK
+    )
+    entries.extend((due_date - TASK_DUE_BLOCK, due_date, 'task', task_id, title, None) for task_id, title, due_date in tasks)
+    return BusyIndex(start, end, entries)
+
+def get_busy_index(user_id, start, end):
+    """Retorna um índice que cobre [start, end]; janelas dentro do horizonte padrão vêm do cache"""
+    user_id = int(user_id)
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    with _busy_cache_lock:
+        index = _busy_cache.get(user_id)
+    if index is not None and index.covers(start, end):
+        return index
+
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    horizon_start, horizon_end = today - BUSY_INDEX_PAST, today + BUSY_INDEX_FUTURE
+    if not (horizon_start <= start and end <= horizon_end):
+        # Fora do horizonte: índice avulso, sem cache
+        return _build_busy_index(user_id, start, end)
+
+    index = _build_busy_index(user_id, horizon_start, horizon_end)
+    with _busy_cache_lock:
+        _busy_cache[user_id] = index
+    return index
+
+def find_free_slots(user_id, start, end, min_minutes=30):
+    """Retorna os horários livres de pelo menos min_minutes dentro do período"""
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    index = get_busy_index(user_id, start, end)
+    return [
+        {
+            'start': slot_start.isoformat(),
+            'end': slot_end.isoformat(),
+            'minutes': int((slot_end - slot_start).total_seconds() // 60)
+        }
+        for slot_start, slot_end in index.free_slots(start, end, timedelta(minutes=min_minutes))
+    ]
+
+def find_conflicts(event):
+    """Eventos e prazos de tarefas que se sobrepõem ao evento (ou às próximas ocorrências da série)"""
+    if event.recurrence_rule:
+        window_start = max(event.start_date, datetime.utcnow())
+        window_end = datetime.utcnow() + BUSY_INDEX_FUTURE
+        if window_start > window_end:
+            return []
+        index = get_busy_index(event.user_id, window_start, window_end)
+        intervals = [
+            _busy_span(occurrence.start_date, occurrence.end_date, event.all_day)
+            for occurrence in iter_occurrences(event, window_start, window_end, event.get_exdates())
+        ]
+    else:
+        intervals = [_busy_span(event.start_date, event.end_date, event.all_day)]
+        index = get_busy_index(event.user_id, *intervals[0])
+
+    conflicts = []
+    seen = set()
+    for start, end in intervals:
+        for entry_start, entry_end, kind, entry_id, title, series_id in index.overlapping(start, end):
+            if kind == 'event' and event.id in (entry_id, series_id):
+                continue
+            key = (kind, entry_id, entry_start)
+            if key in seen:
+                continue
+            seen.add(key)
+            conflicts.append({
+                'type': kind,
+                'id': entry_id,
+                'title': title,
+                'start_date': entry_start.isoformat(),
+                'end_date': entry_end.isoformat()
+            })
+            if len(conflicts) >= MAX_CONFLICTS:
+                return conflicts
+    return conflicts
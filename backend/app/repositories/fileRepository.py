@@ -1,5 +1,7 @@
 from models.file import File
 from utils.db import db
+from repositories import searchRepository, folderRepository
+from utils.file_cleanup import remove_files_later
 import os
 
 
@@ -44,6 +46,9 @@ def create_file(user_id, original_filename, file_path, file_size, mime_type=None
         folder_id=folder_id
     )
     db.session.add(file_record)
+    db.session.flush()
+    folderRepository.apply_file_delta(folder_id, 1, file_size)
+    searchRepository.index_file(file_record)
     db.session.commit()
     return file_record
 
@@ -54,17 +59,18 @@ def delete_file(file_id):
     if not file_record:
         return False
     
-    # Deletar arquivo físico se existir
-    if os.path.exists(file_record.file_path):
-        try:
-            os.remove(file_record.file_path)
-            print(f"Arquivo físico deletado: {file_record.file_path}")
-        except Exception as e:
-            print(f"Erro ao deletar arquivo físico {file_record.file_path}: {e}")
+    path = file_record.file_path
+    try:
+        folderRepository.apply_file_delta(file_record.folder_id, -1, -file_record.file_size)
+        searchRepository.remove_documents('file', [file_id])
+        db.session.delete(file_record)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
     
-    # Deletar registro do banco
-    db.session.delete(file_record)
-    db.session.commit()
+    # Arquivo físico só é removido depois que o banco confirmou a exclusão
+    remove_files_later([path])
     return True
 
 
@@ -84,6 +90,8 @@ def move_file(file_id, subject_id=None, folder_id=None):
         file_record.subject_id = subject_id
     
     # folder_id pode ser None (mover para raiz da matéria)
+    if file_record.folder_id != folder_id:
+        folderRepository.apply_file_move(file_record.folder_id, folder_id, file_record.file_size)
     file_record.folder_id = folder_id
     
     db.session.commit()
@@ -122,12 +130,9 @@ def copy_file(file_id, user_id, subject_id=None, folder_id=None):
         folder_id=folder_id
     )
     db.session.add(new_file)
+    db.session.flush()
+    folderRepository.apply_file_delta(folder_id, 1, new_file.file_size)
+    searchRepository.index_file(new_file)
     db.session.commit()
     return new_file
 
-
-def delete_files_by_subject(subject_id):
-    """Deleta todos os arquivos de uma matéria"""
-    files = File.query.filter_by(subject_id=subject_id).all()
-    for file in files:
-        delete_file(file.id)
@@ -1,14 +1,19 @@
 from models.folder import Folder
 from models.file import File
 from utils.db import db
+from repositories import searchRepository
+from utils.file_cleanup import remove_files_later
 
 
 def create_folder(user_id, subject_id, name, parent_id=None, color='#6366f1'):
     """Cria uma nova pasta, verificando limite de profundidade"""
-    # Verificar profundidade máxima (10 níveis)
+    parent = None
     if parent_id is not None:
         parent = Folder.query.get(parent_id)
-        if parent and parent.get_depth() >= 9:  # Pai está no nível 9, filho ficaria no 10
+        if parent is None:
+            raise ValueError("Pasta pai não encontrada")
+        # Verificar profundidade máxima (10 níveis)
+        if parent.depth >= Folder.MAX_DEPTH:  # Pai está no nível 9, filho ficaria no 10
             raise ValueError("Limite máximo de 10 níveis de subpastas atingido")
     
     folder = Folder(
@@ -19,6 +24,11 @@ def create_folder(user_id, subject_id, name, parent_id=None, color='#6366f1'):
         color=color
     )
     db.session.add(folder)
+    db.session.flush()
+    # O caminho inclui o próprio id, então só pode ser montado depois do flush
+    folder.path = f"{parent.path if parent else '/'}{folder.id}/"
+    folder.depth = parent.depth + 1 if parent else 0
+    searchRepository.index_folder(folder)
     db.session.commit()
     return folder
 
@@ -35,66 +45,316 @@ def get_folders_by_subject(subject_id, parent_id=None):
     return query.order_by(Folder.name).all()
 
 
+def get_tree_version(subject_id):
+    """Última alteração e quantidade de pastas da matéria (usado no ETag da árvore)"""
+    return db.session.query(db.func.max(Folder.updated_at), db.func.count(Folder.id)).filter(
+        Folder.subject_id == subject_id
+    ).one()
+
+
+def get_file_counts_by_folder(subject_id):
+    """Quantidade de arquivos por pasta da matéria (chave None = raiz), com uma query agrupada"""
+    rows = db.session.query(File.folder_id, db.func.count(File.id)).filter(
+        File.subject_id == subject_id
+    ).group_by(File.folder_id)
+    return {folder_id: count for folder_id, count in rows}
+
+
+def get_subject_tree(subject_id, file_counts=None):
+    """Árvore completa de pastas da matéria, montada em O(n) a partir de uma única query"""
+    folders = Folder.query.filter_by(subject_id=subject_id).order_by(Folder.depth, Folder.name).all()
+    
+    nodes = {}
+    roots = []
+    # Ordenadas por profundidade: o pai sempre é visto antes dos filhos
+    for folder in folders:
+        node = folder.to_dict()
+        node['children'] = []
+        if file_counts is not None:
+            node['file_count'] = file_counts.get(folder.id, 0)
+        nodes[folder.id] = node
+        parent = nodes.get(folder.parent_id)
+        (parent['children'] if parent else roots).append(node)
+    return roots
+
+
 def get_folder_by_id(folder_id):
     """Busca uma pasta pelo ID"""
     return Folder.query.get(folder_id)
 
 
+def get_ancestors(folder):
+    """Ancestrais da pasta, da raiz até o pai, com uma única query pelos ids do caminho"""
+    ancestor_ids = folder.get_ancestor_ids()
+    if not ancestor_ids:
+        return []
+    return Folder.query.filter(Folder.id.in_(ancestor_ids)).order_by(Folder.depth).all()
+
+
+def _subtree_prefix(folder):
+    """Prefixo LIKE da subárvore; um caminho vazio casaria com todas as pastas"""
+    if not folder.path:
+        raise ValueError(f"Pasta {folder.id} sem caminho materializado")
+    return f'{folder.path}%'
+
+
+def get_descendants(folder):
+    """Todas as subpastas (em qualquer nível), com uma única query por prefixo do caminho"""
+    return Folder.query.filter(
+        Folder.path.like(_subtree_prefix(folder)),
+        Folder.id != folder.id
+    ).order_by(Folder.depth, Folder.name).all()
+
+
 def get_folder_path(folder_id):
     """Retorna o caminho completo (breadcrumb) de uma pasta"""
-    path = []
-    current = Folder.query.get(folder_id)
+    folder = Folder.query.get(folder_id)
+    if folder is None:
+        return []
     
-    while current is not None:
-        path.insert(0, {'id': current.id, 'name': current.name})
-        if current.parent_id:
-            current = Folder.query.get(current.parent_id)
-        else:
-            current = None
+    return [{'id': current.id, 'name': current.name} for current in get_ancestors(folder) + [folder]]
+
+
+def apply_file_delta(folder_id, files, size):
+    """Soma (sem commit) a variação de arquivos e bytes na pasta e em todos os ancestrais, com um único UPDATE"""
+    if folder_id is None or (not files and not size):
+        return
+    folder = Folder.query.get(folder_id)
+    if folder is None:
+        return
+    
+    Folder.query.filter(Folder.id.in_(folder.get_ancestor_ids() + [folder.id])).update({
+        Folder.total_files: Folder.total_files + files,
+        Folder.total_bytes: Folder.total_bytes + size,
+        Folder.direct_files: Folder.direct_files + db.case((Folder.id == folder.id, files), else_=0),
+        Folder.direct_bytes: Folder.direct_bytes + db.case((Folder.id == folder.id, size), else_=0)
+    }, synchronize_session=False)
+
+
+def _shift_totals(old_ids, new_ids, files, size, old_folder_id=None, new_folder_id=None):
+    """Transfere (sem commit) files/size dos contadores de old_ids para new_ids com um único UPDATE.
+
+    Só os totais da diferença simétrica mudam (ancestrais comuns ficam como estão);
+    old_folder_id/new_folder_id também ajustam os contadores diretos das pastas de origem e destino.
+    """
+    old_ids, new_ids = set(old_ids), set(new_ids)
+    removed, added = old_ids - new_ids, new_ids - old_ids
+    direct_ids = set()
+    if old_folder_id != new_folder_id:
+        direct_ids = {folder_id for folder_id in (old_folder_id, new_folder_id) if folder_id is not None}
+    if not (removed or added or direct_ids) or not (files or size):
+        return
     
-    return path
+    values = {
+        Folder.total_files: Folder.total_files + db.case((Folder.id.in_(removed), -files), (Folder.id.in_(added), files), else_=0),
+        Folder.total_bytes: Folder.total_bytes + db.case((Folder.id.in_(removed), -size), (Folder.id.in_(added), size), else_=0)
+    }
+    if direct_ids:
+        values[Folder.direct_files] = Folder.direct_files + db.case(
+            (Folder.id == old_folder_id, -files), (Folder.id == new_folder_id, files), else_=0
+        )
+        values[Folder.direct_bytes] = Folder.direct_bytes + db.case(
+            (Folder.id == old_folder_id, -size), (Folder.id == new_folder_id, size), else_=0
+        )
+    Folder.query.filter(Folder.id.in_(removed | added | direct_ids)).update(values, synchronize_session=False)
+
+
+def _folder_chain(folder_id):
+    """Ids da pasta e de todos os ancestrais (vazio para a raiz da matéria ou pasta inexistente)"""
+    folder = Folder.query.get(folder_id) if folder_id is not None else None
+    return folder.get_ancestor_ids() + [folder.id] if folder else []
+
+
+def apply_file_move(old_folder_id, new_folder_id, size):
+    """Move (sem commit) um arquivo entre pastas nos contadores, com um único UPDATE"""
+    _shift_totals(_folder_chain(old_folder_id), _folder_chain(new_folder_id), 1, size, old_folder_id, new_folder_id)
+
+
+def compute_folder_sizes():
+    """Calcula do zero os contadores de todas as pastas: {id: (direct_files, direct_bytes, total_files, total_bytes)}"""
+    direct = {
+        folder_id: (count, int(size or 0))
+        for folder_id, count, size in db.session.query(
+            File.folder_id, db.func.count(File.id), db.func.sum(File.file_size)
+        ).filter(File.folder_id.isnot(None)).group_by(File.folder_id)
+    }
+    paths = dict(db.session.query(Folder.id, Folder.path))
+    totals = {folder_id: [0, 0] for folder_id in paths}
+    for folder_id, (count, size) in direct.items():
+        # Cada arquivo conta para a própria pasta e para todos os ancestrais do caminho
+        for ancestor_id in (int(part) for part in (paths.get(folder_id) or '').strip('/').split('/') if part):
+            if ancestor_id in totals:
+                totals[ancestor_id][0] += count
+                totals[ancestor_id][1] += size
+    return {
+        folder_id: direct.get(folder_id, (0, 0)) + tuple(totals[folder_id])
+        for folder_id in paths
+    }
+
+
+def rebuild_folder_sizes(fix=True):
+    """Verifica os contadores de tamanho das pastas e corrige os divergentes; retorna (verificadas, divergentes)"""
+    expected = compute_folder_sizes()
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in db.session.query(
+            Folder.id, Folder.direct_files, Folder.direct_bytes, Folder.total_files, Folder.total_bytes
+        )
+    }
+    mismatched = [folder_id for folder_id, values in expected.items() if stored.get(folder_id) != values]
+    
+    if fix and mismatched:
+        db.session.execute(db.update(Folder), [
+            dict(zip(('id', 'direct_files', 'direct_bytes', 'total_files', 'total_bytes'),
+                     (folder_id,) + expected[folder_id]))
+            for folder_id in mismatched
+        ])
+        db.session.commit()
+    return len(expected), len(mismatched)
+
+
+def _lock_for_move(folder, new_parent):
+    """Bloqueia (FOR UPDATE, em ordem de id) a pasta, o destino e os ancestrais de ambos, relendo os caminhos.
+
+    Dois movimentos concorrentes que poderiam formar um ciclo disputam ao menos uma dessas linhas.
+    """
+    ids = {folder.id, *folder.get_ancestor_ids()}
+    if new_parent is not None:
+        ids.update([new_parent.id, *new_parent.get_ancestor_ids()])
+    Folder.query.filter(Folder.id.in_(ids)).order_by(Folder.id).with_for_update().populate_existing().all()
+
+
+def _move_subtree(folder, new_parent, subject_id=None):
+    """Reposiciona a pasta e toda a subárvore sob new_parent (ou na raiz de subject_id) sem commit.
+
+    Usa um número fixo de UPDATEs, independente do tamanho da subárvore.
+    """
+    subtree_prefix = _subtree_prefix(folder)
+    target_subject_id = new_parent.subject_id if new_parent else (subject_id or folder.subject_id)
+    if subject_id is not None and subject_id != target_subject_id:
+        raise ValueError("A pasta de destino pertence a outra matéria")
+    if new_parent is not None and new_parent.path.startswith(folder.path):
+        raise ValueError("Não é possível mover uma pasta para dentro dela mesma")
+    
+    old_prefix = folder.path
+    new_prefix = f"{new_parent.path if new_parent else '/'}{folder.id}/"
+    delta = (new_parent.depth + 1 if new_parent else 0) - folder.depth
+    
+    subtree = Folder.query.filter(Folder.path.like(subtree_prefix))
+    deepest = subtree.with_entities(db.func.max(Folder.depth)).scalar()
+    if deepest + delta > Folder.MAX_DEPTH:
+        raise ValueError("Limite máximo de 10 níveis de subpastas atingido")
+    
+    # Os totais da subárvore saem dos ancestrais antigos e entram nos novos (os comuns não mudam)
+    old_ancestors = set(folder.get_ancestor_ids())
+    new_ancestors = set(new_parent.get_ancestor_ids() + [new_parent.id]) if new_parent else set()
+    _shift_totals(old_ancestors, new_ancestors, folder.total_files, folder.total_bytes)
+    
+    values = {
+        Folder.path: db.literal(new_prefix, db.String) + db.func.substr(Folder.path, len(old_prefix) + 1, type_=db.String),
+        Folder.depth: Folder.depth + delta
+    }
+    if target_subject_id != folder.subject_id:
+        # Arquivos acompanham a subárvore (antes de mudar os caminhos usados no filtro)
+        File.query.filter(
+            File.folder_id.in_(db.session.query(Folder.id).filter(Folder.path.like(subtree_prefix)))
+        ).update({File.subject_id: target_subject_id}, synchronize_session=False)
+        values[Folder.subject_id] = target_subject_id
+    
+    subtree.update(values, synchronize_session=False)
+    folder.parent_id = new_parent.id if new_parent else None
+    folder.subject_id = target_subject_id
+    folder.path = new_prefix
+    folder.depth += delta
+
+
+def move_folder(folder_id, parent_id=None, subject_id=None):
+    """Move a pasta e toda a subárvore (inclusive para outra matéria) em uma única transação"""
+    folder = Folder.query.get(folder_id)
+    if not folder:
+        return None
+    
+    new_parent = None
+    if parent_id is not None:
+        new_parent = Folder.query.get(parent_id)
+        if new_parent is None or new_parent.user_id != folder.user_id:
+            raise ValueError("Pasta de destino não encontrada")
+    
+    try:
+        _lock_for_move(folder, new_parent)
+        _move_subtree(folder, new_parent, subject_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return folder
 
 
 def update_folder(folder_id, **kwargs):
-    """Atualiza uma pasta existente"""
+    """Atualiza uma pasta existente (mudar parent_id move a subárvore inteira, na mesma matéria)"""
     folder = Folder.query.get(folder_id)
     if not folder:
         return None
     
+    if 'parent_id' in kwargs and kwargs['parent_id'] != folder.parent_id:
+        parent_id = kwargs['parent_id']
+        new_parent = Folder.query.get(parent_id) if parent_id is not None else None
+        if parent_id is not None and new_parent is None:
+            raise ValueError("Pasta pai não encontrada")
+        _lock_for_move(folder, new_parent)
+        _move_subtree(folder, new_parent, folder.subject_id)
+    
     for key, value in kwargs.items():
-        if hasattr(folder, key) and key not in ['id', 'user_id', 'subject_id', 'created_at']:
+        if hasattr(folder, key) and key not in ['id', 'user_id', 'subject_id', 'parent_id', 'path', 'depth', 'created_at']:
             setattr(folder, key, value)
     
+    searchRepository.index_folder(folder)
     db.session.commit()
     return folder
 
 
+def delete_folder_tree(folder_ids, file_condition):
+    """Apaga em lote (sem commit) as pastas e os arquivos que satisfazem file_condition.
+
+    Retorna os caminhos físicos dos arquivos, que devem ser removidos só depois do commit.
+    """
+    file_ids = db.session.query(File.id).filter(file_condition)
+    paths = [row[0] for row in db.session.query(File.file_path).filter(file_condition)]
+
+    # Arquivos apagados que estão em pastas que continuam existindo (ex.: de outra matéria) saem dos contadores delas
+    outside = db.session.query(File.folder_id, db.func.count(File.id), db.func.sum(File.file_size)).filter(
+        file_condition, File.folder_id.isnot(None), File.folder_id.notin_(folder_ids)
+    ).group_by(File.folder_id).all()
+    for folder_id, count, size in outside:
+        apply_file_delta(folder_id, -count, -int(size or 0))
+
+    searchRepository.remove_documents('file', file_ids)
+    File.query.filter(file_condition).delete(synchronize_session=False)
+
+    if folder_ids:
+        searchRepository.remove_documents('folder', folder_ids)
+        # Soltar os filhos antes: o MySQL verifica a FK de parent_id linha a linha no DELETE
+        Folder.query.filter(Folder.id.in_(folder_ids)).update({Folder.parent_id: None}, synchronize_session=False)
+        Folder.query.filter(Folder.id.in_(folder_ids)).delete(synchronize_session=False)
+    return paths
+
+
 def delete_folder(folder_id):
-    """Deleta uma pasta e todo seu conteúdo (subpastas e arquivos)"""
+    """Deleta uma pasta e todo seu conteúdo (subpastas e arquivos) em uma única transação"""
     folder = Folder.query.get(folder_id)
     if not folder:
         return False
     
-    # Deletar recursivamente subpastas
-    subfolders = Folder.query.filter_by(parent_id=folder_id).all()
-    for subfolder in subfolders:
-        delete_folder(subfolder.id)
-    
-    # Deletar arquivos da pasta
-    from repositories import fileRepository
-    files = File.query.filter_by(folder_id=folder_id).all()
-    for file in files:
-        fileRepository.delete_file(file.id)
+    try:
+        folder_ids = [folder_id] + [row[0] for row in db.session.query(Folder.id).filter(
+            Folder.path.like(_subtree_prefix(folder)), Folder.id != folder_id
+        )]
+        paths = delete_folder_tree(folder_ids, File.folder_id.in_(folder_ids))
+        _shift_totals(folder.get_ancestor_ids(), [], folder.total_files, folder.total_bytes)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
     
-    # Deletar a pasta
-    db.session.delete(folder)
-    db.session.commit()
+    remove_files_later(paths)
     return True
-
-
-def delete_folders_by_subject(subject_id):
-    """Deleta todas as pastas de uma matéria (usado ao deletar matéria)"""
-    # Primeiro pegar pastas raiz e deletar recursivamente
-    root_folders = Folder.query.filter_by(subject_id=subject_id, parent_id=None).all()
-    for folder in root_folders:
-        delete_folder(folder.id)
@@ -0,0 +1,192 @@
+from models.study_daily_rollup import StudyDailyRollup
+from models.user_preferences import UserPreferences
+from models.usuario import Usuario
+from utils.db import db
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sortedcontainers import SortedList
+import threading
+
+PERIODS = ('weekly', 'monthly', 'all_time')
+
+# Rankings mantidos em memória e atualizados incrementalmente a cada sessão gravada
+_boards = {}
+_lock = threading.Lock()
+# Incrementada a cada escrita: um ranking carregado durante uma escrita não entra no cache
+_generation = 0
+
+class _Board:
+    """Ranking ordenado por minutos (desc) com atualização e busca de posição em O(log n)"""
+
+    def __init__(self, scores):
+        self.scores = dict(scores)
+        self.ranking = SortedList((-minutes, user_id) for user_id, minutes in self.scores.items())
+
+    def set(self, user_id, minutes):
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self.ranking.remove((-old, user_id))
+        if minutes > 0:
+            self.scores[user_id] = minutes
+            self.ranking.add((-minutes, user_id))
+
+    def add(self, user_id, minutes):
+        self.set(user_id, self.scores.get(user_id, 0) + minutes)
+
+    def remove(self, user_id):
+        self.set(user_id, 0)
+
+    def rank(self, user_id):
+        minutes = self.scores.get(user_id)
+        if minutes is None:
+            return None, 0
+        return self.ranking.bisect_left((-minutes, user_id)) + 1, minutes
+
+def _period_start(period, today):
+    if period == 'weekly':
+        return today - timedelta(days=today.weekday())
+    if period == 'monthly':
+        return today.replace(day=1)
+    return None
+
+def _load_board(period, start_date, user_id=None):
+    """Soma os minutos por usuário visível no período (uma query sobre o rollup)"""
+    query = db.session.query(
+        StudyDailyRollup.user_id,
+        func.sum(StudyDailyRollup.minutes)
+    ).outerjoin(
+        UserPreferences, UserPreferences.user_id == StudyDailyRollup.user_id
+    ).filter(
+        or_(UserPreferences.profile_visibility == 'public', UserPreferences.profile_visibility.is_(None))
+    )
+    if start_date is not None:
+        query = query.filter(StudyDailyRollup.date >= start_date)
+    if user_id is not None:
+        query = query.filter(StudyDailyRollup.user_id == user_id)
+
+    rows = query.group_by(StudyDailyRollup.user_id).all()
+    return _Board((user_id, int(minutes or 0)) for user_id, minutes in rows if minutes)
+
+def _get_board(period):
+    today = datetime.utcnow().date()
+    key = (period, _period_start(period, today))
+
+    with _lock:
+        board = _boards.get(key)
+        generation = _generation
+    if board is not None:
+        return board
+
+    board = _load_board(period, key[1])
+    with _lock:
+        # Descartar rankings de períodos que já terminaram
+        for stale in [k for k in _boards if k[0] == period and k != key]:
+            _boards.pop(stale, None)
+        if _generation != generation:
+            return board
+        return _boards.setdefault(key, board)
+
+def _bump_generation():
+    global _generation
+    _generation += 1
+
+def record_study_minutes(user_id, date, minutes):
+    """Atualiza incrementalmente os rankings carregados que cobrem a data da sessão"""
+    user_id, minutes = int(user_id), int(minutes)
+    with _lock:
+        _bump_generation()
+        boards = [
+            board for (period, start_date), board in _boards.items()
+            if start_date is None or date >= start_date
+        ]
+        known = any(user_id in board.scores for board in boards)
+    if not boards or (not known and not _is_visible(user_id)):
+        return
+
+    with _lock:
+        for board in boards:
+            board.add(user_id, minutes)
+
+def _is_visible(user_id):
+    visibility = db.session.query(UserPreferences.profile_visibility).filter_by(user_id=user_id).scalar()
+    return visibility in (None, 'public')
+
+def set_user_visibility(user_id, visibility):
+    """Remove o usuário dos rankings ao ficar privado; ao ficar público os rankings são recarregados"""
+    user_id = int(user_id)
+    with _lock:
+        _bump_generation()
+        if visibility == 'public':
+            _boards.clear()
+        else:
+            for board in _boards.values():
+                board.remove(user_id)
+
+def invalidate():
+    """Descarta todos os rankings"""
+    with _lock:
+        _bump_generation()
+        _boards.clear()
+
+def refresh_user(user_id):
+    """Recalcula só a pontuação do usuário nos rankings carregados (usado quando minutos dele são removidos)"""
+    user_id = int(user_id)
+    with _lock:
+        _bump_generation()
+        generation = _generation
+        keys = list(_boards)
+    for key in keys:
+        minutes = _load_board(key[0], key[1], user_id).scores.get(user_id, 0)
+        with _lock:
+            if _generation != generation:
+                # Outra escrita aconteceu durante a leitura: recarregar o ranking inteiro depois
+                _boards.pop(key, None)
+            elif key in _boards:
+                _boards[key].set(user_id, minutes)
+
+def get_leaderboard(user_id, period='weekly', page=1, per_page=20):
+    """Retorna uma página do ranking e a posição do usuário autenticado"""
+    if period not in PERIODS:
+        raise ValueError(f"Período inválido: {period}")
+
+    user_id = int(user_id)
+    board = _get_board(period)
+
+    offset = (page - 1) * per_page
+    with _lock:
+        entries = board.ranking[offset:offset + per_page]
+        total = len(board.ranking)
+        my_rank, my_minutes = board.rank(user_id)
+
+    users = {}
+    if entries:
+        users = {
+            row.id: row for row in db.session.query(
+                Usuario.id, Usuario.username, Usuario.nome_completo
+            ).filter(Usuario.id.in_([entry_user for _, entry_user in entries]))
+        }
+
+    ranking = []
+    for position, (negative_minutes, entry_user) in enumerate(entries, start=offset + 1):
+        user = users.get(entry_user)
+        ranking.append({
+            'rank': position,
+            'user_id': entry_user,
+            'username': user.username if user else None,
+            'nome_completo': user.nome_completo if user else None,
+            'total_minutes': -negative_minutes,
+            'total_hours': round(-negative_minutes / 60, 1)
+        })
+
+    return {
+        'period': period,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'ranking': ranking,
+        'me': {
+            'rank': my_rank,
+            'total_minutes': my_minutes,
+            'total_hours': round(my_minutes / 60, 1)
+        }
+    }
@@ -33,4 +33,8 @@ class PreferenceRepository:
                 setattr(prefs, field, data[field])
         
         db.session.commit()
+
+        if 'profile_visibility' in data:
+            from repositories import leaderboardRepository
+            leaderboardRepository.set_user_visibility(user_id, prefs.profile_visibility)
         return prefs
@@ -1,12 +1,104 @@
 from models.study_session import StudySession
+from models.study_daily_rollup import StudyDailyRollup
 from models.task import Task
 from models.subject import Subject
 from utils.db import db
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, case
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import IntegrityError
+from cachetools import TTLCache, LRUCache
+import numpy as np
+import threading
+import base64
+
+# Cache do resumo de progresso por usuário (invalidado nas escritas de sessões e tarefas)
+_summary_cache = TTLCache(maxsize=4096, ttl=300)  # user_id -> (data, resumo)
+_summary_cache_lock = threading.Lock()
+
+# Mapa de calor anual por usuário: um array uint16 de 366 posições (minutos por dia do ano)
+_heatmap_cache = LRUCache(maxsize=4096)  # user_id -> {ano: array}
+_heatmap_cache_lock = threading.Lock()
+# Cargas em andamento por usuário: uma escrita durante a carga marca o resultado como
+# desatualizado e ele não entra no cache (a entrada some quando a última carga termina)
+_heatmap_loads = {}  # user_id -> {'loads': n, 'dirty': bool}
+
+def _apply_rollup_delta(user_id, subject_id, date, minutes, session_count=1):
+    """Soma minutos/sessões ao agregado diário (sem commit, faz parte da transação atual)"""
+    if db.session.get_bind().dialect.name == 'mysql':
+        # Upsert atômico: duas transações criando a mesma linha não colidem na chave primária
+        statement = mysql_insert(StudyDailyRollup).values(
+            user_id=user_id, date=date, subject_id=subject_id,
+            minutes=minutes, session_count=session_count
+        )
+        db.session.execute(statement.on_duplicate_key_update(
+            minutes=StudyDailyRollup.minutes + statement.inserted.minutes,
+            session_count=StudyDailyRollup.session_count + statement.inserted.session_count
+        ))
+        return
+
+    if _update_rollup(user_id, subject_id, date, minutes, session_count):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(StudyDailyRollup(
+                user_id=user_id,
+                date=date,
+                subject_id=subject_id,
+                minutes=minutes,
+                session_count=session_count
+            ))
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        _update_rollup(user_id, subject_id, date, minutes, session_count)
+
+def _update_rollup(user_id, subject_id, date, minutes, session_count):
+    return StudyDailyRollup.query.filter_by(
+        user_id=user_id, date=date, subject_id=subject_id
+    ).update({
+        StudyDailyRollup.minutes: StudyDailyRollup.minutes + minutes,
+        StudyDailyRollup.session_count: StudyDailyRollup.session_count + session_count
+    }, synchronize_session=False)
+
+def rebuild_study_rollup(user_id=None):
+    """Reconstrói o agregado diário a partir das sessões de estudo"""
+    delete_query = StudyDailyRollup.query
+    source = select(
+        StudySession.user_id,
+        StudySession.date,
+        StudySession.subject_id,
+        func.sum(StudySession.duration_minutes),
+        func.count(StudySession.id)
+    )
+
+    if user_id is not None:
+        delete_query = delete_query.filter_by(user_id=user_id)
+        source = source.where(StudySession.user_id == user_id)
+
+    delete_query.delete(synchronize_session=False)
+    db.session.execute(
+        insert(StudyDailyRollup).from_select(
+            ['user_id', 'date', 'subject_id', 'minutes', 'session_count'],
+            source.group_by(StudySession.user_id, StudySession.date, StudySession.subject_id)
+        )
+    )
+    db.session.commit()
+
+    count_query = db.session.query(func.count()).select_from(StudyDailyRollup)
+    if user_id is not None:
+        count_query = count_query.filter(StudyDailyRollup.user_id == user_id)
+    return count_query.scalar()
 
 def create_study_session(user_id, subject_id, duration_minutes, date=None, notes=None):
-    """Cria uma nova sessão de estudo"""
+    """Cria uma nova sessão de estudo; levanta ValueError antes de gravar se os dados forem inválidos"""
+    subject_id, duration_minutes = _as_int(subject_id), _as_int(duration_minutes)
+    if subject_id is None or duration_minutes is None:
+        raise ValueError('subject_id e duration_minutes devem ser inteiros')
+    if duration_minutes <= 0:
+        raise ValueError('duration_minutes deve ser positivo')
+    if notes is not None and not isinstance(notes, str):
+        raise ValueError('notes deve ser texto')
+
     session = StudySession(
         user_id=user_id,
         subject_id=subject_id,
@@ -15,9 +107,165 @@ def create_study_session(user_id, subject_id, duration_minutes, date=None, notes
         notes=notes
     )
     db.session.add(session)
+    _apply_rollup_delta(user_id, subject_id, session.date, duration_minutes)
     db.session.commit()
+    invalidate_progress_cache(user_id)
+    _on_minutes_recorded(user_id, session.date, duration_minutes)
     return session
 
+def save_study_timer_sessions(entries):
+    """Grava checkpoints de cronômetros, cada entrada em seu próprio SAVEPOINT.
+
+    Cada entrada cria a sessão na primeira gravação e depois apenas atualiza a duração,
+    de modo que cada cronômetro gera no máximo uma linha. Retorna os ids das sessões,
+    com None nas entradas que falharam (ex.: matéria apagada durante o cronômetro).
+    """
+    session_ids = []
+    heatmap_deltas = []
+
+    try:
+        for entry in entries:
+            try:
+                with db.session.begin_nested():
+                    session = StudySession.query.get(entry['session_id']) if entry.get('session_id') else None
+                    if session is None:
+                        session = StudySession(
+                            user_id=entry['user_id'],
+                            subject_id=entry['subject_id'],
+                            duration_minutes=entry['minutes'],
+                            date=entry['date']
+                        )
+                        db.session.add(session)
+                        _apply_rollup_delta(session.user_id, session.subject_id, session.date, entry['minutes'])
+                        delta = entry['minutes']
+                    else:
+                        delta = entry['minutes'] - session.duration_minutes
+                        session.duration_minutes = entry['minutes']
+                        _apply_rollup_delta(session.user_id, session.subject_id, session.date, delta, 0)
+                    db.session.flush()
+            except Exception as e:
+                print(f"Erro ao gravar checkpoint do cronômetro do usuário {entry.get('user_id')}: {e}")
+                session_ids.append(None)
+                continue
+
+            session_ids.append(session.id)
+            heatmap_deltas.append((session.user_id, session.date, delta))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for user_id, date, delta in heatmap_deltas:
+        invalidate_progress_cache(user_id)
+        _on_minutes_recorded(user_id, date, delta)
+
+    return session_ids
+
+def _as_int(value):
+    """Inteiro exato (int, float sem parte fracionária ou texto numérico); None caso contrário"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_session_row(row, valid_subject_ids, today):
+    """Valida uma linha do lote; retorna (dados, erro)"""
+    if not isinstance(row, dict):
+        return None, 'Linha inválida: esperado um objeto JSON'
+
+    subject_id = row.get('subject_id')
+    duration_minutes = row.get('duration_minutes')
+    if not subject_id or not duration_minutes:
+        return None, 'Campos obrigatórios: subject_id, duration_minutes'
+
+    subject_id = _as_int(subject_id)
+    duration_minutes = _as_int(duration_minutes)
+    if subject_id is None or duration_minutes is None:
+        return None, 'subject_id e duration_minutes devem ser inteiros'
+
+    if duration_minutes <= 0:
+        return None, 'duration_minutes deve ser positivo'
+    if subject_id not in valid_subject_ids:
+        return None, 'Matéria não encontrada'
+
+    try:
+        date = datetime.fromisoformat(row['date']).date() if row.get('date') else today
+    except (TypeError, ValueError):
+        return None, 'Data inválida'
+
+    notes = row.get('notes')
+    if notes is not None and not isinstance(notes, str):
+        return None, 'notes deve ser texto'
+
+    return {
+        'subject_id': subject_id,
+        'duration_minutes': duration_minutes,
+        'date': date,
+        'notes': notes
+    }, None
+
+def create_study_sessions_bulk(user_id, rows):
+    """Cria várias sessões de estudo em uma única transação, retornando (criadas, erros por linha)"""
+    user_id = int(user_id)
+    today = datetime.utcnow().date()
+
+    # Validar todas as matérias do lote em uma única query
+    requested_ids = set()
+    for row in rows:
+        if isinstance(row, dict):
+            try:
+                requested_ids.add(int(row.get('subject_id')))
+            except (TypeError, ValueError):
+                pass
+
+    valid_subject_ids = set()
+    if requested_ids:
+        valid_subject_ids = {
+            subject_id for (subject_id,) in db.session.query(Subject.id).filter(
+                Subject.user_id == user_id,
+                Subject.id.in_(requested_ids)
+            )
+        }
+
+    values = []
+    errors = []
+    for index, row in enumerate(rows):
+        data, error = _parse_session_row(row, valid_subject_ids, today)
+        if error:
+            errors.append({'index': index, 'message': error})
+        else:
+            data['user_id'] = user_id
+            values.append(data)
+
+    if not values:
+        return 0, errors
+
+    # Consolidar os deltas do rollup por (data, matéria) antes de aplicar
+    deltas = {}
+    for data in values:
+        minutes, count = deltas.get((data['date'], data['subject_id']), (0, 0))
+        deltas[(data['date'], data['subject_id'])] = (minutes + data['duration_minutes'], count + 1)
+
+    try:
+        db.session.execute(insert(StudySession), values)
+        for (date, subject_id), (minutes, count) in deltas.items():
+            _apply_rollup_delta(user_id, subject_id, date, minutes, count)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    invalidate_progress_cache(user_id)
+    for (date, subject_id), (minutes, count) in deltas.items():
+        _on_minutes_recorded(user_id, date, minutes)
+
+    return len(values), errors
+
 def get_study_sessions_by_user(user_id, start_date=None, end_date=None):
     """Retorna sessões de estudo do usuário em um período"""
     query = StudySession.query.filter_by(user_id=user_id)
@@ -29,15 +277,27 @@ def get_study_sessions_by_user(user_id, start_date=None, end_date=None):
     
     return query.order_by(StudySession.date.desc()).all()
 
-def get_total_study_time(user_id, start_date=None, end_date=None):
-    """Retorna o total de horas estudadas em um período"""
-    query = db.session.query(func.sum(StudySession.duration_minutes)).filter_by(user_id=user_id)
+def iter_study_sessions_by_user(user_id, start_date=None, end_date=None, batch_size=1000):
+    """Itera as sessões de estudo do usuário com cursor no servidor, sem carregar tudo em memória"""
+    query = StudySession.query.filter_by(user_id=user_id)
     
     if start_date:
         query = query.filter(StudySession.date >= start_date)
     if end_date:
         query = query.filter(StudySession.date <= end_date)
     
+    for session in query.order_by(StudySession.date.desc(), StudySession.id.desc()).yield_per(batch_size):
+        yield session.to_dict()
+
+def get_total_study_time(user_id, start_date=None, end_date=None):
+    """Retorna o total de horas estudadas em um período"""
+    query = db.session.query(func.sum(StudyDailyRollup.minutes)).filter(StudyDailyRollup.user_id == user_id)
+    
+    if start_date:
+        query = query.filter(StudyDailyRollup.date >= start_date)
+    if end_date:
+        query = query.filter(StudyDailyRollup.date <= end_date)
+    
     total_minutes = query.scalar() or 0
     return total_minutes
 
@@ -47,17 +307,17 @@ def get_study_time_by_subject(user_id, start_date=None, end_date=None):
         Subject.id,
         Subject.name,
         Subject.color,
-        func.sum(StudySession.duration_minutes).label('total_minutes')
+        func.sum(StudyDailyRollup.minutes).label('total_minutes')
     ).join(
-        StudySession, Subject.id == StudySession.subject_id
+        StudyDailyRollup, Subject.id == StudyDailyRollup.subject_id
     ).filter(
-        StudySession.user_id == user_id
+        StudyDailyRollup.user_id == user_id
     )
     
     if start_date:
-        query = query.filter(StudySession.date >= start_date)
+        query = query.filter(StudyDailyRollup.date >= start_date)
     if end_date:
-        query = query.filter(StudySession.date <= end_date)
+        query = query.filter(StudyDailyRollup.date <= end_date)
     
     query = query.group_by(Subject.id, Subject.name, Subject.color)
     
@@ -79,13 +339,13 @@ def get_study_time_by_day(user_id, days=7):
     start_date = end_date - timedelta(days=days-1)
     
     query = db.session.query(
-        StudySession.date,
-        func.sum(StudySession.duration_minutes).label('total_minutes')
+        StudyDailyRollup.date,
+        func.sum(StudyDailyRollup.minutes).label('total_minutes')
     ).filter(
-        StudySession.user_id == user_id,
-        StudySession.date >= start_date,
-        StudySession.date <= end_date
-    ).group_by(StudySession.date).order_by(StudySession.date)
+        StudyDailyRollup.user_id == user_id,
+        StudyDailyRollup.date >= start_date,
+        StudyDailyRollup.date <= end_date
+    ).group_by(StudyDailyRollup.date).order_by(StudyDailyRollup.date)
     
     results = query.all()
     
@@ -110,42 +370,123 @@ def get_study_time_by_day(user_id, days=7):
         for date, minutes in sorted(date_dict.items())
     ]
 
-def get_current_streak(user_id):
-    """Retorna a sequência atual de dias consecutivos de estudo"""
-    today = datetime.utcnow().date()
-    streak = 0
-    current_date = today
-    
-    while True:
-        # Verificar se há sessões de estudo neste dia
-        session_count = StudySession.query.filter_by(
-            user_id=user_id
-        ).filter(
-            StudySession.date == current_date
-        ).count()
-        
-        if session_count > 0:
-            streak += 1
-            current_date -= timedelta(days=1)
+TIMESERIES_GRANULARITIES = ('day', 'week', 'month')
+
+def _bucket_dates(dates, granularity):
+    """Converte um array datetime64[D] para o início do seu período"""
+    if granularity == 'week':
+        # 1970-01-01 foi uma quinta-feira: desloca cada data para a segunda-feira da semana
+        return dates - (dates.astype('int64') + 3) % 7
+    if granularity == 'month':
+        return dates.astype('datetime64[M]')
+    return dates
+
+def get_study_timeseries(user_id, granularity='day', start_date=None, end_date=None, subject_id=None):
+    """Retorna a série temporal de estudo em formato colunar, agrupada por dia, semana ou mês"""
+    if granularity not in TIMESERIES_GRANULARITIES:
+        raise ValueError(f"Granularidade inválida: {granularity}")
+
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise ValueError("A data inicial deve ser anterior à data final")
+
+    query = db.session.query(
+        StudyDailyRollup.date,
+        StudyDailyRollup.subject_id,
+        func.sum(StudyDailyRollup.minutes)
+    ).filter(
+        StudyDailyRollup.user_id == user_id,
+        StudyDailyRollup.date >= start_date,
+        StudyDailyRollup.date <= end_date
+    )
+    if subject_id is not None:
+        query = query.filter(StudyDailyRollup.subject_id == subject_id)
+
+    rows = query.group_by(StudyDailyRollup.date, StudyDailyRollup.subject_id).all()
+
+    # Eixo completo de períodos (inclui os períodos sem estudo)
+    first = _bucket_dates(np.array([start_date], dtype='datetime64[D]'), granularity)[0]
+    last = _bucket_dates(np.array([end_date], dtype='datetime64[D]'), granularity)[0]
+    step = 7 if granularity == 'week' else 1
+    buckets = np.arange(first, last + 1, step)
+
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    subjects = np.array([row[1] for row in rows], dtype=np.int64)
+    minutes = np.array([row[2] or 0 for row in rows], dtype=np.int64)
+
+    positions = ((_bucket_dates(dates, granularity) - first).astype('int64') // step).astype(np.intp)
+    total_minutes = np.bincount(positions, weights=minutes, minlength=len(buckets)).astype(np.int64)
+
+    subject_ids, subject_positions = np.unique(subjects, return_inverse=True)
+    minutes_by_subject = np.zeros((len(subject_ids), len(buckets)), dtype=np.int64)
+    np.add.at(minutes_by_subject, (subject_positions, positions), minutes)
+
+    return {
+        'granularity': granularity,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'buckets': np.datetime_as_string(buckets).tolist(),
+        'total_minutes': total_minutes.tolist(),
+        'subject_ids': subject_ids.tolist(),
+        'minutes_by_subject': minutes_by_subject.tolist()
+    }
+
+def _get_study_dates(user_id):
+    """Retorna as datas distintas com estudo do usuário, em ordem crescente (uma única query)"""
+    rows = db.session.query(StudyDailyRollup.date).filter(
+        StudyDailyRollup.user_id == user_id,
+        StudyDailyRollup.session_count > 0
+    ).distinct().order_by(StudyDailyRollup.date).all()
+    return [row[0] for row in rows]
+
+def _compute_streaks(dates, today):
+    """Agrupa datas ordenadas em sequências de dias consecutivos (gaps-and-islands)"""
+    islands = []
+    for date in dates:
+        if islands and date - islands[-1][1] == timedelta(days=1):
+            islands[-1][1] = date
         else:
-            # Se não há sessão hoje, verificar ontem
-            if current_date == today:
-                current_date -= timedelta(days=1)
-                continue
-            else:
-                break
-    
-    return streak
+            islands.append([date, date])
 
-def get_weekly_goal_progress(user_id, weekly_goal_hours=20):
-    """Retorna o progresso da meta semanal"""
-    # Calcular início da semana (segunda-feira)
+    current_streak = 0
+    # A sequência atual pode terminar hoje ou ontem (ainda não estudou hoje)
+    if islands and islands[-1][1] >= today - timedelta(days=1):
+        current_streak = (islands[-1][1] - islands[-1][0]).days + 1
+
+    longest_streak = max(((end - start).days + 1 for start, end in islands), default=0)
+
+    history = [
+        {
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'length': (end - start).days + 1
+        }
+        for start, end in reversed(islands)
+    ]
+
+    return {
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'history': history
+    }
+
+def get_streak_stats(user_id, history_limit=None):
+    """Retorna sequência atual, maior sequência e histórico de sequências do usuário"""
+    if history_limit is not None and history_limit < 0:
+        raise ValueError("history_limit não pode ser negativo")
     today = datetime.utcnow().date()
-    start_of_week = today - timedelta(days=today.weekday())
-    
-    total_minutes = get_total_study_time(user_id, start_of_week, today)
+    stats = _compute_streaks(_get_study_dates(user_id), today)
+    if history_limit is not None:
+        stats['history'] = stats['history'][:history_limit]
+    return stats
+
+def get_current_streak(user_id):
+    """Retorna a sequência atual de dias consecutivos de estudo"""
+    return get_streak_stats(user_id, history_limit=0)['current_streak']
+
+def _format_weekly_goal(total_minutes, weekly_goal_hours):
     total_hours = total_minutes / 60
-    
     progress_percentage = min(100, (total_hours / weekly_goal_hours) * 100)
     
     return {
@@ -155,12 +496,7 @@ def get_weekly_goal_progress(user_id, weekly_goal_hours=20):
         'remaining_hours': max(0, round(weekly_goal_hours - total_hours, 1))
     }
 
-def get_daily_average(user_id, days=7):
-    """Retorna a média diária de estudo"""
-    end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=days-1)
-    
-    total_minutes = get_total_study_time(user_id, start_date, end_date)
+def _format_daily_average(total_minutes, days):
     average_minutes = total_minutes / days
     
     return {
@@ -168,38 +504,192 @@ def get_daily_average(user_id, days=7):
         'average_hours': round(average_minutes / 60, 1)
     }
 
-def get_progress_summary(user_id):
-    """Retorna um resumo completo do progresso do usuário"""
-    # Total de horas (todo o tempo)
-    total_minutes_all_time = get_total_study_time(user_id)
-    total_hours_all_time = total_minutes_all_time / 60
-    
-    # Sequência atual
-    current_streak = get_current_streak(user_id)
-    
-    # Tarefas concluídas
-    completed_tasks = Task.query.filter_by(user_id=user_id, completed=True).count()
-    
-    # Média diária
-    daily_avg = get_daily_average(user_id, days=7)
-    
-    # Meta semanal
-    weekly_goal = get_weekly_goal_progress(user_id)
+def get_weekly_goal_progress(user_id, weekly_goal_hours=20):
+    """Retorna o progresso da meta semanal"""
+    # Calcular início da semana (segunda-feira)
+    today = datetime.utcnow().date()
+    start_of_week = today - timedelta(days=today.weekday())
     
-    # Tempo por matéria (último mês)
+    total_minutes = get_total_study_time(user_id, start_of_week, today)
+    return _format_weekly_goal(total_minutes, weekly_goal_hours)
+
+def get_daily_average(user_id, days=7):
+    """Retorna a média diária de estudo"""
     end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=30)
-    time_by_subject = get_study_time_by_subject(user_id, start_date, end_date)
-    
-    # Tempo por dia (última semana)
-    time_by_day = get_study_time_by_day(user_id, days=7)
+    start_date = end_date - timedelta(days=days-1)
     
+    total_minutes = get_total_study_time(user_id, start_date, end_date)
+    return _format_daily_average(total_minutes, days)
+
+def invalidate_progress_cache(user_id):
+    """Descarta o resumo em cache do usuário (chamado após escrever sessões ou tarefas)"""
+    user_id = int(user_id)
+    with _summary_cache_lock:
+        _summary_cache.pop(user_id, None)
+
+def _build_progress_summary(user_id, today):
+    """Calcula todas as janelas do resumo em uma única agregação sobre o rollup"""
+    week_start = today - timedelta(days=6)
+    month_start = today - timedelta(days=30)
+    start_of_week = today - timedelta(days=today.weekday())
+    days = [week_start + timedelta(days=i) for i in range(7)]
+
+    def window_sum(column, start, end=today):
+        return func.sum(case(
+            (StudyDailyRollup.date.between(start, end), column),
+            else_=0
+        ))
+
+    rows = db.session.query(
+        Subject.id,
+        Subject.name,
+        Subject.color,
+        func.sum(StudyDailyRollup.minutes),
+        window_sum(StudyDailyRollup.minutes, week_start),
+        window_sum(StudyDailyRollup.minutes, start_of_week),
+        window_sum(StudyDailyRollup.minutes, month_start),
+        window_sum(StudyDailyRollup.session_count, month_start),
+        *[window_sum(StudyDailyRollup.minutes, day, day) for day in days]
+    ).join(
+        StudyDailyRollup, Subject.id == StudyDailyRollup.subject_id
+    ).filter(
+        StudyDailyRollup.user_id == user_id
+    ).group_by(Subject.id, Subject.name, Subject.color).all()
+
+    total_minutes_all_time = 0
+    last_7_days_minutes = 0
+    this_week_minutes = 0
+    minutes_by_day = [0] * len(days)
+    time_by_subject = []
+
+    for row in rows:
+        total_minutes_all_time += row[3] or 0
+        last_7_days_minutes += row[4] or 0
+        this_week_minutes += row[5] or 0
+        for i, minutes in enumerate(row[8:]):
+            minutes_by_day[i] += minutes or 0
+
+        if row[7]:
+            time_by_subject.append({
+                'subject_id': row[0],
+                'subject_name': row[1],
+                'color': row[2],
+                'total_minutes': row[6] or 0,
+                'total_hours': round((row[6] or 0) / 60, 1)
+            })
+
+    completed_tasks = Task.query.filter_by(user_id=user_id, completed=True).count()
+
     return {
-        'total_hours': round(total_hours_all_time, 1),
-        'current_streak': current_streak,
+        'total_hours': round(total_minutes_all_time / 60, 1),
+        'current_streak': _compute_streaks(_get_study_dates(user_id), today)['current_streak'],
         'completed_tasks': completed_tasks,
-        'daily_average': daily_avg,
-        'weekly_goal': weekly_goal,
+        'daily_average': _format_daily_average(last_7_days_minutes, len(days)),
+        'weekly_goal': _format_weekly_goal(this_week_minutes, 20),
         'time_by_subject': time_by_subject,
-        'time_by_day': time_by_day
+        'time_by_day': [
+            {
+                'date': day.isoformat(),
+                'total_minutes': minutes,
+                'total_hours': round(minutes / 60, 1)
+            }
+            for day, minutes in zip(days, minutes_by_day)
+        ]
+    }
+
+def get_progress_summary(user_id):
+    """Retorna um resumo completo do progresso do usuário"""
+    user_id = int(user_id)
+    today = datetime.utcnow().date()
+
+    with _summary_cache_lock:
+        cached = _summary_cache.get(user_id)
+    # O resumo guardado vale só para o dia em que foi calculado
+    if cached is not None and cached[0] == today:
+        return cached[1]
+
+    summary = _build_progress_summary(user_id, today)
+    with _summary_cache_lock:
+        _summary_cache[user_id] = (today, summary)
+    return summary
+
+def _on_minutes_recorded(user_id, date, minutes):
+    """Propaga minutos já gravados para as estruturas em memória (mapa de calor e rankings)"""
+    from repositories import leaderboardRepository
+    _record_heatmap_minutes(user_id, date, minutes)
+    leaderboardRepository.record_study_minutes(user_id, date, minutes)
+
+def _record_heatmap_minutes(user_id, date, minutes):
+    """Atualiza incrementalmente o mapa de calor em cache, se já estiver carregado"""
+    user_id = int(user_id)
+    with _heatmap_cache_lock:
+        _mark_heatmap_dirty(user_id)
+        heatmap = _heatmap_cache.get(user_id, {}).get(date.year)
+        if heatmap is not None:
+            slot = date.timetuple().tm_yday - 1
+            heatmap[slot] = max(0, min(np.iinfo(np.uint16).max, int(heatmap[slot]) + minutes))
+
+def invalidate_heatmap_cache(user_id):
+    """Descarta os mapas de calor em cache do usuário"""
+    user_id = int(user_id)
+    with _heatmap_cache_lock:
+        _mark_heatmap_dirty(user_id)
+        _heatmap_cache.pop(user_id, None)
+
+def _mark_heatmap_dirty(user_id):
+    loading = _heatmap_loads.get(user_id)
+    if loading is not None:
+        loading['dirty'] = True
+
+def _load_heatmap(user_id, year):
+    """Monta o array de minutos por dia do ano a partir do rollup (no máximo 366 linhas)"""
+    rows = db.session.query(
+        StudyDailyRollup.date,
+        func.sum(StudyDailyRollup.minutes)
+    ).filter(
+        StudyDailyRollup.user_id == user_id,
+        StudyDailyRollup.date >= datetime(year, 1, 1).date(),
+        StudyDailyRollup.date <= datetime(year, 12, 31).date()
+    ).group_by(StudyDailyRollup.date).all()
+
+    heatmap = np.zeros(366, dtype=np.uint16)
+    if rows:
+        slots = np.array([date.timetuple().tm_yday - 1 for date, _ in rows], dtype=np.intp)
+        minutes = np.array([total or 0 for _, total in rows], dtype=np.int64)
+        heatmap[slots] = np.minimum(minutes, np.iinfo(np.uint16).max)
+    return heatmap
+
+def get_study_heatmap(user_id, year=None):
+    """Retorna o mapa de calor anual (minutos por dia) codificado em base64"""
+    user_id = int(user_id)
+    year = year or datetime.utcnow().year
+
+    with _heatmap_cache_lock:
+        heatmap = _heatmap_cache.get(user_id, {}).get(year)
+        payload = heatmap.astype('<u2').tobytes() if heatmap is not None else None
+        if payload is None:
+            loading = _heatmap_loads.setdefault(user_id, {'loads': 0, 'dirty': False})
+            loading['loads'] += 1
+
+    if payload is None:
+        heatmap = None
+        try:
+            heatmap = _load_heatmap(user_id, year)
+        finally:
+            with _heatmap_cache_lock:
+                loading['loads'] -= 1
+                if heatmap is not None:
+                    if not loading['dirty']:
+                        heatmap = _heatmap_cache.setdefault(user_id, {}).setdefault(year, heatmap)
+                    payload = heatmap.astype('<u2').tobytes()
+                if not loading['loads']:
+                    _heatmap_loads.pop(user_id, None)
+
+    days_in_year = 366 if datetime(year, 12, 31).timetuple().tm_yday == 366 else 365
+    return {
+        'year': year,
+        'start_date': datetime(year, 1, 1).date().isoformat(),
+        'days': days_in_year,
+        'dtype': 'uint16le',
+        'minutes': base64.b64encode(payload).decode('ascii')
     }
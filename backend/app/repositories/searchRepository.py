@@ -0,0 +1,148 @@
+from models.search_document import SearchDocument
+from utils.db import db
+from sqlalchemy import or_
+from sqlalchemy.dialects.mysql import match
+from markupsafe import escape
+import re
+
+SNIPPET_RADIUS = 60
+MAX_RESULTS = 50
+
+def _upsert(user_id, entity_type, entity_id, title, body=None):
+    """Insere ou atualiza o documento da entidade (sem commit, faz parte da transação atual)"""
+    document = SearchDocument.query.filter_by(entity_type=entity_type, entity_id=entity_id).first()
+    if document is None:
+        db.session.add(SearchDocument(user_id, entity_type, entity_id, (title or '')[:255], body))
+    else:
+        document.user_id = user_id
+        document.title = (title or '')[:255]
+        document.body = body
+
+def index_subject(subject):
+    _upsert(subject.user_id, 'subject', subject.id, subject.name, subject.description)
+
+def index_task(task):
+    _upsert(task.user_id, 'task', task.id, task.title, task.description)
+
+def index_event(event):
+    _upsert(event.user_id, 'event', event.id, event.title, event.description)
+
+def index_folder(folder):
+    _upsert(folder.user_id, 'folder', folder.id, folder.name)
+
+def index_file(file_record):
+    _upsert(file_record.user_id, 'file', file_record.id, file_record.original_filename)
+
+def _insert_documents(entity_type, model, title_column, body_column, *conditions):
+    """Indexa em um único INSERT ... SELECT as entidades que ainda não têm documento"""
+    missing = db.session.query(SearchDocument.id).filter(
+        SearchDocument.entity_type == entity_type,
+        SearchDocument.entity_id == model.id
+    ).exists()
+    body = body_column if body_column is not None else db.null()
+    select_new = db.select(
+        model.user_id, db.literal(entity_type), model.id, db.func.substr(title_column, 1, 255), body, db.func.now()
+    ).where(~missing, *conditions)
+    db.session.execute(
+        db.insert(SearchDocument).from_select(
+            ['user_id', 'entity_type', 'entity_id', 'title', 'body', 'updated_at'], select_new
+        )
+    )
+
+def index_new_events(user_id, min_event_id):
+    """Indexa em um único INSERT ... SELECT os eventos do usuário criados com id > min_event_id"""
+    from models.event import Event
+
+    _insert_documents('event', Event, Event.title, Event.description, Event.user_id == user_id, Event.id > min_event_id)
+
+def remove_documents(entity_type, entity_ids):
+    """Remove os documentos das entidades informadas (ids ou subquery de ids)"""
+    SearchDocument.query.filter(
+        SearchDocument.entity_type == entity_type,
+        SearchDocument.entity_id.in_(entity_ids)
+    ).delete(synchronize_session=False)
+
+def rebuild_search_index():
+    """Reconstrói o índice de busca a partir de todas as entidades (um INSERT ... SELECT por tipo)"""
+    from models import Subject, Task, Event, Folder, File
+
+    SearchDocument.query.delete()
+    _insert_documents('subject', Subject, Subject.name, Subject.description)
+    _insert_documents('task', Task, Task.title, Task.description)
+    _insert_documents('event', Event, Event.title, Event.description)
+    _insert_documents('folder', Folder, Folder.name, None)
+    _insert_documents('file', File, File.original_filename, None)
+    db.session.commit()
+    return SearchDocument.query.count()
+
+def _highlight(value, terms):
+    """Escapa o texto e marca os termos encontrados com <mark>"""
+    if not value:
+        return value
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    result = []
+    last = 0
+    for match in pattern.finditer(value):
+        result.append(str(escape(value[last:match.start()])))
+        result.append(f'<mark>{escape(match.group(0))}</mark>')
+        last = match.end()
+    result.append(str(escape(value[last:])))
+    return ''.join(result)
+
+def _snippet(body, terms):
+    """Recorta um trecho do corpo ao redor do primeiro termo encontrado"""
+    if not body:
+        return None
+    lowered = body.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - SNIPPET_RADIUS) if positions else 0
+    end = min(len(body), start + 2 * SNIPPET_RADIUS)
+    snippet = body[start:end]
+    return ('…' if start > 0 else '') + _highlight(snippet, terms) + ('…' if end < len(body) else '')
+
+def search(user_id, query, entity_types=None, limit=MAX_RESULTS):
+    """Busca textual ranqueada nos documentos do usuário, com destaques"""
+    terms = [term for term in re.split(r'\s+', query.strip()) if term]
+    if not terms:
+        return []
+
+    documents = SearchDocument.query.filter(SearchDocument.user_id == user_id)
+    if entity_types:
+        documents = documents.filter(SearchDocument.entity_type.in_(entity_types))
+
+    if db.session.get_bind().dialect.name == 'mysql':
+        # Índice FULLTEXT do MySQL faz a busca e o ranqueamento
+        score = match(SearchDocument.title, SearchDocument.body, against=query).in_natural_language_mode()
+        rows = documents.add_columns(score.label('score')).filter(score > 0).order_by(
+            score.desc()
+        ).limit(limit).all()
+        scored = [(document, float(value)) for document, value in rows]
+    else:
+        # Fallback (ex.: SQLite em desenvolvimento): LIKE por termo e pontuação simples
+        conditions = []
+        for term in terms:
+            like = f'%{term}%'
+            conditions.append(or_(SearchDocument.title.ilike(like), SearchDocument.body.ilike(like)))
+        candidates = documents.filter(or_(*conditions)).limit(limit * 4).all()
+
+        scored = []
+        for document in candidates:
+            title = document.title.lower()
+            body = (document.body or '').lower()
+            value = sum(3 * title.count(term.lower()) + body.count(term.lower()) for term in terms)
+            scored.append((document, float(value)))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        scored = scored[:limit]
+
+    return [
+        {
+            'type': document.entity_type,
+            'id': document.entity_id,
+            'title': document.title,
+            'title_highlight': _highlight(document.title, terms),
+            'snippet': _snippet(document.body, terms),
+            'score': round(value, 3)
+        }
+        for document, value in scored
+    ]
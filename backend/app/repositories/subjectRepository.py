@@ -1,7 +1,15 @@
 from models.subject import Subject
 from models.study_session import StudySession
+from models.study_daily_rollup import StudyDailyRollup
 from models.task import Task
+from models.folder import Folder
+from models.file import File
 from utils.db import db
+from datetime import datetime, timedelta
+from utils.file_cleanup import remove_files_later
+from utils.reminders import reminder_scheduler
+from repositories import searchRepository
+from sqlalchemy import and_, case, func, or_
 
 def create_subject(user_id, name, color='#3b82f6', icon='BookOpen', description=None):
     """Cria uma nova matéria"""
@@ -13,6 +21,8 @@ def create_subject(user_id, name, color='#3b82f6', icon='BookOpen', description=
         description=description
     )
     db.session.add(subject)
+    db.session.flush()
+    searchRepository.index_subject(subject)
     db.session.commit()
     return subject
 
@@ -24,6 +34,78 @@ def get_subjects_by_user(user_id):
     """Busca todas as matérias de um usuário"""
     return Subject.query.filter_by(user_id=user_id).order_by(Subject.name).all()
 
+def get_subjects_overview(user_id):
+    """Resumo de todas as matérias do usuário em uma única query (subconsultas agregadas por matéria)
+
+    open_tasks inclui as atrasadas (overdue_tasks é um subconjunto).
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    week_start = today - timedelta(days=today.weekday())
+
+    tasks = db.session.query(
+        Task.subject_id.label('subject_id'),
+        func.sum(case((Task.completed.isnot(True), 1), else_=0)).label('open_tasks'),
+        func.sum(case((and_(Task.completed.isnot(True), Task.due_date < now), 1), else_=0)).label('overdue_tasks'),
+        func.sum(case((Task.completed.is_(True), 1), else_=0)).label('done_tasks'),
+        func.max(Task.updated_at).label('last_activity')
+    ).filter(Task.user_id == user_id).group_by(Task.subject_id).subquery()
+
+    files = db.session.query(
+        File.subject_id.label('subject_id'),
+        func.count(File.id).label('file_count'),
+        func.sum(File.file_size).label('bytes_used'),
+        func.max(File.created_at).label('last_activity')
+    ).filter(File.user_id == user_id).group_by(File.subject_id).subquery()
+
+    folders = db.session.query(
+        Folder.subject_id.label('subject_id'),
+        func.count(Folder.id).label('folder_count'),
+        func.max(Folder.updated_at).label('last_activity')
+    ).filter(Folder.user_id == user_id).group_by(Folder.subject_id).subquery()
+
+    study = db.session.query(
+        StudyDailyRollup.subject_id.label('subject_id'),
+        func.sum(case((StudyDailyRollup.date >= week_start, StudyDailyRollup.minutes), else_=0)).label('week_minutes'),
+        func.max(case((StudyDailyRollup.session_count > 0, StudyDailyRollup.date))).label('last_study_date')
+    ).filter(StudyDailyRollup.user_id == user_id).group_by(StudyDailyRollup.subject_id).subquery()
+
+    rows = db.session.query(
+        Subject,
+        tasks.c.open_tasks, tasks.c.overdue_tasks, tasks.c.done_tasks, tasks.c.last_activity,
+        files.c.file_count, files.c.bytes_used, files.c.last_activity,
+        folders.c.folder_count, folders.c.last_activity,
+        study.c.week_minutes, study.c.last_study_date
+    ).outerjoin(tasks, tasks.c.subject_id == Subject.id) \
+     .outerjoin(files, files.c.subject_id == Subject.id) \
+     .outerjoin(folders, folders.c.subject_id == Subject.id) \
+     .outerjoin(study, study.c.subject_id == Subject.id) \
+     .filter(Subject.user_id == user_id) \
+     .order_by(Subject.name).all()
+
+    overview = []
+    for (subject, open_tasks, overdue_tasks, done_tasks, task_activity, file_count, bytes_used, file_activity,
+         folder_count, folder_activity, week_minutes, last_study_date) in rows:
+        if isinstance(last_study_date, str):
+            last_study_date = datetime.fromisoformat(last_study_date).date()
+        activity = [task_activity, file_activity, folder_activity, subject.updated_at]
+        if last_study_date is not None:
+            activity.append(datetime.combine(last_study_date, datetime.min.time()))
+        last_activity = max((moment for moment in activity if moment is not None), default=None)
+
+        overview.append({
+            **subject.to_dict(),
+            'open_tasks': int(open_tasks or 0),
+            'overdue_tasks': int(overdue_tasks or 0),
+            'done_tasks': int(done_tasks or 0),
+            'file_count': int(file_count or 0),
+            'bytes_used': int(bytes_used or 0),
+            'folder_count': int(folder_count or 0),
+            'week_minutes': int(week_minutes or 0),
+            'last_activity': last_activity.isoformat() if last_activity else None
+        })
+    return overview
+
 def update_subject(subject_id, **kwargs):
     """Atualiza uma matéria existente"""
     subject = Subject.query.get(subject_id)
@@ -34,26 +116,52 @@ def update_subject(subject_id, **kwargs):
         if hasattr(subject, key):
             setattr(subject, key, value)
     
+    searchRepository.index_subject(subject)
     db.session.commit()
     return subject
 
 def delete_subject(subject_id):
-    """Deleta uma matéria e todo seu conteúdo (pastas, arquivos, tarefas, sessões)"""
+    """Deleta uma matéria e todo seu conteúdo (pastas, arquivos, tarefas, sessões) em uma única transação"""
     subject = Subject.query.get(subject_id)
     if not subject:
         return False
 
-    # Apagar sessões de estudo ligadas
-    StudySession.query.filter_by(subject_id=subject_id).delete()
+    from repositories import eventRepository, folderRepository
+    user_id = subject.user_id
+    task_ids = [row[0] for row in db.session.query(Task.id).filter_by(subject_id=subject_id)]
 
-    # Apagar tarefas ligadas
-    Task.query.filter_by(subject_id=subject_id).delete()
-    
-    # Apagar pastas e arquivos (cascata)
-    from repositories import folderRepository, fileRepository
-    folderRepository.delete_folders_by_subject(subject_id)
-    fileRepository.delete_files_by_subject(subject_id)
+    try:
+        # Apagar sessões de estudo ligadas
+        StudySession.query.filter_by(subject_id=subject_id).delete(synchronize_session=False)
+        StudyDailyRollup.query.filter_by(subject_id=subject_id).delete(synchronize_session=False)
 
-    db.session.delete(subject)
-    db.session.commit()
+        # Apagar tarefas ligadas (e seus documentos de busca)
+        if task_ids:
+            searchRepository.remove_documents('task', task_ids)
+            Task.query.filter(Task.id.in_(task_ids)).delete(synchronize_session=False)
+            eventRepository.bump_calendar_version(user_id)
+
+        # Apagar pastas e arquivos da matéria (toda a subárvore de uma pasta pertence à mesma matéria)
+        folder_ids = [row[0] for row in db.session.query(Folder.id).filter(Folder.subject_id == subject_id)]
+        paths = folderRepository.delete_folder_tree(
+            folder_ids, or_(File.subject_id == subject_id, File.folder_id.in_(folder_ids))
+        )
+
+        searchRepository.remove_documents('subject', [subject_id])
+        db.session.delete(subject)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Arquivos físicos só são removidos depois que o banco confirmou a exclusão
+    remove_files_later(paths)
+    for task_id in task_ids:
+        reminder_scheduler.cancel_task(task_id)
+
+    from repositories import progressRepository, leaderboardRepository
+    progressRepository.invalidate_progress_cache(user_id)
+    progressRepository.invalidate_heatmap_cache(user_id)
+    eventRepository.invalidate_busy_index(user_id)
+    leaderboardRepository.refresh_user(user_id)
     return True
@@ -1,6 +1,10 @@
 from models.task import Task
 from utils.db import db
 from datetime import datetime
+from sqlalchemy import func, case, and_, tuple_
+from utils.pagination import encode_cursor, decode_cursor
+from utils.reminders import reminder_scheduler
+from repositories import eventRepository, progressRepository, searchRepository
 
 def get_tasks_by_user(user_id, subject_id=None, completed=None):
     query = Task.query.filter_by(user_id=user_id)
@@ -14,6 +18,77 @@ def get_tasks_by_user(user_id, subject_id=None, completed=None):
     # teste sem nullslast
     return query.order_by(Task.due_date.asc(), Task.created_at.desc()).all()
 
+def get_tasks_page(user_id, subject_id=None, completed=None, priority=None, due_from=None, due_to=None,
+                   cursor=None, limit=50):
+    """Retorna uma página de tarefas por keyset em (due_date, id), com tarefas sem prazo no final"""
+    query = Task.query.filter_by(user_id=user_id)
+
+    if subject_id is not None:
+        query = query.filter_by(subject_id=subject_id)
+    if completed is not None:
+        query = query.filter_by(completed=completed)
+    if priority is not None:
+        query = query.filter_by(priority=priority)
+    if due_from is not None:
+        query = query.filter(Task.due_date >= due_from)
+    if due_to is not None:
+        query = query.filter(Task.due_date <= due_to)
+
+    # Duas fases, cada uma com ordenação simples que usa o índice: primeiro as tarefas
+    # com prazo por (due_date, id), depois as sem prazo por id
+    phase, last_due, last_id = 'dated', None, None
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            last_id = int(position['id'])
+            last_due = datetime.fromisoformat(position['due_date']) if position.get('due_date') else None
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Cursor inválido")
+        phase = position.get('phase') or ('dated' if last_due else 'undated')
+        if phase not in ('dated', 'undated') or (phase == 'dated' and last_due is None):
+            raise ValueError("Cursor inválido")
+
+    tasks = []
+    if phase == 'dated':
+        dated = query.filter(Task.due_date.isnot(None))
+        if last_due is not None:
+            dated = dated.filter(tuple_(Task.due_date, Task.id) > tuple_(last_due, last_id))
+        tasks = dated.order_by(Task.due_date.asc(), Task.id.asc()).limit(limit + 1).all()
+
+    # Filtros de prazo já excluem as tarefas sem prazo
+    if len(tasks) <= limit and due_from is None and due_to is None:
+        undated = query.filter(Task.due_date.is_(None))
+        if phase == 'undated':
+            undated = undated.filter(Task.id > last_id)
+        tasks += undated.order_by(Task.id.asc()).limit(limit + 1 - len(tasks)).all()
+
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        next_cursor = encode_cursor({
+            'phase': 'dated' if last.due_date else 'undated',
+            'due_date': last.due_date.isoformat() if last.due_date else None,
+            'id': last.id
+        })
+
+    return tasks, next_cursor
+
+def iter_tasks_by_user(user_id, batch_size=1000):
+    """Itera as tarefas do usuário com cursor no servidor, sem carregar tudo em memória"""
+    query = Task.query.filter_by(user_id=user_id).order_by(Task.id)
+    for task in query.yield_per(batch_size):
+        yield task.to_dict()
+
+def iter_pending_tasks_with_due_date(user_id, batch_size=1000):
+    """Itera (sem carregar tudo em memória) as tarefas pendentes com prazo, para o feed .ics"""
+    query = Task.query.filter(
+        Task.user_id == user_id,
+        Task.completed.isnot(True),
+        Task.due_date.isnot(None)
+    ).order_by(Task.due_date, Task.id)
+    return query.yield_per(batch_size)
+
 def get_task_by_id(task_id):
     """Retorna uma tarefa específica pelo ID"""
     return Task.query.get(task_id)
@@ -29,7 +104,13 @@ def create_task(user_id, subject_id, title, description=None, due_date=None, pri
         priority=priority
     )
     db.session.add(task)
+    db.session.flush()
+    searchRepository.index_task(task)
+    eventRepository.bump_calendar_version(user_id)
     db.session.commit()
+    progressRepository.invalidate_progress_cache(user_id)
+    eventRepository.invalidate_busy_index(user_id)
+    reminder_scheduler.sync_task(task)
     return task
 
 def update_task(task_id, **kwargs):
@@ -42,7 +123,12 @@ def update_task(task_id, **kwargs):
         if hasattr(task, key):
             setattr(task, key, value)
     
+    searchRepository.index_task(task)
+    eventRepository.bump_calendar_version(task.user_id)
     db.session.commit()
+    progressRepository.invalidate_progress_cache(task.user_id)
+    eventRepository.invalidate_busy_index(task.user_id)
+    reminder_scheduler.sync_task(task)
     return task
 
 def delete_task(task_id):
@@ -51,8 +137,14 @@ def delete_task(task_id):
     if not task:
         return False
     
+    user_id = task.user_id
+    searchRepository.remove_documents('task', [task_id])
     db.session.delete(task)
+    eventRepository.bump_calendar_version(user_id)
     db.session.commit()
+    progressRepository.invalidate_progress_cache(user_id)
+    eventRepository.invalidate_busy_index(user_id)
+    reminder_scheduler.cancel_task(task_id)
     return True
 
 def toggle_task_completion(task_id):
@@ -66,9 +158,69 @@ def toggle_task_completion(task_id):
     else:
         task.mark_as_completed()
     
+    eventRepository.bump_calendar_version(task.user_id)
     db.session.commit()
+    progressRepository.invalidate_progress_cache(task.user_id)
+    eventRepository.invalidate_busy_index(task.user_id)
+    reminder_scheduler.sync_task(task)
     return task
 
+def get_tasks_by_ids(task_ids):
+    """Busca várias tarefas com uma única query IN, retornando um dicionário por id"""
+    if not task_ids:
+        return {}
+    return {task.id: task for task in Task.query.filter(Task.id.in_(task_ids)).all()}
+
+def apply_task_batch(tasks_by_id, operations):
+    """Aplica operações (toggle, update, delete) já validadas e faz um único commit"""
+    results = []
+    deleted = set()
+    user_ids = set()
+
+    try:
+        for operation in operations:
+            task = tasks_by_id[operation['id']]
+            if task.id in deleted:
+                raise ValueError(f"Tarefa {task.id} já foi deletada neste lote")
+            user_ids.add(task.user_id)
+
+            if operation['op'] == 'toggle':
+                if task.completed:
+                    task.mark_as_incomplete()
+                else:
+                    task.mark_as_completed()
+            elif operation['op'] == 'update':
+                for key, value in operation.get('fields', {}).items():
+                    if hasattr(task, key):
+                        setattr(task, key, value)
+                searchRepository.index_task(task)
+            elif operation['op'] == 'delete':
+                db.session.delete(task)
+                deleted.add(task.id)
+
+            results.append({'op': operation['op'], 'id': task.id})
+
+        if deleted:
+            searchRepository.remove_documents('task', deleted)
+        for user_id in user_ids:
+            eventRepository.bump_calendar_version(user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for result in results:
+        if result['id'] in deleted:
+            reminder_scheduler.cancel_task(result['id'])
+        else:
+            result['task'] = tasks_by_id[result['id']].to_dict()
+            reminder_scheduler.sync_task(tasks_by_id[result['id']])
+
+    for user_id in user_ids:
+        progressRepository.invalidate_progress_cache(user_id)
+        eventRepository.invalidate_busy_index(user_id)
+    return results
+
 def get_completed_tasks_count(user_id, start_date=None, end_date=None):
     """Retorna o número de tarefas concluídas em um período"""
     query = Task.query.filter_by(user_id=user_id, completed=True)
@@ -80,18 +232,52 @@ def get_completed_tasks_count(user_id, start_date=None, end_date=None):
     
     return query.count()
 
-def get_tasks_by_subject_grouped(user_id):
-    """Retorna tarefas agrupadas por matéria"""
+def get_task_counts_by_subject(user_id):
+    """Retorna contagens de tarefas abertas, atrasadas e concluídas por matéria (calculadas no SQL)"""
+    now = datetime.utcnow()
+    rows = db.session.query(
+        Task.subject_id,
+        func.sum(case((Task.completed.is_(True), 0), else_=1)),
+        func.sum(case((and_(Task.completed.isnot(True), Task.due_date < now), 1), else_=0)),
+        func.sum(case((Task.completed.is_(True), 1), else_=0))
+    ).filter(
+        Task.user_id == user_id
+    ).group_by(Task.subject_id).all()
+
+    return {
+        subject_id: {'open': int(open_ or 0), 'overdue': int(overdue or 0), 'done': int(done or 0)}
+        for subject_id, open_, overdue, done in rows
+    }
+
+def get_tasks_by_subject_grouped(user_id, completed=None, due_before=None):
+    """Retorna tarefas agrupadas por matéria (uma query com join + uma query de contagens)"""
     from models.subject import Subject
     
-    subjects = Subject.query.filter_by(user_id=user_id).all()
+    # Filtros ficam na condição do join para manter matérias sem tarefas no resultado
+    join_condition = and_(Task.subject_id == Subject.id, Task.user_id == user_id)
+    if completed is not None:
+        join_condition = and_(join_condition, Task.completed.is_(completed))
+    if due_before is not None:
+        join_condition = and_(join_condition, Task.due_date < due_before)
+    
+    rows = db.session.query(Subject, Task).outerjoin(
+        Task, join_condition
+    ).filter(
+        Subject.user_id == user_id
+    ).order_by(Subject.name, Subject.id, Task.due_date.asc(), Task.created_at.desc()).all()
+    
+    counts = get_task_counts_by_subject(user_id)
     result = {}
     
-    for subject in subjects:
-        tasks = Task.query.filter_by(user_id=user_id, subject_id=subject.id).all()
-        result[subject.id] = {
-            'subject': subject.to_dict(),
-            'tasks': [task.to_dict() for task in tasks]
-        }
+    for subject, task in rows:
+        group = result.get(subject.id)
+        if group is None:
+            group = result[subject.id] = {
+                'subject': subject.to_dict(),
+                'tasks': [],
+                'counts': counts.get(subject.id, {'open': 0, 'overdue': 0, 'done': 0})
+            }
+        if task is not None:
+            group['tasks'].append(task.to_dict())
     
     return result
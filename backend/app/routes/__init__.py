@@ -11,3 +11,4 @@ from .quiz import quiz_bp
 from .users import users
 from .assistant import assistant_bp
 from .preferences import preferences_bp
+from .search import search_bp
@@ -1,10 +1,24 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from repositories import eventRepository
-from datetime import datetime
+from repositories import eventRepository, taskRepository
+from models import Usuario
+from utils.ical import iter_calendar, parse_calendar
+from utils.export import stream_export
+from utils.db import db
+from utils.dates import parse_datetime
+import hashlib
 
 events_bp = Blueprint('events', __name__)
 
+EVENT_EXPORT_FIELDS = [
+    'id', 'user_id', 'title', 'description', 'start_date', 'end_date', 'all_day',
+    'color', 'recurrence_rule', 'recurrence_parent_id', 'recurrence_id', 'created_at', 'updated_at'
+]
+
+OVERRIDE_FIELDS = ('title', 'description', 'all_day', 'color')
+MAX_FREE_SLOTS_RANGE_DAYS = 92
+MAX_IMPORT_EVENTS = 10000
+
 @events_bp.route('/events', methods=['GET'])
 @jwt_required()
 def get_events():
@@ -15,10 +29,14 @@ def get_events():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
-    # Converter strings para datetime se fornecidas
-    start_dt = datetime.fromisoformat(start_date) if start_date else None
-    end_dt = datetime.fromisoformat(end_date) if end_date else None
+    # Converter strings para datetime (UTC sem fuso) se fornecidas
+    try:
+        start_dt = parse_datetime(start_date) if start_date else None
+        end_dt = parse_datetime(end_date) if end_date else None
+    except ValueError:
+        return jsonify({'message': 'start_date e end_date devem estar no formato ISO 8601'}), 400
     
+    # Com start_date e end_date, eventos recorrentes vêm expandidos em ocorrências
     events = eventRepository.get_events_by_user(user_id, start_dt, end_dt)
     return jsonify({'events': [event.to_dict() for event in events]}), 200
 
@@ -35,8 +53,8 @@ def create_event():
             return jsonify({'message': 'Campos obrigatórios: title, start_date, end_date'}), 400
         
         # Converter strings para datetime
-        start_date = datetime.fromisoformat(data['start_date'])
-        end_date = datetime.fromisoformat(data['end_date'])
+        start_date = parse_datetime(data['start_date'])
+        end_date = parse_datetime(data['end_date'])
         
         event = eventRepository.create_event(
             user_id=user_id,
@@ -45,14 +63,135 @@ def create_event():
             end_date=end_date,
             description=data.get('description'),
             all_day=data.get('all_day', False),
-            color=data.get('color', '#3b82f6')
+            color=data.get('color', '#3b82f6'),
+            recurrence_rule=data.get('recurrence_rule')
         )
         
-        return jsonify({'message': 'Evento criado com sucesso!', 'event': event.to_dict()}), 201
+        # Conflitos são apenas avisos: o evento é criado mesmo assim
+        try:
+            conflicts = eventRepository.find_conflicts(event)
+        except Exception as e:
+            print(f"Erro ao verificar conflitos: {e}")
+            conflicts = []
+        return jsonify({'message': 'Evento criado com sucesso!', 'event': event.to_dict(), 'conflicts': conflicts}), 201
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         print(f"Erro ao criar evento: {e}")
         return jsonify({'message': 'Erro ao criar evento'}), 500
 
+@events_bp.route('/events/export', methods=['GET'])
+@jwt_required()
+def export_events():
+    """Exporta os eventos do usuário em streaming (NDJSON ou CSV)"""
+    user_id = get_jwt_identity()
+    export_format = request.args.get('format', default='ndjson')
+    
+    try:
+        events = eventRepository.iter_events_by_user(user_id)
+        return stream_export(events, EVENT_EXPORT_FIELDS, export_format, 'events')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+@events_bp.route('/events/free-slots', methods=['GET'])
+@jwt_required()
+def get_free_slots():
+    """Retorna os horários livres do usuário entre from e to"""
+    user_id = get_jwt_identity()
+    
+    try:
+        start = parse_datetime(request.args['from'])
+        end = parse_datetime(request.args['to'])
+        min_minutes = request.args.get('min_minutes', default=30, type=int)
+    except (KeyError, ValueError):
+        return jsonify({'message': 'Parâmetros obrigatórios: from e to (ISO 8601)'}), 400
+    
+    if end <= start or min_minutes < 1:
+        return jsonify({'message': 'Período inválido: to deve ser maior que from e min_minutes positivo'}), 400
+    if (end - start).days > MAX_FREE_SLOTS_RANGE_DAYS:
+        return jsonify({'message': f'O período máximo é de {MAX_FREE_SLOTS_RANGE_DAYS} dias'}), 400
+    
+    slots = eventRepository.find_free_slots(user_id, start, end, min_minutes)
+    return jsonify({'slots': slots}), 200
+
+@events_bp.route('/events/feed-token', methods=['GET'])
+@jwt_required()
+def get_feed_url():
+    """Retorna a URL de assinatura do calendário (.ics) para apps externos"""
+    user = Usuario.query.get(int(get_jwt_identity()))
+    if not user:
+        return jsonify({'message': 'Usuário não encontrado'}), 404
+    
+    try:
+        token = eventRepository.get_calendar_feed_token(user)
+        return jsonify({'url': url_for('events.calendar_feed', token=token, _external=True)}), 200
+    except Exception as e:
+        print(f"Erro ao gerar URL do calendário: {e}")
+        return jsonify({'message': 'Erro ao gerar URL do calendário'}), 500
+
+@events_bp.route('/events/feed-token/rotate', methods=['POST'])
+@jwt_required()
+def rotate_feed_url():
+    """Troca o segredo do feed: as URLs de assinatura anteriores deixam de funcionar"""
+    user = Usuario.query.get(int(get_jwt_identity()))
+    if not user:
+        return jsonify({'message': 'Usuário não encontrado'}), 404
+    
+    try:
+        token = eventRepository.get_calendar_feed_token(user, rotate=True)
+        return jsonify({'url': url_for('events.calendar_feed', token=token, _external=True)}), 200
+    except Exception as e:
+        print(f"Erro ao trocar URL do calendário: {e}")
+        return jsonify({'message': 'Erro ao trocar URL do calendário'}), 500
+
+@events_bp.route('/events/feed.ics', methods=['GET'])
+def calendar_feed():
+    """Feed iCalendar com os eventos e os prazos das tarefas pendentes (autenticado pelo token da URL)"""
+    user = Usuario.verify_calendar_feed_token(request.args.get('token', ''))
+    if user is None:
+        return jsonify({'message': 'Token inválido'}), 401
+    
+    # Clientes que fazem polling recebem 304 enquanto a versão do calendário não mudar
+    user_id = user.id
+    etag = hashlib.sha1(f'{user_id}:{user.calendar_version}'.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    body = iter_calendar(
+        eventRepository.iter_events_for_calendar(user_id),
+        taskRepository.iter_pending_tasks_with_due_date(user_id)
+    )
+    response = Response(stream_with_context(body), mimetype='text/calendar')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Content-Disposition'] = 'inline; filename="studysphere.ics"'
+    return response
+
+@events_bp.route('/events/import', methods=['POST'])
+@jwt_required()
+def import_events():
+    """Importa eventos de um arquivo .ics (campo 'file' ou corpo text/calendar) em uma única transação"""
+    user_id = int(get_jwt_identity())
+    
+    upload = request.files.get('file')
+    raw = upload.read() if upload else request.get_data()
+    if not raw:
+        return jsonify({'message': 'Envie um arquivo .ics no campo file'}), 400
+    
+    try:
+        parsed = parse_calendar(raw.decode('utf-8-sig'), max_events=MAX_IMPORT_EVENTS)
+        imported = eventRepository.import_events(user_id, parsed)
+        return jsonify({'message': 'Eventos importados com sucesso!', 'imported': imported}), 201
+    except UnicodeDecodeError:
+        return jsonify({'message': 'O arquivo deve estar em UTF-8'}), 400
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao importar eventos: {e}")
+        return jsonify({'message': 'Erro ao importar eventos'}), 500
+
 @events_bp.route('/events/<int:event_id>', methods=['GET'])
 @jwt_required()
 def get_event(event_id):
@@ -87,16 +226,27 @@ def update_event(event_id):
         if 'description' in data:
             update_data['description'] = data['description']
         if 'start_date' in data:
-            update_data['start_date'] = datetime.fromisoformat(data['start_date'])
+            update_data['start_date'] = parse_datetime(data['start_date'])
         if 'end_date' in data:
-            update_data['end_date'] = datetime.fromisoformat(data['end_date'])
+            update_data['end_date'] = parse_datetime(data['end_date'])
         if 'all_day' in data:
             update_data['all_day'] = data['all_day']
         if 'color' in data:
             update_data['color'] = data['color']
+        if 'recurrence_rule' in data:
+            update_data['recurrence_rule'] = data['recurrence_rule']
         
         updated_event = eventRepository.update_event(event_id, **update_data)
-        return jsonify({'message': 'Evento atualizado com sucesso!', 'event': updated_event.to_dict()}), 200
+        # O evento já foi salvo: uma falha na verificação de conflitos não pode virar erro 500
+        try:
+            conflicts = eventRepository.find_conflicts(updated_event)
+        except Exception as e:
+            print(f"Erro ao verificar conflitos: {e}")
+            conflicts = []
+        return jsonify({'message': 'Evento atualizado com sucesso!', 'event': updated_event.to_dict(), 'conflicts': conflicts}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         print(f"Erro ao atualizar evento: {e}")
         return jsonify({'message': 'Erro ao atualizar evento'}), 500
@@ -117,3 +267,62 @@ def delete_event(event_id):
     except Exception as e:
         print(f"Erro ao deletar evento: {e}")
         return jsonify({'message': 'Erro ao deletar evento'}), 500
+
+
+def _get_own_series(event_id, user_id):
+    event = eventRepository.get_event_by_id(event_id)
+    if not event or str(event.user_id) != str(user_id):
+        return None
+    return event
+
+@events_bp.route('/events/<int:event_id>/exceptions', methods=['POST'])
+@jwt_required()
+def add_event_exception(event_id):
+    """Cancela uma única ocorrência de um evento recorrente"""
+    user_id = get_jwt_identity()
+    if not _get_own_series(event_id, user_id):
+        return jsonify({'message': 'Evento não encontrado'}), 404
+    
+    data = request.get_json() or {}
+    if not data.get('recurrence_id'):
+        return jsonify({'message': 'Campo obrigatório: recurrence_id'}), 400
+    
+    try:
+        event = eventRepository.add_event_exception(event_id, parse_datetime(data['recurrence_id']))
+        return jsonify({'message': 'Ocorrência cancelada com sucesso!', 'event': event.to_dict()}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao cancelar ocorrência: {e}")
+        return jsonify({'message': 'Erro ao cancelar ocorrência'}), 500
+
+@events_bp.route('/events/<int:event_id>/overrides', methods=['PUT'])
+@jwt_required()
+def save_event_override(event_id):
+    """Altera uma única ocorrência de um evento recorrente"""
+    user_id = get_jwt_identity()
+    if not _get_own_series(event_id, user_id):
+        return jsonify({'message': 'Evento não encontrado'}), 404
+    
+    data = request.get_json() or {}
+    if not data.get('recurrence_id'):
+        return jsonify({'message': 'Campo obrigatório: recurrence_id'}), 400
+    
+    try:
+        update_data = {key: data[key] for key in OVERRIDE_FIELDS if key in data}
+        if 'start_date' in data:
+            update_data['start_date'] = parse_datetime(data['start_date'])
+        if 'end_date' in data:
+            update_data['end_date'] = parse_datetime(data['end_date'])
+        
+        override = eventRepository.save_event_override(
+            event_id, parse_datetime(data['recurrence_id']), **update_data
+        )
+        return jsonify({'message': 'Ocorrência atualizada com sucesso!', 'event': override.to_dict()}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao atualizar ocorrência: {e}")
+        return jsonify({'message': 'Erro ao atualizar ocorrência'}), 500
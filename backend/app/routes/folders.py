@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from repositories import folderRepository
+from repositories import folderRepository, subjectRepository
 
 folders_bp = Blueprint('folders', __name__)
 
@@ -134,6 +134,49 @@ def update_folder(folder_id):
         return jsonify({'message': f'Erro ao atualizar pasta: {str(e)}'}), 500
 
 
+@folders_bp.route('/folders/<int:folder_id>/move', methods=['POST'])
+@jwt_required()
+def move_folder(folder_id):
+    """Move uma pasta (com subpastas e arquivos) para outra pasta ou para a raiz de uma matéria"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+            
+        folder = folderRepository.get_folder_by_id(folder_id)
+        
+        if not folder:
+            return jsonify({'message': 'Pasta não encontrada'}), 404
+        
+        if folder.user_id != user_id:
+            return jsonify({'message': 'Acesso negado'}), 403
+        
+        data = request.get_json() or {}
+        parent_id = data.get('parent_id')
+        subject_id = data.get('subject_id')
+        
+        if parent_id is None and subject_id is None:
+            return jsonify({'message': 'Informe parent_id ou subject_id'}), 400
+        
+        if subject_id is not None:
+            subject = subjectRepository.get_subject_by_id(subject_id)
+            if not subject or subject.user_id != user_id:
+                return jsonify({'message': 'Matéria não encontrada'}), 404
+        
+        moved_folder = folderRepository.move_folder(folder_id, parent_id, subject_id)
+        return jsonify({
+            'message': 'Pasta movida com sucesso!',
+            'folder': moved_folder.to_dict()
+        }), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        import traceback
+        print(f"Erro ao mover pasta: {e}")
+        traceback.print_exc()
+        return jsonify({'message': f'Erro ao mover pasta: {str(e)}'}), 500
+
+
 @folders_bp.route('/folders/<int:folder_id>', methods=['DELETE'])
 @jwt_required()
 def delete_folder(folder_id):
@@ -1,10 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from repositories import progressRepository
+from repositories import progressRepository, leaderboardRepository
+from utils.export import stream_export
 from datetime import datetime, timedelta
+import json
 
 progress_bp = Blueprint('progress', __name__)
 
+MAX_BATCH_SESSIONS = 5000
+SESSION_EXPORT_FIELDS = ['id', 'user_id', 'subject_id', 'duration_minutes', 'date', 'notes', 'created_at']
+# Período máximo (em dias) da série temporal por granularidade: limita o tamanho das matrizes geradas
+MAX_TIMESERIES_RANGE_DAYS = {'day': 366, 'week': 5 * 366, 'month': 20 * 366}
+
 @progress_bp.route('/progress/summary', methods=['GET'])
 @jwt_required()
 def get_progress_summary():
@@ -38,6 +45,25 @@ def get_study_sessions():
         print(f"Erro ao obter sessões de estudo: {e}")
         return jsonify({'message': 'Erro ao obter sessões de estudo'}), 500
 
+@progress_bp.route('/progress/study-sessions/export', methods=['GET'])
+@jwt_required()
+def export_study_sessions():
+    """Exporta as sessões de estudo do usuário em streaming (NDJSON ou CSV)"""
+    user_id = get_jwt_identity()
+    
+    export_format = request.args.get('format', default='ndjson')
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    
+    try:
+        start_date = datetime.fromisoformat(start_date_str).date() if start_date_str else None
+        end_date = datetime.fromisoformat(end_date_str).date() if end_date_str else None
+        
+        sessions = progressRepository.iter_study_sessions_by_user(user_id, start_date, end_date)
+        return stream_export(sessions, SESSION_EXPORT_FIELDS, export_format, 'study_sessions')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
 @progress_bp.route('/progress/study-sessions', methods=['POST'])
 @jwt_required()
 def create_study_session():
@@ -67,10 +93,49 @@ def create_study_session():
             'message': 'Sessão de estudo registrada com sucesso!',
             'session': session.to_dict()
         }), 201
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         print(f"Erro ao criar sessão de estudo: {e}")
         return jsonify({'message': 'Erro ao criar sessão de estudo'}), 500
 
+@progress_bp.route('/progress/study-sessions/batch', methods=['POST'])
+@jwt_required()
+def create_study_sessions_batch():
+    """Cria várias sessões de estudo de uma vez (array JSON ou NDJSON)"""
+    user_id = get_jwt_identity()
+    
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # Linha inválida é reportada como erro daquela posição
+                rows.append(None)
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get('sessions') if isinstance(data, dict) else data
+    
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'message': 'Envie uma lista de sessões (array JSON ou NDJSON)'}), 400
+    
+    if len(rows) > MAX_BATCH_SESSIONS:
+        return jsonify({'message': f'Máximo de {MAX_BATCH_SESSIONS} sessões por lote'}), 400
+    
+    try:
+        created, errors = progressRepository.create_study_sessions_bulk(user_id, rows)
+        return jsonify({
+            'message': f'{created} sessões de estudo registradas',
+            'created': created,
+            'errors': errors
+        }), 201 if created else 400
+    except Exception as e:
+        print(f"Erro ao importar sessões de estudo: {e}")
+        return jsonify({'message': 'Erro ao importar sessões de estudo'}), 500
+
 @progress_bp.route('/progress/time-by-subject', methods=['GET'])
 @jwt_required()
 def get_time_by_subject():
@@ -107,15 +172,71 @@ def get_time_by_day():
         print(f"Erro ao obter tempo por dia: {e}")
         return jsonify({'message': 'Erro ao obter tempo por dia'}), 500
 
+@progress_bp.route('/progress/timeseries', methods=['GET'])
+@jwt_required()
+def get_timeseries():
+    """Retorna a série temporal de estudo (dia, semana ou mês) em formato colunar"""
+    user_id = get_jwt_identity()
+    
+    granularity = request.args.get('granularity', default='day')
+    subject_id = request.args.get('subject_id', type=int)
+    
+    try:
+        start_date = datetime.fromisoformat(request.args['from']).date() if request.args.get('from') else None
+        end_date = datetime.fromisoformat(request.args['to']).date() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'message': 'Datas inválidas. Use o formato YYYY-MM-DD'}), 400
+    
+    if granularity not in MAX_TIMESERIES_RANGE_DAYS:
+        return jsonify({'message': f'Granularidade inválida: {granularity}'}), 400
+    
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=29)
+    max_days = MAX_TIMESERIES_RANGE_DAYS[granularity]
+    if (end_date - start_date).days > max_days:
+        return jsonify({'message': f'O período máximo para a granularidade {granularity} é de {max_days} dias'}), 400
+    
+    try:
+        timeseries = progressRepository.get_study_timeseries(user_id, granularity, start_date, end_date, subject_id)
+        return jsonify(timeseries), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao obter série temporal: {e}")
+        return jsonify({'message': 'Erro ao obter série temporal'}), 500
+
+@progress_bp.route('/progress/heatmap', methods=['GET'])
+@jwt_required()
+def get_heatmap():
+    """Retorna o mapa de calor anual de estudo (minutos por dia, uint16 em base64)"""
+    user_id = get_jwt_identity()
+    
+    # Parâmetro opcional para o ano (padrão: ano atual)
+    year = request.args.get('year', type=int)
+    if year is not None and not 1970 <= year <= 9999:
+        return jsonify({'message': 'Ano inválido'}), 400
+    
+    try:
+        heatmap = progressRepository.get_study_heatmap(user_id, year)
+        return jsonify(heatmap), 200
+    except Exception as e:
+        print(f"Erro ao obter mapa de calor: {e}")
+        return jsonify({'message': 'Erro ao obter mapa de calor'}), 500
+
 @progress_bp.route('/progress/streak', methods=['GET'])
 @jwt_required()
 def get_streak():
-    """Retorna a sequência atual de dias consecutivos de estudo"""
+    """Retorna a sequência atual, a maior sequência e o histórico de sequências"""
     user_id = get_jwt_identity()
     
+    # Parâmetro opcional para limitar o histórico retornado
+    history_limit = request.args.get('history_limit', default=10, type=int)
+    if history_limit < 0:
+        return jsonify({'message': 'history_limit não pode ser negativo'}), 400
+    
     try:
-        streak = progressRepository.get_current_streak(user_id)
-        return jsonify({'current_streak': streak}), 200
+        streak = progressRepository.get_streak_stats(user_id, history_limit)
+        return jsonify(streak), 200
     except Exception as e:
         print(f"Erro ao obter sequência: {e}")
         return jsonify({'message': 'Erro ao obter sequência'}), 500
@@ -135,3 +256,23 @@ def get_weekly_goal():
     except Exception as e:
         print(f"Erro ao obter meta semanal: {e}")
         return jsonify({'message': 'Erro ao obter meta semanal'}), 500
+
+
+@progress_bp.route('/progress/leaderboard', methods=['GET'])
+@jwt_required()
+def get_leaderboard():
+    """Retorna o ranking de tempo de estudo (semanal, mensal ou geral) paginado"""
+    user_id = get_jwt_identity()
+    
+    period = request.args.get('period', default='weekly')
+    page = max(1, request.args.get('page', default=1, type=int))
+    per_page = min(100, max(1, request.args.get('per_page', default=20, type=int)))
+    
+    try:
+        leaderboard = leaderboardRepository.get_leaderboard(user_id, period, page, per_page)
+        return jsonify(leaderboard), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        print(f"Erro ao obter ranking: {e}")
+        return jsonify({'message': 'Erro ao obter ranking'}), 500
@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from repositories import searchRepository
+
+search_bp = Blueprint('search', __name__)
+
+SEARCH_TYPES = ('subject', 'task', 'event', 'folder', 'file')
+
+@search_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search():
+    """Busca textual em matérias, tarefas, eventos, pastas e arquivos do usuário"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+        
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({'message': 'Parâmetro obrigatório: q'}), 400
+        
+        # Filtro opcional por tipo: ?types=task,event
+        types = [t for t in request.args.get('types', '').split(',') if t]
+        if any(t not in SEARCH_TYPES for t in types):
+            return jsonify({'message': f'Tipos válidos: {", ".join(SEARCH_TYPES)}'}), 400
+        
+        limit = min(100, max(1, request.args.get('limit', default=20, type=int)))
+        
+        results = searchRepository.search(user_id, query, types or None, limit)
+        return jsonify({'query': query, 'results': results}), 200
+    except Exception as e:
+        import traceback
+        print(f"Erro ao buscar: {e}")
+        traceback.print_exc()
+        return jsonify({'message': f'Erro ao buscar: {str(e)}'}), 500
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from repositories import subjectRepository
+from repositories import subjectRepository, folderRepository
+import hashlib
 
 subjects_bp = Blueprint('subjects', __name__)
 
@@ -21,6 +22,69 @@ def get_subjects():
         traceback.print_exc()
         return jsonify({'message': f'Erro ao listar matérias: {str(e)}'}), 500
 
+@subjects_bp.route('/subjects/overview', methods=['GET'])
+@jwt_required()
+def get_subjects_overview():
+    """Retorna todas as matérias com contadores de tarefas, arquivos, pastas e estudo da semana"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+            
+        overview = subjectRepository.get_subjects_overview(user_id)
+        return jsonify({'subjects': overview}), 200
+    except Exception as e:
+        import traceback
+        print(f"Erro ao gerar resumo das matérias: {e}")
+        traceback.print_exc()
+        return jsonify({'message': f'Erro ao gerar resumo das matérias: {str(e)}'}), 500
+
+@subjects_bp.route('/subjects/<int:subject_id>/tree', methods=['GET'])
+@jwt_required()
+def get_subject_tree(subject_id):
+    """Retorna a árvore completa de pastas da matéria (com ?file_counts=true, inclui a contagem de arquivos)"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+            
+        subject = subjectRepository.get_subject_by_id(subject_id)
+        
+        if not subject:
+            return jsonify({'message': 'Matéria não encontrada'}), 404
+        
+        if subject.user_id != user_id:
+            return jsonify({'message': 'Acesso negado'}), 403
+        
+        with_counts = request.args.get('file_counts', '').lower() in ('1', 'true')
+        file_counts = folderRepository.get_file_counts_by_folder(subject_id) if with_counts else None
+        
+        # ETag pela última alteração das pastas (e pelas contagens de arquivos, se pedidas)
+        version = tuple(folderRepository.get_tree_version(subject_id))
+        if file_counts is not None:
+            version += tuple(sorted(file_counts.items(), key=lambda item: (item[0] is not None, item[0] or 0)))
+        etag = hashlib.sha1(repr((subject_id,) + version).encode()).hexdigest()
+        
+        if request.if_none_match.contains(etag):
+            response = jsonify({})
+            response.status_code = 304
+            response.set_etag(etag)
+            return response
+        
+        result = {'subject_id': subject_id, 'tree': folderRepository.get_subject_tree(subject_id, file_counts)}
+        if file_counts is not None:
+            result['root_file_count'] = file_counts.get(None, 0)
+        
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        import traceback
+        print(f"Erro ao montar árvore de pastas: {e}")
+        traceback.print_exc()
+        return jsonify({'message': f'Erro ao montar árvore de pastas: {str(e)}'}), 500
+
 @subjects_bp.route('/subjects', methods=['POST'])
 @jwt_required()
 def create_subject():
@@ -1,10 +1,39 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from repositories import taskRepository
+from utils.export import stream_export
 from datetime import datetime
 
 tasks_bp = Blueprint('tasks', __name__)
 
+MAX_TASKS_PAGE_SIZE = 200
+MAX_BATCH_OPERATIONS = 500
+BATCH_OPERATIONS = ('toggle', 'update', 'delete')
+
+TASK_EXPORT_FIELDS = [
+    'id', 'user_id', 'subject_id', 'title', 'description', 'due_date', 'completed',
+    'completed_at', 'priority', 'created_at', 'updated_at'
+]
+
+def _parse_task_update(data):
+    """Converte o corpo de uma atualização de tarefa nos campos do modelo"""
+    update_data = {}
+    if 'title' in data:
+        update_data['title'] = data['title']
+    if 'description' in data:
+        update_data['description'] = data['description']
+    if 'due_date' in data:
+        update_data['due_date'] = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
+    if 'priority' in data:
+        update_data['priority'] = data['priority']
+    if 'completed' in data:
+        update_data['completed'] = data['completed']
+        if data['completed']:
+            update_data['completed_at'] = datetime.utcnow()
+        else:
+            update_data['completed_at'] = None
+    return update_data
+
 @tasks_bp.route('/tasks', methods=['GET'])
 @jwt_required()
 def get_tasks():
@@ -18,8 +47,31 @@ def get_tasks():
         subject_id = request.args.get('subject_id', type=int)
         completed = request.args.get('completed', type=lambda v: v.lower() == 'true' if v else None)
         
+        # Paginação por cursor (keyset) quando limit ou cursor forem informados
+        if 'limit' in request.args or 'cursor' in request.args:
+            limit = min(MAX_TASKS_PAGE_SIZE, max(1, request.args.get('limit', default=50, type=int)))
+            due_from = request.args.get('due_from')
+            due_to = request.args.get('due_to')
+            
+            tasks, next_cursor = taskRepository.get_tasks_page(
+                user_id,
+                subject_id=subject_id,
+                completed=completed,
+                priority=request.args.get('priority'),
+                due_from=datetime.fromisoformat(due_from) if due_from else None,
+                due_to=datetime.fromisoformat(due_to) if due_to else None,
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+            return jsonify({
+                'tasks': [task.to_dict() for task in tasks],
+                'next_cursor': next_cursor
+            }), 200
+        
         tasks = taskRepository.get_tasks_by_user(user_id, subject_id, completed)
         return jsonify({'tasks': [task.to_dict() for task in tasks]}), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         import traceback
         print(f"Erro ao listar tarefas: {e}")
@@ -62,6 +114,21 @@ def create_task():
         traceback.print_exc()
         return jsonify({'message': f'Erro ao criar tarefa: {str(e)}'}), 500
 
+@tasks_bp.route('/tasks/export', methods=['GET'])
+@jwt_required()
+def export_tasks():
+    """Exporta as tarefas do usuário em streaming (NDJSON ou CSV)"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+        
+        export_format = request.args.get('format', default='ndjson')
+        tasks = taskRepository.iter_tasks_by_user(user_id)
+        return stream_export(tasks, TASK_EXPORT_FIELDS, export_format, 'tasks')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
 @tasks_bp.route('/tasks/<int:task_id>', methods=['GET'])
 @jwt_required()
 def get_task(task_id):
@@ -106,21 +173,7 @@ def update_task(task_id):
         data = request.get_json()
         
         # Preparar dados para atualização
-        update_data = {}
-        if 'title' in data:
-            update_data['title'] = data['title']
-        if 'description' in data:
-            update_data['description'] = data['description']
-        if 'due_date' in data:
-            update_data['due_date'] = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
-        if 'priority' in data:
-            update_data['priority'] = data['priority']
-        if 'completed' in data:
-            update_data['completed'] = data['completed']
-            if data['completed']:
-                update_data['completed_at'] = datetime.utcnow()
-            else:
-                update_data['completed_at'] = None
+        update_data = _parse_task_update(data)
         
         updated_task = taskRepository.update_task(task_id, **update_data)
         return jsonify({'message': 'Tarefa atualizada com sucesso!', 'task': updated_task.to_dict()}), 200
@@ -155,6 +208,64 @@ def delete_task(task_id):
         traceback.print_exc()
         return jsonify({'message': f'Erro ao deletar tarefa: {str(e)}'}), 500
 
+@tasks_bp.route('/tasks/batch', methods=['POST'])
+@jwt_required()
+def batch_tasks():
+    """Aplica várias operações (toggle, update, delete) em tarefas numa única transação"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+        
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'message': 'Campo obrigatório: operations (lista)'}), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'message': f'Máximo de {MAX_BATCH_OPERATIONS} operações por lote'}), 400
+        
+        # Validar todas as operações antes de tocar no banco
+        parsed = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+                return jsonify({'message': f'Operação inválida na posição {index}. Use: toggle, update, delete'}), 400
+            try:
+                task_id = int(operation.get('id'))
+            except (TypeError, ValueError):
+                return jsonify({'message': f'id inválido na posição {index}'}), 400
+            
+            entry = {'op': operation['op'], 'id': task_id}
+            if operation['op'] == 'update':
+                fields = operation.get('fields') or {}
+                if not isinstance(fields, dict):
+                    return jsonify({'message': f'fields deve ser um objeto na posição {index}'}), 400
+                try:
+                    entry['fields'] = _parse_task_update(fields)
+                except (TypeError, ValueError):
+                    return jsonify({'message': f'due_date inválido na posição {index}'}), 400
+            parsed.append(entry)
+        
+        # Carregar todas as tarefas com uma única query e verificar posse uma vez
+        tasks_by_id = taskRepository.get_tasks_by_ids({entry['id'] for entry in parsed})
+        missing = sorted({entry['id'] for entry in parsed} - set(tasks_by_id))
+        if missing:
+            return jsonify({'message': 'Tarefas não encontradas', 'ids': missing}), 404
+        
+        if any(task.user_id != user_id for task in tasks_by_id.values()):
+            return jsonify({'message': 'Acesso negado'}), 403
+        
+        results = taskRepository.apply_task_batch(tasks_by_id, parsed)
+        return jsonify({'message': 'Operações aplicadas com sucesso!', 'results': results}), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        import traceback
+        print(f"Erro ao aplicar lote de tarefas: {e}")
+        traceback.print_exc()
+        return jsonify({'message': f'Erro ao aplicar lote de tarefas: {str(e)}'}), 500
+
 @tasks_bp.route('/tasks/<int:task_id>/toggle', methods=['POST'])
 @jwt_required()
 def toggle_task_completion(task_id):
@@ -192,7 +303,15 @@ def get_tasks_by_subject():
         if isinstance(user_id, str):
             user_id = int(user_id)
         
-        tasks_grouped = taskRepository.get_tasks_by_subject_grouped(user_id)
+        # Filtros opcionais
+        completed = request.args.get('completed', type=lambda v: v.lower() == 'true' if v else None)
+        due_before_str = request.args.get('due_before')
+        try:
+            due_before = datetime.fromisoformat(due_before_str) if due_before_str else None
+        except ValueError:
+            return jsonify({'message': 'due_before inválido. Use o formato ISO 8601'}), 400
+        
+        tasks_grouped = taskRepository.get_tasks_by_subject_grouped(user_id, completed, due_before)
         return jsonify({'tasks_by_subject': tasks_grouped}), 200
     except Exception as e:
         import traceback
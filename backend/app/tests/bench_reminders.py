@@ -0,0 +1,51 @@
+"""Benchmark do agendador de lembretes: python tests/bench_reminders.py [--count 1000000]"""
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.reminders import ReminderScheduler
+
+
+def build_scheduler(count, now, seed=0):
+    """Agenda count lembretes espalhados pelas próximas 6 horas"""
+    random.seed(seed)
+    scheduler = ReminderScheduler()
+    scheduler._horizon_end = now + timedelta(hours=6)
+    for i in range(count):
+        fire_at = now + timedelta(seconds=random.randrange(6 * 3600))
+        scheduler.schedule(('task', i), i % 1000, fire_at, {'type': 'task', 'id': i})
+    return scheduler
+
+
+def run(count):
+    now = datetime(2026, 1, 1)
+
+    started = time.perf_counter()
+    scheduler = build_scheduler(count, now)
+    scheduled = time.perf_counter() - started
+
+    # Reagendar e cancelar 10% (remoção preguiçosa: o heap não é varrido)
+    started = time.perf_counter()
+    for i in range(0, count, 10):
+        scheduler.schedule(('task', i), i % 1000, now + timedelta(hours=5), {'type': 'task', 'id': i})
+        scheduler.cancel(('task', i + 1))
+    updated = time.perf_counter() - started
+
+    started = time.perf_counter()
+    due = scheduler.pop_due(now + timedelta(hours=3))
+    popped = time.perf_counter() - started
+
+    print(f"{count} lembretes agendados em {scheduled:.2f}s")
+    print(f"{count // 5} reagendados/cancelados em {updated:.2f}s")
+    print(f"{len(due)} lembretes vencidos retirados em {popped:.2f}s; restam {len(scheduler)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    run(parser.parse_args().count)
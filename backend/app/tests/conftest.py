@@ -0,0 +1,86 @@
+import os
+
+# Banco em memória: os testes nunca usam o banco configurado no .env
+os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+os.environ.setdefault('FLASK_SECRET_KEY', 'test-secret-key-with-at-least-32-bytes')
+os.environ.setdefault('FLASK_JWT_SECRET_KEY', 'test-jwt-secret-key-with-at-least-32-bytes')
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from utils.db import db
+from models import Usuario, Subject
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app()
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+    _clear_memory_caches()
+
+
+def _clear_memory_caches():
+    """Os caches em memória sobrevivem entre testes, mas os ids do banco se repetem"""
+    from repositories import eventRepository, leaderboardRepository, progressRepository
+    leaderboardRepository.invalidate()
+    progressRepository._summary_cache.clear()
+    progressRepository._heatmap_cache.clear()
+    eventRepository._month_cache.clear()
+    eventRepository._busy_cache.clear()
+
+
+@pytest.fixture
+def user(database):
+    usuario = Usuario(email='teste@studysphere.com', nome_completo='Teste', username='teste', senha=None, nascimento=None)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def subject(user):
+    materia = Subject(user_id=user.id, name='Cálculo')
+    db.session.add(materia)
+    db.session.commit()
+    return materia
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+class QueryCounter:
+    """Conta os comandos SQL enviados ao banco"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+@pytest.fixture
+def query_counter(database):
+    counter = QueryCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', counter)
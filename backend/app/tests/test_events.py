@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+from repositories import eventRepository, taskRepository
+from routes.events import MAX_FREE_SLOTS_RANGE_DAYS
+
+
+def test_calendar_range_accepts_utc_suffixed_dates(client, auth_headers, user):
+    eventRepository.create_event(user.id, 'Aula', datetime(2026, 10, 5, 14), datetime(2026, 10, 5, 15))
+    eventRepository.create_event(user.id, 'Fora', datetime(2026, 12, 5, 14), datetime(2026, 12, 5, 15))
+
+    # Formato enviado pelo calendário do frontend (Date.toISOString)
+    response = client.get(
+        '/api/events?start_date=2026-10-01T03:00:00.000Z&end_date=2026-11-01T02:59:59.999Z',
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert [event['title'] for event in response.get_json()['events']] == ['Aula']
+
+
+def test_calendar_range_converts_offsets_to_utc(client, auth_headers, user):
+    eventRepository.create_event(user.id, 'Aula', datetime(2026, 10, 1, 2, 30), datetime(2026, 10, 1, 2, 45))
+
+    # 00:00 em -03:00 é 03:00 UTC: o evento das 02:30 UTC fica de fora
+    response = client.get(
+        '/api/events?start_date=2026-10-01T00:00:00-03:00&end_date=2026-10-31T23:59:59-03:00',
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()['events'] == []
+
+
+def test_calendar_range_rejects_malformed_dates(client, auth_headers):
+    response = client.get('/api/events?start_date=ontem&end_date=hoje', headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def _day(offset):
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    return today + timedelta(days=offset)
+
+
+def _free_slots(client, headers, start, end, **params):
+    query = {'from': start, 'to': end, **params}
+    return client.get('/api/events/free-slots', query_string=query, headers=headers)
+
+
+def test_free_slots_between_events_and_task_deadlines(client, auth_headers, user, subject):
+    day = _day(3)
+    eventRepository.create_event(user.id, 'Aula', day.replace(hour=10), day.replace(hour=12))
+    taskRepository.create_task(user.id, subject.id, 'Entrega', due_date=day.replace(hour=15))
+
+    response = _free_slots(client, auth_headers, day.replace(hour=8).isoformat() + 'Z', day.replace(hour=18).isoformat() + 'Z', min_minutes=60)
+
+    assert response.status_code == 200
+    # O prazo reserva os 30 minutos anteriores (14:30-15:00)
+    assert [(slot['start'][11:16], slot['end'][11:16]) for slot in response.get_json()['slots']] == [
+        ('08:00', '10:00'), ('12:00', '14:30'), ('15:00', '18:00')
+    ]
+
+
+def test_free_slots_accept_offsets(client, auth_headers, user):
+    day = _day(4)
+    eventRepository.create_event(user.id, 'Aula', day.replace(hour=13), day.replace(hour=14))
+
+    # 09:00-12:00 em -03:00 equivale a 12:00-15:00 UTC
+    response = _free_slots(client, auth_headers, day.replace(hour=9).isoformat() + '-03:00', day.replace(hour=12).isoformat() + '-03:00')
+
+    assert response.status_code == 200
+    assert [slot['minutes'] for slot in response.get_json()['slots']] == [60, 60]
+
+
+def test_all_day_event_blocks_the_whole_day(client, auth_headers, user):
+    day = _day(5)
+    eventRepository.create_event(user.id, 'Feriado', day, day, all_day=True)
+
+    response = _free_slots(client, auth_headers, _day(4).replace(hour=20).isoformat(), _day(6).replace(hour=4).isoformat())
+
+    assert response.status_code == 200
+    assert [slot['minutes'] for slot in response.get_json()['slots']] == [240, 240]
+
+
+def test_free_slots_outside_the_cached_horizon(client, auth_headers, user):
+    day = _day(400)
+    eventRepository.create_event(user.id, 'Congresso', day.replace(hour=9), day.replace(hour=17))
+
+    response = _free_slots(client, auth_headers, day.isoformat(), (day + timedelta(days=1)).isoformat(), min_minutes=600)
+
+    assert response.status_code == 200
+    assert response.get_json()['slots'] == []
+
+
+def test_free_slots_range_is_capped(client, auth_headers):
+    start = _day(0)
+    response = _free_slots(client, auth_headers, start.isoformat(), (start + timedelta(days=MAX_FREE_SLOTS_RANGE_DAYS + 1)).isoformat())
+    assert response.status_code == 400
+
+    response = _free_slots(client, auth_headers, start.isoformat(), (start + timedelta(days=MAX_FREE_SLOTS_RANGE_DAYS)).isoformat())
+    assert response.status_code == 200
+
+
+def test_free_slots_reject_invalid_parameters(client, auth_headers):
+    start = _day(1).isoformat()
+    assert _free_slots(client, auth_headers, start, 'amanhã').status_code == 400
+    assert _free_slots(client, auth_headers, _day(2).isoformat(), start).status_code == 400
+    assert _free_slots(client, auth_headers, start, _day(2).isoformat(), min_minutes=0).status_code == 400
+    assert client.get('/api/events/free-slots', headers=auth_headers).status_code == 400
+
+
+def _feed_path(client, auth_headers, rotate=False):
+    if rotate:
+        response = client.post('/api/events/feed-token/rotate', headers=auth_headers)
+    else:
+        response = client.get('/api/events/feed-token', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()['url'].split('localhost', 1)[1]
+
+
+def test_calendar_feed_etag_changes_on_every_write(client, auth_headers, user, subject):
+    feed = _feed_path(client, auth_headers)
+    event = eventRepository.create_event(user.id, 'Aula', datetime(2026, 10, 5, 14), datetime(2026, 10, 5, 15))
+
+    first = client.get(feed)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get(feed, headers={'If-None-Match': etag}).status_code == 304
+
+    # Alterações no mesmo segundo (mesmo updated_at e mesma quantidade) também mudam o ETag
+    eventRepository.update_event(event.id, title='Aula remarcada')
+    changed = client.get(feed, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert b'Aula remarcada' in changed.data
+
+    etag = changed.headers['ETag']
+    task = taskRepository.create_task(user.id, subject.id, 'Lista', due_date=datetime(2026, 10, 6, 12))
+    assert client.get(feed, headers={'If-None-Match': etag}).status_code == 200
+
+    etag = client.get(feed).headers['ETag']
+    taskRepository.toggle_task_completion(task.id)
+    assert client.get(feed, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_calendar_feed_rotation_revokes_previous_url(client, auth_headers):
+    old_feed = _feed_path(client, auth_headers)
+    assert _feed_path(client, auth_headers) == old_feed
+    assert client.get(old_feed).status_code == 200
+
+    new_feed = _feed_path(client, auth_headers, rotate=True)
+
+    assert new_feed != old_feed
+    assert client.get(old_feed).status_code == 401
+    assert client.get(new_feed).status_code == 200
+    assert client.get('/api/events/feed.ics?token=invalido').status_code == 401
@@ -0,0 +1,181 @@
+import os
+
+import pytest
+from sqlalchemy import event
+
+from models import Subject
+from models.file import File
+from models.folder import Folder
+from repositories import fileRepository, folderRepository, subjectRepository
+from utils import file_cleanup
+from utils.db import db
+
+
+def _create_tree(user, subject, width=20, depth=4):
+    """Cria width pastas na raiz, cada uma com uma cadeia de subpastas de depth níveis"""
+    deepest = None
+    for i in range(width):
+        parent = folderRepository.create_folder(user.id, subject.id, f'Pasta {i}')
+        for level in range(1, depth):
+            parent = folderRepository.create_folder(user.id, subject.id, f'Pasta {i}.{level}', parent.id)
+        deepest = parent
+    return deepest
+
+
+def test_listing_root_folders_runs_a_single_query(user, subject, query_counter):
+    _create_tree(user, subject)
+    subject_id = subject.id
+    db.session.expire_all()
+
+    query_counter.reset()
+    folders = folderRepository.get_folders_by_subject(subject_id)
+    serialized = [folder.to_dict() for folder in folders]
+
+    assert len(serialized) == 20
+    assert query_counter.count == 1
+
+
+def test_listing_nested_folders_does_not_query_depth(user, subject, query_counter):
+    deepest = _create_tree(user, subject, width=3, depth=8)
+    for i in range(15):
+        folderRepository.create_folder(user.id, subject.id, f'Filha {i}', deepest.id)
+    subject_id, parent_id = subject.id, deepest.id
+    db.session.expire_all()
+
+    query_counter.reset()
+    folders = folderRepository.get_folders_by_subject(subject_id, parent_id)
+    serialized = [folder.to_dict() for folder in folders]
+
+    assert len(serialized) == 15
+    assert {folder['depth'] for folder in serialized} == {8}
+    assert query_counter.count == 1
+
+
+def _flush_file_cleanup():
+    # O executor tem um único worker: esta tarefa só roda depois das remoções já agendadas
+    file_cleanup._executor.submit(lambda: None).result()
+
+
+def _create_stored_file(tmp_path, user, subject, folder=None, name='notas.pdf', size=10):
+    path = tmp_path / f'{len(list(tmp_path.iterdir()))}-{name}'
+    path.write_bytes(b'x' * size)
+    return fileRepository.create_file(user.id, name, str(path), size, subject_id=subject.id,
+                                      folder_id=folder.id if folder else None)
+
+
+def test_delete_file_keeps_the_physical_file_when_the_commit_fails(tmp_path, monkeypatch, user, subject):
+    stored = _create_stored_file(tmp_path, user, subject)
+    path, file_id = stored.file_path, stored.id
+
+    def failing_commit():
+        raise RuntimeError('banco indisponível')
+
+    monkeypatch.setattr(db.session, 'commit', failing_commit)
+    with pytest.raises(RuntimeError):
+        fileRepository.delete_file(file_id)
+    monkeypatch.undo()
+    _flush_file_cleanup()
+
+    assert os.path.exists(path)
+    assert File.query.get(file_id) is not None
+
+    assert fileRepository.delete_file(file_id) is True
+    _flush_file_cleanup()
+    assert not os.path.exists(path)
+
+
+def test_delete_subject_removes_every_folder_and_file_of_the_subject(tmp_path, user, subject):
+    other = Subject(user_id=user.id, name='Física')
+    db.session.add(other)
+    db.session.commit()
+
+    deepest = _create_tree(user, subject, width=2, depth=5)
+    stored = [_create_stored_file(tmp_path, user, subject, deepest), _create_stored_file(tmp_path, user, subject)]
+    kept_folder = folderRepository.create_folder(user.id, other.id, 'Outra')
+    kept_file = _create_stored_file(tmp_path, user, other, kept_folder)
+    paths = [record.file_path for record in stored]
+    subject_id, other_id, kept_path = subject.id, other.id, kept_file.file_path
+
+    assert subjectRepository.delete_subject(subject_id) is True
+    _flush_file_cleanup()
+
+    assert Folder.query.filter_by(subject_id=subject_id).count() == 0
+    assert File.query.filter_by(subject_id=subject_id).count() == 0
+    assert [folder.name for folder in Folder.query.filter_by(subject_id=other_id)] == ['Outra']
+    assert not any(os.path.exists(path) for path in paths)
+    assert os.path.exists(kept_path)
+
+
+def _assert_folder_sizes_consistent(app):
+    result = app.test_cli_runner().invoke(args=['rebuild-folder-sizes', '--check'])
+    assert result.exit_code == 0
+    assert 'divergentes: 0.' in result.output
+
+
+def test_folder_sizes_stay_consistent_after_move_copy_and_delete(app, tmp_path, user, subject):
+    root = folderRepository.create_folder(user.id, subject.id, 'Raiz')
+    child = folderRepository.create_folder(user.id, subject.id, 'Filha', root.id)
+    grandchild = folderRepository.create_folder(user.id, subject.id, 'Neta', child.id)
+    sibling = folderRepository.create_folder(user.id, subject.id, 'Irmã')
+    stored = _create_stored_file(tmp_path, user, subject, grandchild, size=100)
+    _create_stored_file(tmp_path, user, subject, child, size=7)
+    _assert_folder_sizes_consistent(app)
+
+    # Para um ancestral, para outra árvore, para a raiz da matéria e de volta para baixo
+    for target in (root, sibling, None, grandchild):
+        fileRepository.move_file(stored.id, folder_id=target.id if target else None)
+        _assert_folder_sizes_consistent(app)
+
+    copy = fileRepository.copy_file(stored.id, user.id, folder_id=child.id)
+    _assert_folder_sizes_consistent(app)
+
+    folderRepository.move_folder(grandchild.id, sibling.id)
+    _assert_folder_sizes_consistent(app)
+
+    fileRepository.delete_file(copy.id)
+    _assert_folder_sizes_consistent(app)
+
+    folderRepository.delete_folder(child.id)
+    _assert_folder_sizes_consistent(app)
+    _flush_file_cleanup()
+
+
+def test_move_file_updates_counters_with_a_single_statement(app, tmp_path, user, subject):
+    root = folderRepository.create_folder(user.id, subject.id, 'Raiz')
+    left = folderRepository.create_folder(user.id, subject.id, 'Esquerda', root.id)
+    right = folderRepository.create_folder(user.id, subject.id, 'Direita', root.id)
+    stored = _create_stored_file(tmp_path, user, subject, left)
+
+    updates = []
+
+    def capture(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('UPDATE FOLDER'):
+            updates.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        fileRepository.move_file(stored.id, folder_id=right.id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    assert len(updates) == 1
+    _assert_folder_sizes_consistent(app)
+
+
+def test_deleting_a_subject_updates_folders_of_other_subjects(app, tmp_path, user, subject):
+    other = Subject(user_id=user.id, name='Física')
+    db.session.add(other)
+    db.session.commit()
+    other_folder = folderRepository.create_folder(user.id, other.id, 'Outra')
+    nested = folderRepository.create_folder(user.id, other.id, 'Sub', other_folder.id)
+
+    # Arquivo da matéria que será apagada, guardado em uma pasta da outra matéria
+    _create_stored_file(tmp_path, user, subject, nested, size=50)
+    _create_stored_file(tmp_path, user, other, nested, size=5)
+    _assert_folder_sizes_consistent(app)
+
+    subjectRepository.delete_subject(subject.id)
+    _flush_file_cleanup()
+
+    _assert_folder_sizes_consistent(app)
+    assert folderRepository.get_folder_by_id(other_folder.id).total_bytes == 5
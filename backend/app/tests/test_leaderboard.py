@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from models import Subject, Usuario
+from repositories import leaderboardRepository, progressRepository, subjectRepository
+from utils.db import db
+
+
+def _create_users(count):
+    users = []
+    for i in range(count):
+        usuario = Usuario(email=f'aluno{i}@studysphere.com', nome_completo=f'Aluno {i}', username=f'aluno{i}', senha=None, nascimento=None)
+        db.session.add(usuario)
+        db.session.flush()
+        subject = Subject(user_id=usuario.id, name='Física')
+        db.session.add(subject)
+        db.session.flush()
+        users.append((usuario.id, subject.id))
+    db.session.commit()
+    return users
+
+
+def test_ranking_is_updated_incrementally(user, subject):
+    (first, first_subject), (second, second_subject) = _create_users(2)
+    progressRepository.create_study_session(first, first_subject, 30)
+    progressRepository.create_study_session(second, second_subject, 20)
+
+    board = leaderboardRepository.get_leaderboard(user.id, 'all_time')
+    assert [entry['user_id'] for entry in board['ranking']] == [first, second]
+
+    # Minutos chegando como texto são convertidos antes de entrar no ranking
+    progressRepository.create_study_session(second, second_subject, '25')
+    leaderboardRepository.record_study_minutes(user.id, datetime.utcnow().date(), '5')
+
+    board = leaderboardRepository.get_leaderboard(user.id, 'all_time')
+    assert [(entry['user_id'], entry['total_minutes']) for entry in board['ranking']] == [(second, 45), (first, 30), (user.id, 5)]
+    assert board['me']['rank'] == 3
+
+
+def test_deleting_a_subject_only_refreshes_its_owner(user, subject):
+    (first, first_subject), (second, second_subject) = _create_users(2)
+    progressRepository.create_study_session(first, first_subject, 30)
+    progressRepository.create_study_session(second, second_subject, 20)
+    leaderboardRepository.get_leaderboard(user.id, 'all_time')
+    board = leaderboardRepository._boards[('all_time', None)]
+
+    subjectRepository.delete_subject(first_subject)
+
+    assert leaderboardRepository._boards[('all_time', None)] is board
+    assert leaderboardRepository.get_leaderboard(user.id, 'all_time')['ranking'][0]['user_id'] == second
+    assert first not in board.scores
@@ -0,0 +1,67 @@
+from flask_jwt_extended import create_access_token
+from models.study_session import StudySession
+
+
+def test_batch_sessions_reject_non_integral_durations_and_non_text_notes(app, user, subject):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    rows = [
+        {'subject_id': subject.id, 'duration_minutes': 30},
+        {'subject_id': subject.id, 'duration_minutes': 45.0, 'notes': 'revisão'},
+        {'subject_id': subject.id, 'duration_minutes': 29.9},
+        {'subject_id': subject.id, 'duration_minutes': True},
+        {'subject_id': subject.id, 'duration_minutes': '12.5'},
+        {'subject_id': subject.id, 'duration_minutes': 20, 'notes': {'texto': 'x'}},
+    ]
+
+    response = client.post('/api/progress/study-sessions/batch', json={'sessions': rows}, headers=headers)
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created'] == 2
+    assert sorted(error['index'] for error in body['errors']) == [2, 3, 4, 5]
+
+
+def test_single_session_coerces_numeric_strings(client, auth_headers, subject):
+    response = client.post('/api/progress/study-sessions', json={'subject_id': str(subject.id), 'duration_minutes': '30'}, headers=auth_headers)
+
+    assert response.status_code == 201
+    assert response.get_json()['session']['duration_minutes'] == 30
+    heatmap = client.get('/api/progress/heatmap', headers=auth_headers)
+    assert heatmap.status_code == 200
+
+
+def test_single_session_rejects_invalid_duration_without_writing(client, auth_headers, subject):
+    for duration in ('29.9', 0, -5, True, 'meia hora'):
+        response = client.post('/api/progress/study-sessions', json={'subject_id': subject.id, 'duration_minutes': duration}, headers=auth_headers)
+        assert response.status_code == 400
+
+    assert StudySession.query.count() == 0
+
+
+def test_heatmap_load_state_is_released(client, auth_headers, subject):
+    from repositories import progressRepository
+
+    client.get('/api/progress/heatmap', headers=auth_headers)
+    client.post('/api/progress/study-sessions', json={'subject_id': subject.id, 'duration_minutes': 15}, headers=auth_headers)
+
+    assert progressRepository._heatmap_loads == {}
+
+
+def test_timeseries_caps_range_per_granularity(client, auth_headers):
+    response = client.get('/api/progress/timeseries?from=0001-01-01&to=9999-12-31&granularity=day', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get('/api/progress/timeseries?from=2000-01-01&granularity=month', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get('/api/progress/timeseries?from=2025-01-01&to=2025-12-31&granularity=day', headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['buckets']) == 365
+
+    response = client.get('/api/progress/timeseries?from=2015-01-01&to=2025-12-31&granularity=month', headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['buckets']) == 132
+
+    response = client.get('/api/progress/timeseries?granularity=year', headers=auth_headers)
+    assert response.status_code == 400
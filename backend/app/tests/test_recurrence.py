@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta, timezone
+
+from repositories import eventRepository
+from utils.recurrence import iter_starts, last_occurrence_end, parse_rrule
+
+
+class _Series:
+    def __init__(self, start_date, end_date, recurrence_rule):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.recurrence_rule = recurrence_rule
+
+
+def test_expansion_accepts_timezone_aware_input():
+    start = datetime(2026, 1, 5, 13, 0, tzinfo=timezone(timedelta(hours=-3)))
+    series = _Series(start, start + timedelta(hours=1), 'FREQ=WEEKLY;UNTIL=20260131')
+
+    starts = list(iter_starts(series.start_date, parse_rrule(series.recurrence_rule)))
+
+    assert starts == [datetime(2026, 1, day, 16) for day in (5, 12, 19, 26)]
+    assert last_occurrence_end(series) == datetime(2026, 1, 26, 17)
+
+
+def test_count_end_with_timezone_aware_input():
+    start = datetime(2026, 1, 5, 16, 0, tzinfo=timezone.utc)
+    series = _Series(start, start + timedelta(hours=1), 'FREQ=DAILY;COUNT=10')
+
+    assert last_occurrence_end(series) == datetime(2026, 1, 14, 17)
+
+
+def test_create_recurring_event_with_utc_suffixed_dates(client, auth_headers):
+    response = client.post('/api/events', json={
+        'title': 'Monitoria',
+        'start_date': '2026-10-05T17:00:00.000Z',
+        'end_date': '2026-10-05T18:00:00.000Z',
+        'recurrence_rule': 'FREQ=WEEKLY;UNTIL=20261231'
+    }, headers=auth_headers)
+
+    assert response.status_code == 201
+    event = response.get_json()['event']
+    assert event['start_date'] == '2026-10-05T17:00:00'
+    assert eventRepository.get_event_by_id(event['id']).recurrence_end == datetime(2026, 12, 28, 18)
+
+
+def test_update_recurring_event_with_offset_dates(client, auth_headers, user):
+    event = eventRepository.create_event(
+        user.id, 'Monitoria', datetime(2026, 10, 5, 17), datetime(2026, 10, 5, 18), recurrence_rule='FREQ=DAILY;COUNT=3'
+    )
+
+    response = client.put(f'/api/events/{event.id}', json={
+        'start_date': '2026-10-06T09:00:00-03:00',
+        'end_date': '2026-10-06T10:00:00-03:00'
+    }, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert eventRepository.get_event_by_id(event.id).recurrence_end == datetime(2026, 10, 8, 13)
+
+
+def _occurrences(user_id, start, end):
+    return [(occurrence.title, occurrence.start_date) for occurrence in eventRepository.iter_event_occurrences(user_id, start, end)]
+
+
+def test_count_limits_expansion(user):
+    eventRepository.create_event(user.id, 'Aula', datetime(2026, 3, 2, 8), datetime(2026, 3, 2, 10),
+                                 recurrence_rule='FREQ=WEEKLY;BYDAY=MO,WE;COUNT=5')
+
+    starts = [start for _, start in _occurrences(user.id, datetime(2026, 1, 1), datetime(2026, 12, 31))]
+
+    assert starts == [datetime(2026, 3, day, 8) for day in (2, 4, 9, 11, 16)]
+
+
+def test_until_is_inclusive_and_sets_series_end(user):
+    event = eventRepository.create_event(user.id, 'Plantão', datetime(2026, 1, 31, 9), datetime(2026, 1, 31, 10),
+                                         recurrence_rule='FREQ=MONTHLY;UNTIL=20260731')
+
+    starts = [start for _, start in _occurrences(user.id, datetime(2026, 1, 1), datetime(2026, 12, 31))]
+
+    # Meses sem dia 31 não geram ocorrência
+    assert starts == [datetime(2026, month, 31, 9) for month in (1, 3, 5, 7)]
+    assert event.recurrence_end == datetime(2026, 7, 31, 10)
+
+
+def test_windowed_expansion_only_returns_occurrences_touching_the_window(user):
+    eventRepository.create_event(user.id, 'Leitura', datetime(2020, 1, 1, 23), datetime(2020, 1, 2, 1),
+                                 recurrence_rule='FREQ=DAILY')
+
+    occurrences = _occurrences(user.id, datetime(2026, 6, 10), datetime(2026, 6, 12))
+
+    # A ocorrência que começa no dia 9 termina dentro da janela
+    assert [start for _, start in occurrences] == [datetime(2026, 6, day, 23) for day in (9, 10, 11)]
+
+
+def test_exceptions_and_overrides_replace_single_occurrences(client, auth_headers, user):
+    event = eventRepository.create_event(user.id, 'Grupo', datetime(2026, 5, 4, 18), datetime(2026, 5, 4, 19),
+                                         recurrence_rule='FREQ=WEEKLY;COUNT=4')
+
+    response = client.post(f'/api/events/{event.id}/exceptions', json={'recurrence_id': '2026-05-11T18:00:00Z'}, headers=auth_headers)
+    assert response.status_code == 200
+    response = client.put(f'/api/events/{event.id}/overrides', json={
+        'recurrence_id': '2026-05-18T18:00:00',
+        'title': 'Grupo (remarcado)',
+        'start_date': '2026-05-19T20:00:00',
+        'end_date': '2026-05-19T21:00:00'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    assert _occurrences(user.id, datetime(2026, 5, 1), datetime(2026, 5, 31)) == [
+        ('Grupo', datetime(2026, 5, 4, 18)),
+        ('Grupo (remarcado)', datetime(2026, 5, 19, 20)),
+        ('Grupo', datetime(2026, 5, 25, 18)),
+    ]
+
+
+def test_exception_must_match_an_occurrence(client, auth_headers, user):
+    event = eventRepository.create_event(user.id, 'Grupo', datetime(2026, 5, 4, 18), datetime(2026, 5, 4, 19),
+                                         recurrence_rule='FREQ=WEEKLY;COUNT=4')
+
+    response = client.post(f'/api/events/{event.id}/exceptions', json={'recurrence_id': '2026-05-12T18:00:00'}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_unsupported_rule_parts_are_rejected(client, auth_headers):
+    response = client.post('/api/events', json={
+        'title': 'Mensal',
+        'start_date': '2026-05-04T18:00:00',
+        'end_date': '2026-05-04T19:00:00',
+        'recurrence_rule': 'FREQ=MONTHLY;BYSETPOS=-1;BYDAY=MO'
+    }, headers=auth_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import time
+
+from bench_reminders import build_scheduler
+from repositories import eventRepository
+from utils import mail
+from utils.reminders import ReminderScheduler
+
+
+def test_scaled_scheduler_pops_in_order_and_skips_stale_entries():
+    now = datetime(2026, 1, 1)
+    scheduler = build_scheduler(100_000, now)
+    for i in range(0, 100_000, 2):
+        scheduler.cancel(('task', i))
+    scheduler.schedule(('task', 1), 1, now + timedelta(hours=10), {'type': 'task', 'id': 1})
+
+    due = scheduler.pop_due(now + timedelta(hours=6))
+
+    assert len(due) == 49_999
+    assert all(payload['id'] % 2 for _, payload in due)
+    assert len(scheduler) == 0
+
+
+def test_series_overrides_are_loaded_in_one_query(app, user, query_counter):
+    start = datetime.utcnow() + timedelta(hours=1)
+    override_ids = set()
+    for i in range(10):
+        event = eventRepository.create_event(user.id, f'Série {i}', start, start + timedelta(hours=1), recurrence_rule='FREQ=DAILY')
+        override_ids.add(eventRepository.save_event_override(event.id, start, title='Remarcada').id)
+
+    scheduler = ReminderScheduler()
+    scheduler._horizon_end = datetime.utcnow()
+    query_counter.reset()
+    scheduler._load_window(datetime.utcnow(), datetime.utcnow() + timedelta(hours=6))
+
+    # Tarefas, eventos avulsos, séries e sobrescritas: uma query cada
+    assert query_counter.count == 4
+    # A primeira ocorrência de cada série foi sobrescrita: só as sobrescritas têm lembrete na janela
+    assert {key for key in scheduler._entries} == {('event', event_id) for event_id in override_ids}
+
+
+def test_email_fallback_does_not_block_the_scheduler(app, user, monkeypatch):
+    sent = []
+
+    def slow_send(recipient, title, when, kind):
+        time.sleep(0.5)
+        sent.append(title)
+    monkeypatch.setattr(mail, 'send_reminder_email', slow_send)
+
+    scheduler = ReminderScheduler()
+    scheduler._app = app
+    started = time.perf_counter()
+    scheduler._dispatch(user.id, {'type': 'task', 'id': 1, 'title': 'Prova', 'at': datetime.utcnow().isoformat()})
+
+    assert time.perf_counter() - started < 0.3
+    deadline = time.time() + 5
+    while not sent and time.time() < deadline:
+        time.sleep(0.05)
+    assert sent == ['Prova']
+
+
+def test_reminder_email_escapes_user_content(app, user, monkeypatch):
+    messages = []
+
+    class FakeSMTP:
+        def __init__(self, *args):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def starttls(self):
+            pass
+
+        def login(self, *args):
+            pass
+
+        def send_message(self, message):
+            messages.append(message)
+    monkeypatch.setattr(mail.smtplib, 'SMTP', FakeSMTP)
+    app.config.update(MAIL_USERNAME='lembretes@studysphere.com', MAIL_PASSWORD='x')
+
+    mail.send_reminder_email(user, '<script>alert(1)</script>', datetime(2026, 1, 1, 10), kind='tarefa')
+
+    html = messages[0].get_body(('html',)).get_content()
+    assert '<script>' not in html
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in html
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from models.study_daily_rollup import StudyDailyRollup
+from repositories import progressRepository
+from utils.db import db
+
+
+def _study_on(user, subject, dates):
+    for date in dates:
+        db.session.add(StudyDailyRollup(user.id, date, subject.id, minutes=30, session_count=1))
+    db.session.commit()
+
+
+def test_streak_query_count_does_not_grow_with_history(user, subject, query_counter):
+    today = datetime.utcnow().date()
+    _study_on(user, subject, [today - timedelta(days=offset) for offset in range(3)])
+    user_id = user.id
+
+    query_counter.reset()
+    short = progressRepository.get_streak_stats(user_id)
+    short_queries = query_counter.count
+
+    # Cinco anos de histórico, com uma falta a cada sete dias
+    _study_on(user, subject, [today - timedelta(days=offset) for offset in range(4, 5 * 365) if offset % 7])
+    query_counter.reset()
+    long = progressRepository.get_streak_stats(user_id, history_limit=5)
+
+    assert short['current_streak'] == long['current_streak'] == 3
+    assert long['longest_streak'] == 6
+    assert len(long['history']) == 5
+    assert query_counter.count == short_queries == 1
+
+
+def test_streak_rejects_negative_history_limit(client, auth_headers):
+    assert client.get('/api/progress/streak?history_limit=-1', headers=auth_headers).status_code == 400
+    assert client.get('/api/progress/streak?history_limit=0', headers=auth_headers).get_json()['history'] == []
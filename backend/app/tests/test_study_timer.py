@@ -0,0 +1,47 @@
+from models.study_session import StudySession
+from utils.socket_handlers import study_timer
+from utils.socket_handlers.connections import user_sids
+
+
+def _run_timer(user, subject, started):
+    timer = study_timer._new_timer(subject.id, started)
+    study_timer._timers[str(user.id)] = timer
+    return timer
+
+
+def test_disconnected_timer_is_closed_with_the_connected_time(app, user, subject):
+    started = 1000.0
+    _run_timer(user, subject, started)
+    try:
+        # 30 minutos com o usuário conectado, depois a conexão cai
+        user_sids[str(user.id)] = {'sid-1'}
+        study_timer._close_idle_timers(app, started + 1800)
+        user_sids.pop(str(user.id))
+
+        study_timer._close_idle_timers(app, started + 1800 + study_timer.IDLE_TIMER_TTL - 1)
+        assert str(user.id) in study_timer._timers
+
+        study_timer._close_idle_timers(app, started + 1800 + study_timer.IDLE_TIMER_TTL)
+        assert str(user.id) not in study_timer._timers
+        assert [session.duration_minutes for session in StudySession.query.all()] == [30]
+    finally:
+        study_timer._timers.clear()
+        user_sids.pop(str(user.id), None)
+
+
+def test_paused_timer_expires_even_while_connected(app, user, subject):
+    started = 1000.0
+    timer = _run_timer(user, subject, started)
+    try:
+        user_sids[str(user.id)] = {'sid-1'}
+        timer['accumulated'] = 600.0
+        timer['running_since'] = None
+        timer['last_seen'] = started + 600
+
+        study_timer._close_idle_timers(app, started + 600 + study_timer.IDLE_TIMER_TTL)
+
+        assert study_timer._timers == {}
+        assert [session.duration_minutes for session in StudySession.query.all()] == [10]
+    finally:
+        study_timer._timers.clear()
+        user_sids.pop(str(user.id), None)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from models import Subject
+from models.task import Task
+from repositories import taskRepository
+from utils.db import db
+
+
+def _create_subjects_with_tasks(user, subjects=10, tasks_per_subject=5):
+    now = datetime.utcnow()
+    for i in range(subjects):
+        subject = Subject(user_id=user.id, name=f'Matéria {i}')
+        db.session.add(subject)
+        db.session.flush()
+        for j in range(tasks_per_subject):
+            task = Task(user.id, subject.id, f'Tarefa {i}.{j}', due_date=now + timedelta(days=j - 2, hours=1))
+            task.completed = j % 3 == 0
+            db.session.add(task)
+    db.session.commit()
+
+
+def test_grouped_tasks_query_count_does_not_grow_with_subjects(user, query_counter):
+    _create_subjects_with_tasks(user, subjects=2)
+    user_id = user.id
+    db.session.expire_all()
+    query_counter.reset()
+    taskRepository.get_tasks_by_subject_grouped(user_id)
+    few_subjects = query_counter.count
+
+    _create_subjects_with_tasks(user, subjects=20)
+    db.session.expire_all()
+    query_counter.reset()
+    grouped = taskRepository.get_tasks_by_subject_grouped(user_id)
+
+    assert len(grouped) == 22
+    assert query_counter.count == few_subjects == 2
+
+
+def test_grouped_tasks_counts_and_filters(user):
+    _create_subjects_with_tasks(user, subjects=1, tasks_per_subject=5)
+
+    group, = taskRepository.get_tasks_by_subject_grouped(user.id).values()
+    # Prazos em -2..+2 dias; concluídas as tarefas 0 e 3
+    assert group['counts'] == {'open': 3, 'overdue': 1, 'done': 2}
+    assert len(group['tasks']) == 5
+
+    group, = taskRepository.get_tasks_by_subject_grouped(user.id, completed=False, due_before=datetime.utcnow()).values()
+    assert [task['title'] for task in group['tasks']] == ['Tarefa 0.1']
+
+
+def test_grouped_tasks_rejects_malformed_due_before(app, user):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    response = client.get('/api/tasks/by-subject?due_before=amanhã', headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_batch_rejects_non_object_fields(app, user, subject):
+    task = Task(user.id, subject.id, 'Revisar')
+    db.session.add(task)
+    db.session.commit()
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    for fields in (['title'], {'due_date': 'ontem'}):
+        response = client.post('/api/tasks/batch', json={'operations': [{'op': 'update', 'id': task.id, 'fields': fields}]}, headers=headers)
+        assert response.status_code == 400
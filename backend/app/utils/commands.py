@@ -0,0 +1,37 @@
+import click
+from flask.cli import with_appcontext
+
+@click.command('rebuild-study-rollup')
+@click.option('--user-id', type=int, default=None, help='Reconstrói apenas o agregado deste usuário')
+@with_appcontext
+def rebuild_study_rollup(user_id):
+    """Reconstrói a tabela study_daily_rollup a partir de study_session"""
+    from repositories import progressRepository
+
+    rows = progressRepository.rebuild_study_rollup(user_id)
+    click.echo(f'Agregado diário reconstruído: {rows} linhas.')
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index():
+    """Reconstrói o índice de busca textual (search_document)"""
+    from repositories import searchRepository
+
+    documents = searchRepository.rebuild_search_index()
+    click.echo(f'Índice de busca reconstruído: {documents} documentos.')
+
+@click.command('rebuild-folder-sizes')
+@click.option('--check', is_flag=True, help='Apenas verifica, sem corrigir os contadores')
+@with_appcontext
+def rebuild_folder_sizes(check):
+    """Verifica e reconstrói os contadores de arquivos e bytes das pastas"""
+    from repositories import folderRepository
+
+    checked, mismatched = folderRepository.rebuild_folder_sizes(fix=not check)
+    action = 'divergentes' if check else 'corrigidas'
+    click.echo(f'Pastas verificadas: {checked}; {action}: {mismatched}.')
+
+def register_commands(app):
+    app.cli.add_command(rebuild_study_rollup)
+    app.cli.add_command(rebuild_search_index)
+    app.cli.add_command(rebuild_folder_sizes)
@@ -0,0 +1,16 @@
+#Conversão de datas recebidas da API para o formato armazenado (UTC sem fuso)
+from datetime import datetime, timezone
+
+
+def to_naive_utc(moment):
+    """Converte um datetime com fuso para UTC sem fuso; datetimes sem fuso são mantidos"""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_datetime(value):
+    """Lê uma data ISO 8601 (ex.: '2026-10-01T03:00:00.000Z') como UTC sem fuso; levanta ValueError se inválida"""
+    if not isinstance(value, str):
+        raise ValueError(f"Data inválida: {value!r}")
+    return to_naive_utc(datetime.fromisoformat(value))
@@ -0,0 +1,42 @@
+from flask import Response, stream_with_context
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _iter_ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+def _iter_csv(records, fields, chunk_size=500):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+
+    for i, record in enumerate(records, start=1):
+        writer.writerow(record)
+        # Envia em blocos para não gerar um chunk HTTP por linha
+        if i % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue()
+
+def stream_export(records, fields, export_format, filename):
+    """Gera uma resposta HTTP em streaming (NDJSON ou CSV) a partir de um iterador de dicionários"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato inválido: {export_format}. Use 'ndjson' ou 'csv'")
+
+    if export_format == 'csv':
+        body = _iter_csv(records, fields)
+    else:
+        body = _iter_ndjson(records)
+
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
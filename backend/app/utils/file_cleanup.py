@@ -0,0 +1,21 @@
+#Remoção de arquivos físicos em segundo plano (depois do commit das exclusões no banco)
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-cleanup')
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            print(f"Erro ao deletar arquivo físico {path}: {e}")
+
+
+def remove_files_later(paths):
+    """Agenda a remoção dos arquivos físicos sem bloquear a requisição"""
+    paths = [path for path in paths if path]
+    if paths:
+        _executor.submit(_remove_files, paths)
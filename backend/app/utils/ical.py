@@ -0,0 +1,200 @@
+#Geração (em streaming) e leitura de calendários iCalendar (RFC 5545)
+from datetime import datetime, timedelta, timezone
+from utils.recurrence import normalize_rrule
+import re
+
+PRODID = '-//StudySphere//Calendario//PT-BR'
+MAX_LINE_OCTETS = 75
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+
+_DURATION_RE = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+def _unescape(text):
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), text)
+
+def _fold(line):
+    """Quebra linhas com mais de 75 octetos (continuação começa com espaço)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    limit = MAX_LINE_OCTETS
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Não cortar no meio de um caractere multibyte
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = MAX_LINE_OCTETS - 1
+    return '\r\n '.join(parts) + '\r\n'
+
+def _format_datetime(moment):
+    return moment.strftime('%Y%m%dT%H%M%S')
+
+def _format_date(moment):
+    return moment.strftime('%Y%m%d')
+
+
+def _event_lines(event, stamp):
+    lines = ['BEGIN:VEVENT', f'UID:event-{event.recurrence_parent_id or event.id}@studysphere', f'DTSTAMP:{stamp}']
+    if event.all_day:
+        # DTEND é exclusivo em eventos de dia inteiro
+        lines.append(f'DTSTART;VALUE=DATE:{_format_date(event.start_date)}')
+        lines.append(f'DTEND;VALUE=DATE:{_format_date(event.end_date + timedelta(days=1))}')
+    else:
+        lines.append(f'DTSTART:{_format_datetime(event.start_date)}')
+        lines.append(f'DTEND:{_format_datetime(event.end_date)}')
+    lines.append(f'SUMMARY:{_escape(event.title)}')
+    if event.description:
+        lines.append(f'DESCRIPTION:{_escape(event.description)}')
+    if event.recurrence_rule:
+        lines.append(f'RRULE:{normalize_rrule(event.recurrence_rule)}')
+        for exdate in sorted(event.get_exdates()):
+            lines.append(f'EXDATE:{_format_datetime(exdate)}')
+    if event.recurrence_id:
+        lines.append(f'RECURRENCE-ID:{_format_datetime(event.recurrence_id)}')
+    if event.updated_at:
+        lines.append(f'LAST-MODIFIED:{_format_datetime(event.updated_at)}')
+    lines.append('END:VEVENT')
+    return lines
+
+def _task_lines(task, stamp):
+    title = f'Prazo: {task.title}'
+    return [
+        'BEGIN:VEVENT',
+        f'UID:task-{task.id}@studysphere',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{_format_datetime(task.due_date)}',
+        f'DTEND:{_format_datetime(task.due_date)}',
+        f'SUMMARY:{_escape(title)}',
+        *([f'DESCRIPTION:{_escape(task.description)}'] if task.description else []),
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT'
+    ]
+
+def iter_calendar(events, tasks, name='StudySphere', chunk_size=200):
+    """Gera o arquivo .ics em blocos a partir de iteradores de eventos e tarefas (com prazo)"""
+    stamp = _format_datetime(datetime.utcnow()) + 'Z'
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', f'X-WR-CALNAME:{_escape(name)}']
+    buffer = [_fold(line) for line in header]
+
+    def items():
+        for event in events:
+            yield _event_lines(event, stamp)
+        for task in tasks:
+            yield _task_lines(task, stamp)
+
+    for i, lines in enumerate(items(), start=1):
+        buffer.extend(_fold(line) for line in lines)
+        if i % chunk_size == 0:
+            yield ''.join(buffer)
+            buffer = []
+
+    buffer.append(_fold('END:VCALENDAR'))
+    yield ''.join(buffer)
+
+
+# Leitura
+
+def _unfold(text):
+    lines = []
+    for raw in text.splitlines():
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] += raw[1:]
+        elif raw:
+            lines.append(raw)
+    return lines
+
+def _split_property(line):
+    """Separa 'NOME;PARAM=X:valor' em (NOME, {PARAM: X}, valor)"""
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    return name.upper(), dict(param.upper().split('=', 1) for param in params if '=' in param), value
+
+def _parse_datetime(value, params):
+    """Converte DATE ou DATE-TIME; horários em UTC (sufixo Z) viram datetime ingênuo em UTC"""
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d'), True
+    if value.endswith('Z'):
+        moment = datetime.strptime(value[:-1], '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc)
+        return moment.replace(tzinfo=None), False
+    # TZID e horário flutuante são mantidos como estão
+    return datetime.strptime(value, '%Y%m%dT%H%M%S'), False
+
+def _parse_duration(value):
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"DURATION inválida: {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                         minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -duration if sign == '-' else duration
+
+def _build_event(properties, number):
+    if 'DTSTART' not in properties:
+        raise ValueError(f"Evento {number}: DTSTART ausente")
+    start, all_day = _parse_datetime(*properties['DTSTART'])
+
+    if 'DTEND' in properties:
+        end, _ = _parse_datetime(*properties['DTEND'])
+        if all_day:
+            # DTEND é exclusivo em eventos de dia inteiro; internamente o fim é o último dia
+            end = max(start, end - timedelta(days=1))
+    elif 'DURATION' in properties:
+        end = start + _parse_duration(properties['DURATION'][0])
+    else:
+        end = start if all_day else start + DEFAULT_EVENT_DURATION
+    if end < start:
+        raise ValueError(f"Evento {number}: DTEND anterior a DTSTART")
+
+    exdates = set()
+    for value, params in properties.get('EXDATE', []):
+        for item in value.split(','):
+            exdates.add(_parse_datetime(item, params)[0])
+
+    return {
+        'title': _unescape(properties.get('SUMMARY', ('Sem título', {}))[0])[:255] or 'Sem título',
+        'description': _unescape(properties['DESCRIPTION'][0]) if 'DESCRIPTION' in properties else None,
+        'start_date': start,
+        'end_date': end,
+        'all_day': all_day,
+        'recurrence_rule': normalize_rrule(properties['RRULE'][0]) if 'RRULE' in properties else None,
+        'exdates': exdates
+    }
+
+def parse_calendar(text, max_events=None):
+    """Lê os VEVENTs de um arquivo .ics; levanta ValueError se o arquivo for inválido"""
+    lines = _unfold(text)
+    if not lines or lines[0].strip().upper() != 'BEGIN:VCALENDAR':
+        raise ValueError("Arquivo .ics inválido: BEGIN:VCALENDAR ausente")
+
+    events = []
+    properties = None
+    depth = 0  # componentes aninhados (ex.: VALARM) dentro do VEVENT são ignorados
+    for line in lines:
+        name, params, value = _split_property(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            properties, depth = {}, 0
+        elif properties is not None and name == 'BEGIN':
+            depth += 1
+        elif properties is not None and name == 'END' and value.upper() != 'VEVENT':
+            depth -= 1
+        elif properties is not None and name == 'END':
+            # Ocorrências sobrescritas (RECURRENCE-ID) não são importadas
+            if 'RECURRENCE-ID' not in properties:
+                events.append(_build_event(properties, len(events) + 1))
+                if max_events is not None and len(events) > max_events:
+                    raise ValueError(f"O arquivo excede o limite de {max_events} eventos")
+            properties = None
+        elif properties is not None and depth == 0:
+            if name == 'EXDATE':
+                properties.setdefault('EXDATE', []).append((value, params))
+            elif name not in properties:
+                properties[name] = (value, params)
+    return events
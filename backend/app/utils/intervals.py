@@ -0,0 +1,56 @@
+#Índice de intervalos ordenados para consultas de sobreposição e horários livres
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+
+class BusyIndex:
+    """Intervalos ocupados de um usuário, ordenados por início, cobrindo a janela [start, end]"""
+
+    def __init__(self, start, end, entries):
+        # entries: (início, fim, tipo, id, título, id_da_série)
+        self.start = start
+        self.end = end
+        self._entries = sorted(entries, key=lambda entry: (entry[0], entry[1]))
+        self._starts = [entry[0] for entry in self._entries]
+        # Maior fim entre os intervalos [0..i]: permite parar a varredura para trás cedo
+        self._max_ends = list(accumulate((entry[1] for entry in self._entries), max))
+
+        # União dos intervalos ocupados (usada para encontrar horários livres)
+        merged = []
+        for entry_start, entry_end, *_ in self._entries:
+            if merged and entry_start <= merged[-1][1]:
+                if entry_end > merged[-1][1]:
+                    merged[-1][1] = entry_end
+            else:
+                merged.append([entry_start, entry_end])
+        self._merged = merged
+        self._merged_ends = [interval[1] for interval in merged]
+
+    def covers(self, start, end):
+        return self.start <= start and end <= self.end
+
+    def overlapping(self, start, end):
+        """Intervalos que se sobrepõem a [start, end), em ordem de início"""
+        found = []
+        i = bisect_left(self._starts, end) - 1
+        while i >= 0 and self._max_ends[i] > start:
+            if self._entries[i][1] > start:
+                found.append(self._entries[i])
+            i -= 1
+        found.reverse()
+        return found
+
+    def free_slots(self, start, end, min_duration):
+        """Lacunas de pelo menos min_duration entre os intervalos ocupados dentro de [start, end]"""
+        slots = []
+        cursor = start
+        i = bisect_right(self._merged_ends, start)
+        while i < len(self._merged) and self._merged[i][0] < end:
+            busy_start, busy_end = self._merged[i]
+            if busy_start - cursor >= min_duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            i += 1
+        if end - cursor >= min_duration:
+            slots.append((cursor, end))
+        return slots
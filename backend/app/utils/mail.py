@@ -2,6 +2,7 @@ import smtplib
 from email.message import EmailMessage
 from flask import current_app
 from datetime import datetime
+from html import escape
 import pytz
 
 LOGO_URL = "https://imgur.com/a/NPCvaq.png"
@@ -146,3 +147,63 @@ Equipe StudySphere
         smtp.send_message(msg)
 
     print('E-mail de redefinição enviado com sucesso!')
+
+
+def send_reminder_email(user, title, when, kind='tarefa'):
+    """Envia um lembrete por e-mail (usado quando o usuário não está conectado)"""
+    when_text = when.strftime("%d/%m/%Y às %H:%M")
+    label = 'O prazo da tarefa' if kind == 'tarefa' else 'O evento'
+    verb = 'vence' if kind == 'tarefa' else 'começa'
+    # Título e nome vêm do usuário: escapar antes de entrar no HTML
+    safe_title, safe_name = escape(title), escape(user.nome_completo)
+
+    plain_text = f"""\
+Olá {user.nome_completo},
+
+Este é um lembrete da StudySphere.
+
+{label} "{title}" {verb} em {when_text}.
+
+Atenciosamente,
+Equipe StudySphere
+"""
+
+    html_content = f"""\
+<html>
+  <body style="font-family: Arial, sans-serif; color: #333; margin:0; padding:0;">
+    <!-- Logo no topo -->
+    <div style="text-align:center; padding:20px;">
+      <img src="{LOGO_URL}" alt="StudySphere" width="200" style="display:block; margin:0 auto;">
+    </div>
+
+    <div style="padding: 0 20px;">
+      <h2 style="color: #3b5a74;">Olá {safe_name},</h2>
+      <p>Este é um lembrete da <strong>StudySphere</strong>.</p>
+      <p>{label} <strong>{safe_title}</strong> {verb} em <strong>{when_text}</strong>.</p>
+    </div>
+
+    <!-- Rodapé -->
+    <div style="margin-top:30px; text-align:center; font-size:0.9em; color:#555; padding:20px; border-top:1px solid #ddd;">
+      <p>© StudySphere 2025 — Todos os direitos reservados</p>
+      <p>Suporte: suporte.studysphere@gmail.com</p>
+    </div>
+  </body>
+</html>
+"""
+
+    msg = EmailMessage()
+    msg['Subject'] = f'Lembrete: {title} - StudySphere'
+    msg['From'] = f"Suporte StudySphere <{current_app.config['MAIL_USERNAME']}>"
+    msg['To'] = user.email
+    msg.set_content(plain_text)
+    msg.add_alternative(html_content, subtype='html')
+
+    EMAIL = current_app.config['MAIL_USERNAME']
+    SENHA = current_app.config['MAIL_PASSWORD']
+
+    with smtplib.SMTP('smtp.gmail.com', 587) as smtp:
+        smtp.starttls()
+        smtp.login(EMAIL, SENHA)
+        smtp.send_message(msg)
+
+    print('E-mail de lembrete enviado com sucesso!')
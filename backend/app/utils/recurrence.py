@@ -0,0 +1,234 @@
+#Expansão de eventos recorrentes (subconjunto do RRULE da RFC 5545), sempre de forma preguiçosa
+from datetime import datetime, timedelta
+from utils.dates import to_naive_utc
+import calendar
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+RULE_PARTS = ('FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY')
+MAX_COUNT = 5000
+MAX_YEAR = 2199  # nenhuma ocorrência é gerada depois deste ano (limita UNTIL e séries sem fim)
+
+
+def normalize_rrule(rule):
+    """Remove o prefixo 'RRULE:' e espaços, deixando a regra no formato armazenado"""
+    rule = (rule or '').strip()
+    if rule.upper().startswith('RRULE:'):
+        rule = rule[6:].strip()
+    return rule or None
+
+
+def parse_rrule(rule):
+    """Converte uma string RRULE (ex.: FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261231T235959) em dicionário"""
+    rule = normalize_rrule(rule) or ''
+
+    parts = {}
+    for part in rule.strip().split(';'):
+        if not part:
+            continue
+        if '=' not in part:
+            raise ValueError(f"Regra de recorrência inválida: {part}")
+        key, value = part.split('=', 1)
+        key = key.strip().upper()
+        # Partes não suportadas mudariam as datas geradas: melhor recusar do que expandir errado
+        if key not in RULE_PARTS:
+            raise ValueError(f"Parte da regra não suportada: {key}. Use apenas {', '.join(RULE_PARTS)}")
+        parts[key] = value.strip().upper()
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ inválida. Use: {', '.join(FREQUENCIES)}")
+
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL e COUNT devem ser inteiros")
+    if interval < 1 or (count is not None and not 1 <= count <= MAX_COUNT):
+        raise ValueError(f"INTERVAL deve ser positivo e COUNT entre 1 e {MAX_COUNT}")
+
+    until = None
+    if 'UNTIL' in parts:
+        value = parts['UNTIL'].rstrip('Z')
+        try:
+            until = datetime.strptime(value, '%Y%m%dT%H%M%S') if 'T' in value else datetime.strptime(value, '%Y%m%d').replace(hour=23, minute=59, second=59)
+        except ValueError:
+            raise ValueError("UNTIL inválido. Use YYYYMMDD ou YYYYMMDDTHHMMSS")
+        if until.year > MAX_YEAR:
+            raise ValueError(f"UNTIL deve ser anterior a {MAX_YEAR + 1}")
+
+    byday = None
+    if 'BYDAY' in parts:
+        try:
+            byday = sorted({WEEKDAYS[day] for day in parts['BYDAY'].split(',')})
+        except KeyError:
+            raise ValueError("BYDAY inválido. Use MO,TU,WE,TH,FR,SA,SU")
+        if freq != 'WEEKLY':
+            raise ValueError("BYDAY só é suportado com FREQ=WEEKLY")
+
+    return {'freq': freq, 'interval': interval, 'count': count, 'until': until, 'byday': byday}
+
+
+def _add_months(moment, months):
+    """Soma meses mantendo o dia; retorna None se o dia não existir no mês de destino"""
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    if moment.day > calendar.monthrange(year, month)[1]:
+        return None
+    return moment.replace(year=year, month=month)
+
+
+def iter_starts(dtstart, rule, after=None):
+    """Gera os inícios das ocorrências em ordem; `after` permite pular direto para perto da janela"""
+    dtstart, after = to_naive_utc(dtstart), to_naive_utc(after)
+    freq, interval, count, until = rule['freq'], rule['interval'], rule['count'], rule['until']
+    emitted = 0
+
+    # Sem COUNT, regras de período fixo podem saltar os períodos anteriores à janela
+    skip = 0
+    if after is not None and count is None and after > dtstart and freq in ('DAILY', 'WEEKLY'):
+        period = timedelta(days=interval if freq == 'DAILY' else 7 * interval)
+        skip = max(0, (after - dtstart) // period - 1)
+
+    if freq == 'WEEKLY':
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        byday = rule['byday'] or [dtstart.weekday()]
+        step = skip
+        while True:
+            try:
+                base = week_start + timedelta(weeks=step * interval)
+            except OverflowError:
+                return
+            for weekday in byday:
+                start = base + timedelta(days=weekday)
+                if start < dtstart:
+                    continue
+                if (until is not None and start > until) or start.year > MAX_YEAR:
+                    return
+                yield start
+                emitted += 1
+                if count is not None and emitted >= count:
+                    return
+            step += 1
+        return
+
+    step = skip
+    while True:
+        try:
+            if freq == 'DAILY':
+                start = dtstart + timedelta(days=step * interval)
+            elif freq == 'MONTHLY':
+                start = _add_months(dtstart, step * interval)
+            else:
+                start = _add_months(dtstart, 12 * step * interval)
+        except (OverflowError, ValueError):
+            return
+        step += 1
+
+        if start is None:
+            # Ex.: dia 31 em meses de 30 dias não gera ocorrência
+            if step > 12 * 400:
+                return
+            continue
+        if (until is not None and start > until) or start.year > MAX_YEAR:
+            return
+        yield start
+        emitted += 1
+        if count is not None and emitted >= count:
+            return
+
+
+def _last_start_by_count(dtstart, rule):
+    """Início da última ocorrência de regras DAILY/WEEKLY com COUNT, sem percorrer a série"""
+    interval, count = rule['interval'], rule['count']
+    if rule['freq'] == 'DAILY':
+        return dtstart + timedelta(days=(count - 1) * interval)
+
+    byday = rule['byday'] or [dtstart.weekday()]
+    week_start = dtstart - timedelta(days=dtstart.weekday())
+    # Na primeira semana só contam os dias a partir de dtstart
+    first_week = [weekday for weekday in byday if weekday >= dtstart.weekday()]
+    if count <= len(first_week):
+        return week_start + timedelta(days=first_week[count - 1])
+    weeks, index = divmod(count - len(first_week) - 1, len(byday))
+    return week_start + timedelta(weeks=(weeks + 1) * interval, days=byday[index])
+
+
+def last_occurrence_end(event):
+    """Fim da última ocorrência da série, ou None se ela não tiver fim.
+
+    DAILY/WEEKLY são calculadas aritmeticamente (COUNT) ou saltando direto para perto de UNTIL;
+    MONTHLY/YEARLY percorrem no máximo MAX_COUNT ocorrências ou até MAX_YEAR.
+    """
+    rule = parse_rrule(event.recurrence_rule)
+    start_date = to_naive_utc(event.start_date)
+    duration = to_naive_utc(event.end_date) - start_date
+    if rule['count'] is None and rule['until'] is None:
+        return None
+
+    try:
+        if rule['freq'] in ('DAILY', 'WEEKLY') and rule['count'] is not None:
+            last = _last_start_by_count(start_date, rule)
+            if rule['until'] is not None and last > rule['until']:
+                # COUNT e UNTIL juntos: vale o que terminar antes
+                last = None
+                for last in iter_starts(start_date, dict(rule, count=None), after=rule['until']):
+                    pass
+            elif last.year > MAX_YEAR:
+                raise ValueError(f"A série ultrapassa o ano {MAX_YEAR}")
+        else:
+            after = rule['until'] if rule['count'] is None else None
+            last = None
+            for last in iter_starts(start_date, rule, after=after):
+                pass
+        return (last or start_date) + duration
+    except OverflowError:
+        raise ValueError("Regra de recorrência fora do intervalo de datas suportado")
+
+
+def next_occurrence_start(event, after, skip_starts=()):
+    """Início da primeira ocorrência posterior a `after`, ou None se a série já terminou"""
+    rule = parse_rrule(event.recurrence_rule)
+    after = to_naive_utc(after)
+    for start in iter_starts(event.start_date, rule, after=after):
+        if start > after and start not in skip_starts:
+            return start
+    return None
+
+
+class EventOccurrence:
+    """Cópia de um evento (ou de uma ocorrência de série) pronta para serialização"""
+
+    def __init__(self, data, start_date, end_date):
+        self._data = data
+        self.id = data['id']
+        self.user_id = data['user_id']
+        self.title = data['title']
+        self.series_id = data.get('series_id') or data.get('recurrence_parent_id')
+        self.all_day = bool(data.get('all_day'))
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def to_dict(self):
+        data = dict(self._data)
+        data['start_date'] = self.start_date.isoformat()
+        data['end_date'] = self.end_date.isoformat()
+        return data
+
+
+def iter_occurrences(event, window_start, window_end, skip_starts=()):
+    """Gera as ocorrências da série que tocam a janela, pulando exceções e ocorrências sobrescritas"""
+    rule = parse_rrule(event.recurrence_rule)
+    window_start, window_end = to_naive_utc(window_start), to_naive_utc(window_end)
+    duration = to_naive_utc(event.end_date) - to_naive_utc(event.start_date)
+    data = event.to_dict()
+    data['series_id'] = event.id
+
+    for start in iter_starts(event.start_date, rule, after=window_start - duration):
+        if start > window_end:
+            return
+        end = start + duration
+        if end < window_start or start in skip_starts:
+            continue
+        occurrence = dict(data, recurrence_id=start.isoformat())
+        yield EventOccurrence(occurrence, start, end)
@@ -0,0 +1,245 @@
+#Agendador de lembretes em memória (heap); só os itens das próximas horas ficam carregados
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import threading
+from sqlalchemy import or_
+from utils.extensions import socket_io
+
+TASK_REMINDER_LEAD = timedelta(hours=1)       # antecedência do lembrete de prazo de tarefa
+EVENT_REMINDER_LEAD = timedelta(minutes=15)   # antecedência do lembrete de evento
+LOAD_HORIZON = timedelta(hours=6)             # janela de itens mantidos no heap
+POLL_INTERVAL = 1                             # segundos entre verificações do heap
+
+# E-mails saem de um worker próprio: um SMTP lento não atrasa os demais lembretes
+_email_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='reminder-email')
+
+
+class ReminderScheduler:
+    """Heap de lembretes com remoção preguiçosa, atualizado pelas escritas dos repositórios"""
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}              # chave -> (versão, user_id, payload)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._horizon_end = None        # None enquanto o agendador não foi iniciado
+        self._app = None
+
+    @property
+    def running(self):
+        return self._horizon_end is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def schedule(self, key, user_id, fire_at, payload):
+        """Agenda (ou reagenda) um lembrete; itens além do horizonte são carregados depois"""
+        with self._lock:
+            if self._horizon_end is None:
+                return
+            self._entries.pop(key, None)
+            if fire_at > self._horizon_end:
+                return
+            version = next(self._counter)
+            self._entries[key] = (version, user_id, payload)
+            heapq.heappush(self._heap, (fire_at, version, key))
+
+    def cancel(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def pop_due(self, now):
+        """Remove e retorna os lembretes vencidos, descartando entradas canceladas ou substituídas"""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, version, key = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    del self._entries[key]
+                    due.append((entry[1], entry[2]))
+        return due
+
+    # Sincronização a partir dos repositórios
+
+    def sync_task(self, task):
+        key = ('task', task.id)
+        fire_at = _fire_at(task.due_date, TASK_REMINDER_LEAD)
+        if task.completed or fire_at is None:
+            return self.cancel(key)
+        self.schedule(key, task.user_id, fire_at, _task_payload(task))
+
+    def sync_event(self, event, replaced=None):
+        key = ('event', event.id)
+        if event.recurrence_rule:
+            return self._sync_series(key, event, replaced)
+        fire_at = _fire_at(event.start_date, EVENT_REMINDER_LEAD)
+        if fire_at is None:
+            return self.cancel(key)
+        self.schedule(key, event.user_id, fire_at, _event_payload(event))
+
+    def _sync_series(self, key, event, replaced=None):
+        """Séries têm um único lembrete agendado: o da próxima ocorrência"""
+        from utils.recurrence import next_occurrence_start
+
+        # Ocorrências sobrescritas têm lembrete próprio
+        if replaced is None:
+            replaced = _load_replaced([event.id]).get(event.id, set())
+        start = next_occurrence_start(
+            event, datetime.utcnow() + EVENT_REMINDER_LEAD, event.get_exdates() | replaced
+        )
+        if start is None:
+            return self.cancel(key)
+        payload = dict(_event_payload(event), at=start.isoformat())
+        self.schedule(key, event.user_id, start - EVENT_REMINDER_LEAD, payload)
+
+    def cancel_task(self, task_id):
+        self.cancel(('task', task_id))
+
+    def cancel_event(self, event_id):
+        self.cancel(('event', event_id))
+
+    # Carga incremental e despacho
+
+    def _load_window(self, start, end, initial=False):
+        """Carrega apenas tarefas e eventos cujo lembrete cai em (start, end]"""
+        from models.task import Task
+        from models.event import Event
+
+        # Na primeira carga também entram itens futuros cujo lembrete já deveria ter disparado
+        task_from = start if initial else start + TASK_REMINDER_LEAD
+        event_from = start if initial else start + EVENT_REMINDER_LEAD
+
+        tasks = Task.query.filter(
+            Task.completed.isnot(True),
+            Task.due_date > task_from,
+            Task.due_date <= end + TASK_REMINDER_LEAD
+        ).all()
+        events = Event.query.filter(
+            Event.recurrence_rule.is_(None),
+            Event.start_date > event_from,
+            Event.start_date <= end + EVENT_REMINDER_LEAD
+        ).all()
+        # Séries ativas são reavaliadas a cada carga para agendar a próxima ocorrência
+        events += Event.query.filter(
+            Event.recurrence_rule.isnot(None),
+            Event.start_date <= end + EVENT_REMINDER_LEAD,
+            or_(Event.recurrence_end.is_(None), Event.recurrence_end > start)
+        ).all()
+
+        series_ids = [event.id for event in events if event.recurrence_rule]
+        replaced = _load_replaced(series_ids) if series_ids else {}
+
+        with self._lock:
+            self._horizon_end = end
+        for task in tasks:
+            self.sync_task(task)
+        for event in events:
+            self.sync_event(event, replaced.get(event.id, set()))
+
+    def _dispatch(self, user_id, payload):
+        from models import UserPreferences
+        from utils.socket_handlers.connections import user_sids
+
+        prefs = UserPreferences.query.filter_by(user_id=user_id).first()
+        if prefs is not None and not prefs.study_reminders:
+            return
+
+        sids = list(user_sids.get(str(user_id), ()))
+        if sids:
+            for sid in sids:
+                socket_io.emit('reminder', payload, to=sid)
+            return
+
+        # Fallback por e-mail quando o usuário não está conectado
+        if prefs is None or prefs.email_notifications:
+            _email_executor.submit(self._send_email, user_id, payload)
+
+    def _send_email(self, user_id, payload):
+        from models import Usuario
+        from utils.mail import send_reminder_email
+
+        with self._app.app_context():
+            try:
+                user = Usuario.query.get(user_id)
+                if user is not None:
+                    send_reminder_email(
+                        user,
+                        payload['title'],
+                        datetime.fromisoformat(payload['at']),
+                        kind='tarefa' if payload['type'] == 'task' else 'evento'
+                    )
+            except Exception:
+                self._app.logger.exception(f"Erro ao enviar lembrete por e-mail para o usuário {user_id}")
+
+    def _run(self):
+        next_refill = datetime.utcnow()
+        initial = True
+        while True:
+            now = datetime.utcnow()
+            with self._app.app_context():
+                if now >= next_refill:
+                    try:
+                        self._load_window(self._horizon_end, now + LOAD_HORIZON, initial)
+                        initial = False
+                    except Exception:
+                        self._app.logger.exception("Erro ao carregar lembretes")
+                    next_refill = now + LOAD_HORIZON / 2
+
+                for user_id, payload in self.pop_due(now):
+                    try:
+                        self._dispatch(user_id, payload)
+                    except Exception:
+                        self._app.logger.exception(f"Erro ao enviar lembrete para o usuário {user_id}")
+            socket_io.sleep(POLL_INTERVAL)
+
+    def start(self, app):
+        """Carrega a primeira janela e inicia o loop em segundo plano"""
+        with self._lock:
+            if self._horizon_end is not None:
+                return
+            self._app = app
+            self._horizon_end = datetime.utcnow()
+        socket_io.start_background_task(self._run)
+
+
+def _load_replaced(series_ids):
+    """Inícios das ocorrências sobrescritas de cada série (uma query para todas)"""
+    from models.event import Event
+
+    replaced = {}
+    rows = Event.query.with_entities(Event.recurrence_parent_id, Event.recurrence_id).filter(
+        Event.recurrence_parent_id.in_(series_ids)
+    )
+    for series_id, recurrence_id in rows:
+        replaced.setdefault(series_id, set()).add(recurrence_id)
+    return replaced
+
+def _fire_at(moment, lead):
+    """Horário do lembrete; None se o item já passou (sem lembrete)"""
+    now = datetime.utcnow()
+    if moment is None or moment <= now:
+        return None
+    # Itens cujo horário de lembrete já passou (mas o item não) disparam imediatamente
+    return max(moment - lead, now)
+
+def _task_payload(task):
+    return {
+        'type': 'task',
+        'id': task.id,
+        'title': task.title,
+        'at': task.due_date.isoformat()
+    }
+
+def _event_payload(event):
+    return {
+        'type': 'event',
+        'id': event.id,
+        'title': event.title,
+        'at': event.start_date.isoformat()
+    }
+
+
+reminder_scheduler = ReminderScheduler()
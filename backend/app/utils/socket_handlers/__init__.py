@@ -5,4 +5,5 @@ from . import chat_events
 from . import message_events
 from . import rooms
 from . import connections
+from . import study_timer
 
@@ -0,0 +1,267 @@
+#Cronômetros de estudo ficam em memória; o banco só é tocado no stop e nos checkpoints periódicos
+from .connections import sid_user, user_sids
+from flask import request, current_app
+from datetime import datetime
+import threading
+import time
+from utils.extensions import socket_io
+from repositories import progressRepository, subjectRepository
+
+TICK_INTERVAL = 5           # segundos entre os ticks enviados aos clientes
+CHECKPOINT_INTERVAL = 300   # segundos entre gravações parciais no banco
+IDLE_TIMER_TTL = 2 * 3600   # segundos até encerrar um cronômetro pausado ou sem nenhuma conexão do usuário
+
+_timers = {}                # user_id -> estado do cronômetro
+_lock = threading.Lock()
+_loop_started = False
+
+def _elapsed_seconds(timer, now):
+    elapsed = timer['accumulated']
+    if timer['running_since'] is not None:
+        elapsed += now - timer['running_since']
+    return int(elapsed)
+
+def _timer_payload(timer, now):
+    return {
+        'subject_id': timer['subject_id'],
+        'status': 'running' if timer['running_since'] is not None else 'paused',
+        'elapsed_seconds': _elapsed_seconds(timer, now),
+        'started_at': timer['started_at'].isoformat()
+    }
+
+def _new_timer(subject_id, now):
+    return {
+        'subject_id': subject_id,
+        'started_at': datetime.utcnow(),
+        'accumulated': 0.0,
+        'running_since': now,
+        'session_id': None,
+        'persisted_minutes': 0,
+        'last_checkpoint': now,
+        'last_seen': now,
+        'persist_lock': threading.Lock()
+    }
+
+def _emit_to_user(event, payload, user_id):
+    for sid in list(user_sids.get(str(user_id), ())):
+        socket_io.emit(event, payload, to=sid)
+
+def _checkpoint_entries(now):
+    """Seleciona cronômetros cujo tempo em minutos avançou desde a última gravação"""
+    entries = []
+    for user_id, timer in _timers.items():
+        minutes = _elapsed_seconds(timer, now) // 60
+        due = now - timer['last_checkpoint'] >= CHECKPOINT_INTERVAL
+        if minutes > timer['persisted_minutes'] and due:
+            entries.append((user_id, timer, minutes))
+    return entries
+
+def _persist(app, entries, now):
+    """Grava um lote de checkpoints; retorna False se alguma entrada não pôde ser gravada.
+
+    Cada cronômetro tem sua própria trava de gravação, então um checkpoint em andamento
+    e o stop nunca gravam o mesmo cronômetro ao mesmo tempo (no máximo uma sessão por cronômetro).
+    """
+    if not entries:
+        return True
+
+    for _, timer, _ in entries:
+        timer['persist_lock'].acquire()
+    try:
+        # Outra gravação (ex.: o stop) pode já ter avançado o cronômetro enquanto esperávamos a trava
+        pending = [(user_id, timer, minutes) for user_id, timer, minutes in entries if minutes > timer['persisted_minutes']]
+        if not pending:
+            return True
+
+        with app.app_context():
+            try:
+                session_ids = progressRepository.save_study_timer_sessions([
+                    {
+                        'user_id': int(user_id),
+                        'subject_id': timer['subject_id'],
+                        'date': timer['started_at'].date(),
+                        'minutes': minutes,
+                        'session_id': timer['session_id']
+                    }
+                    for user_id, timer, minutes in pending
+                ])
+            except Exception:
+                current_app.logger.exception("Erro ao gravar checkpoint dos cronômetros de estudo")
+                return False
+
+        saved = True
+        for (user_id, timer, minutes), session_id in zip(pending, session_ids):
+            # Entradas com falha só são tentadas de novo no próximo intervalo de checkpoint
+            timer['last_checkpoint'] = now
+            if session_id is None:
+                saved = False
+                continue
+            timer['session_id'] = session_id
+            timer['persisted_minutes'] = minutes
+        return saved
+    finally:
+        for _, timer, _ in entries:
+            timer['persist_lock'].release()
+
+def _pop_idle_timers(now):
+    """Retira de _timers (com _lock) os cronômetros parados há mais de IDLE_TIMER_TTL.
+
+    Um cronômetro rodando continua vivo enquanto o usuário tiver alguma conexão aberta;
+    pausado, ele expira IDLE_TIMER_TTL depois da pausa.
+    """
+    expired = []
+    for user_id, timer in list(_timers.items()):
+        if timer['running_since'] is not None and user_sids.get(str(user_id)):
+            timer['last_seen'] = now
+        if now - timer['last_seen'] < IDLE_TIMER_TTL:
+            continue
+
+        del _timers[user_id]
+        if timer['running_since'] is not None:
+            # O tempo sem nenhuma conexão do usuário não conta como estudo
+            timer['accumulated'] += max(0.0, timer['last_seen'] - timer['running_since'])
+            timer['running_since'] = None
+        expired.append((user_id, timer))
+    return expired
+
+def _close_idle_timers(app, now):
+    """Encerra os cronômetros abandonados, gravando a sessão como no stop"""
+    with _lock:
+        expired = _pop_idle_timers(now)
+    if not expired:
+        return
+
+    # Se a gravação falhar, perde-se no máximo o tempo desde o último checkpoint
+    _persist(app, [(user_id, timer, _elapsed_seconds(timer, now) // 60) for user_id, timer in expired], now)
+    for user_id, timer in expired:
+        state = _timer_payload(timer, now)
+        state['status'] = 'stopped'
+        state['session_id'] = timer['session_id']
+        state['duration_minutes'] = timer['persisted_minutes']
+        _emit_to_user('study_timer_state', state, user_id)
+
+def _timer_loop(app):
+    """Loop único que envia ticks, grava checkpoints e encerra os cronômetros abandonados"""
+    while True:
+        socket_io.sleep(TICK_INTERVAL)
+        now = time.monotonic()
+        _close_idle_timers(app, now)
+
+        with _lock:
+            ticks = [
+                (user_id, _timer_payload(timer, now))
+                for user_id, timer in _timers.items()
+                if timer['running_since'] is not None
+            ]
+            entries = _checkpoint_entries(now)
+
+        for user_id, payload in ticks:
+            _emit_to_user('study_tick', payload, user_id)
+
+        _persist(app, entries, now)
+
+def _ensure_loop():
+    global _loop_started
+    with _lock:
+        if _loop_started:
+            return
+        _loop_started = True
+    socket_io.start_background_task(_timer_loop, current_app._get_current_object())
+
+@socket_io.on('start_study')
+def handle_start_study(payload):
+    sid = request.sid
+    user_id = sid_user.get(sid)
+    if not user_id:
+        return {'status': 'error', 'code': 'UNAUTHENTICATED', 'message': 'Conexão não autenticada'}
+
+    now = time.monotonic()
+    with _lock:
+        timer = _timers.get(user_id)
+        if timer is not None:
+            if timer['running_since'] is not None:
+                return {'status': 'error', 'code': 'TIMER_RUNNING', 'message': 'Já existe um cronômetro em andamento'}
+            # Retomar um cronômetro pausado
+            timer['running_since'] = now
+            timer['last_seen'] = now
+            state = _timer_payload(timer, now)
+
+    if timer is None:
+        try:
+            subject_id = int((payload or {}).get('subject_id'))
+        except (TypeError, ValueError):
+            return {'status': 'error', 'code': 'INVALID_PAYLOAD', 'message': 'subject_id inválido'}
+
+        subject = subjectRepository.get_subject_by_id(subject_id)
+        if not subject or str(subject.user_id) != str(user_id):
+            return {'status': 'error', 'code': 'SUBJECT_NOT_FOUND', 'message': 'Matéria não encontrada'}
+
+        with _lock:
+            timer = _timers.setdefault(user_id, _new_timer(subject_id, now))
+            state = _timer_payload(timer, now)
+
+    _ensure_loop()
+    _emit_to_user('study_timer_state', state, user_id)
+    return {'status': 'ok', 'timer': state}
+
+@socket_io.on('pause_study')
+def handle_pause_study(payload=None):
+    sid = request.sid
+    user_id = sid_user.get(sid)
+    if not user_id:
+        return {'status': 'error', 'code': 'UNAUTHENTICATED', 'message': 'Conexão não autenticada'}
+
+    now = time.monotonic()
+    with _lock:
+        timer = _timers.get(user_id)
+        if timer is None:
+            return {'status': 'error', 'code': 'NO_TIMER', 'message': 'Nenhum cronômetro em andamento'}
+        if timer['running_since'] is not None:
+            timer['accumulated'] += now - timer['running_since']
+            timer['running_since'] = None
+            timer['last_seen'] = now
+        state = _timer_payload(timer, now)
+
+    _emit_to_user('study_timer_state', state, user_id)
+    return {'status': 'ok', 'timer': state}
+
+@socket_io.on('stop_study')
+def handle_stop_study(payload=None):
+    sid = request.sid
+    user_id = sid_user.get(sid)
+    if not user_id:
+        return {'status': 'error', 'code': 'UNAUTHENTICATED', 'message': 'Conexão não autenticada'}
+
+    now = time.monotonic()
+    with _lock:
+        timer = _timers.pop(user_id, None)
+        if timer is not None and timer['running_since'] is not None:
+            timer['accumulated'] += now - timer['running_since']
+            timer['running_since'] = None
+    if timer is None:
+        return {'status': 'error', 'code': 'NO_TIMER', 'message': 'Nenhum cronômetro em andamento'}
+
+    state = _timer_payload(timer, now)
+    minutes = state['elapsed_seconds'] // 60
+
+    # Uma única gravação por stop (atualiza a sessão do último checkpoint, se houver);
+    # _persist espera um checkpoint em andamento deste cronômetro terminar
+    if not _persist(current_app._get_current_object(), [(user_id, timer, minutes)], now):
+        # Devolve o cronômetro (pausado) para que o cliente possa tentar o stop de novo
+        with _lock:
+            timer = _timers.setdefault(user_id, timer)
+            state = _timer_payload(timer, now)
+        _emit_to_user('study_timer_state', state, user_id)
+        return {
+            'status': 'error',
+            'code': 'PERSIST_FAILED',
+            'message': 'Não foi possível salvar a sessão de estudo. Tente novamente.',
+            'timer': state
+        }
+
+    state['status'] = 'stopped'
+    state['session_id'] = timer['session_id']
+    state['duration_minutes'] = timer['persisted_minutes']
+
+    _emit_to_user('study_timer_state', state, user_id)
+    return {'status': 'ok', 'timer': state}